@@ -0,0 +1,71 @@
+"""
+Async engine speedup vs concurrency, using a mock provider with latency.
+
+With LLM latency dominating, records/sec should grow close to linearly
+with the number of calls in flight until the concurrency limit is reached.
+
+    python -m ingestion.benchmarks.async_concurrency --count 200 --latency 0.05
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from ..config import GenerationConfig
+from ..engine import AsyncInMomentEngine
+from ..providers.mock import MockProvider
+
+
+async def _run_once(tmp: Path, count: int, concurrency: int, latency: float, jitter: float) -> float:
+    cfg = GenerationConfig(
+        schema_name="inmoment",
+        count=count,
+        seed=0,
+        sink="jsonl",
+        output_path=str(tmp / f"c{concurrency}.jsonl"),
+        provider="mock",
+        state_dir=str(tmp / f"c{concurrency}_state"),
+    )
+    engine = AsyncInMomentEngine(
+        cfg,
+        concurrency=concurrency,
+        provider=MockProvider(latency=latency, jitter=jitter, seed=0),
+    )
+    t0 = time.perf_counter()
+    async for _ in engine.run():
+        pass
+    return count / (time.perf_counter() - t0)
+
+
+def run(count: int, levels: List[int], latency: float, jitter: float = 0.0) -> List[dict]:
+    results = []
+    with tempfile.TemporaryDirectory() as d:
+        for c in levels:
+            rps = asyncio.run(_run_once(Path(d), count, c, latency, jitter))
+            results.append({"concurrency": c, "records_per_sec": rps})
+    base = results[0]["records_per_sec"]
+    for r in results:
+        r["speedup"] = r["records_per_sec"] / base
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="mock LLM latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra uniform latency (s)")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    for r in run(args.count, args.levels, args.latency, args.jitter):
+        print(
+            f"concurrency={r['concurrency']:>3}  "
+            f"{r['records_per_sec']:>8,.1f} records/sec  "
+            f"speedup={r['speedup']:.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Records/sec: per-record generate_one_inmoment_record vs batched session.
+
+Runs fully offline against the mock provider, with ID state and output
+written to a temporary directory so the repo's state/ is never touched.
+
+    python -m ingestion.benchmarks.batch_vs_single --count 2000
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from ..config import GenerationConfig
+from ..pipeline import generate_many_inmoment_records, generate_one_inmoment_record
+
+
+def _config(tmp: Path, name: str, count: int, seed: int | None) -> GenerationConfig:
+    return GenerationConfig(
+        schema_name="inmoment",
+        count=count,
+        seed=seed,
+        sink="jsonl",
+        output_path=str(tmp / f"{name}.jsonl"),
+        provider="mock",
+        state_dir=str(tmp / f"{name}_state"),
+    )
+
+
+def run(count: int, seed: int | None = 0) -> dict:
+    with tempfile.TemporaryDirectory() as d:
+        tmp = Path(d)
+
+        cfg = _config(tmp, "single", count, seed)
+        t0 = time.perf_counter()
+        for _ in range(count):
+            generate_one_inmoment_record(cfg)
+        single_s = time.perf_counter() - t0
+
+        cfg = _config(tmp, "batch", count, seed)
+        t0 = time.perf_counter()
+        produced = sum(1 for _ in generate_many_inmoment_records(cfg))
+        batch_s = time.perf_counter() - t0
+
+    return {
+        "count": count,
+        "single_records_per_sec": count / single_s,
+        "batch_records_per_sec": produced / batch_s,
+        "speedup": single_s / batch_s,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    res = run(args.count, args.seed)
+    print(f"records        : {res['count']}")
+    print(f"per-record path: {res['single_records_per_sec']:,.0f} records/sec")
+    print(f"batched session: {res['batch_records_per_sec']:,.0f} records/sec")
+    print(f"speedup        : {res['speedup']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
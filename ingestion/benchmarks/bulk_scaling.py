@@ -0,0 +1,41 @@
+"""
+Bulk generation throughput vs worker processes.
+
+    python -m ingestion.benchmarks.bulk_scaling --schema fullstory --count 200000 --workers 1 2 4 8
+"""
+import argparse
+import os
+import tempfile
+from pathlib import Path
+from typing import List
+
+from ..bulk import generate_bulk
+
+
+def run(schema: str, count: int, levels: List[int]) -> List[dict]:
+    results = []
+    with tempfile.TemporaryDirectory() as d:
+        for w in levels:
+            res = generate_bulk(
+                schema, count, Path(d) / f"w{w}", workers=w, merge=False, state_dir=Path(d) / "state"
+            )
+            results.append({"workers": w, "records_per_sec": res.records_per_sec})
+    base = results[0]["records_per_sec"]
+    for r in results:
+        r["speedup"] = r["records_per_sec"] / base
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--schema", choices=["inmoment", "fullstory"], default="inmoment")
+    parser.add_argument("--count", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    for r in run(args.schema, args.count, sorted(set(args.workers))):
+        print(f"workers={r['workers']:>3}  {r['records_per_sec']:>10,.0f} records/sec  speedup={r['speedup']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Tokens/record and records/call for InMomentTextAgent prompt packing.
+
+Uses the mock provider (which answers packed prompts with an indexed array)
+and the same contexts the generation session builds.
+
+    python -m ingestion.benchmarks.prompt_packing --count 64 --packs 1 4 8 16
+"""
+import argparse
+import tempfile
+from pathlib import Path
+from typing import List
+
+from ..config import GenerationConfig
+from ..llm.inmoment_agent import InMomentTextAgent
+from ..pipeline import InMomentGenerationSession
+from ..providers.mock import MockProvider
+
+
+def run(count: int, packs: List[int]) -> List[dict]:
+    with tempfile.TemporaryDirectory() as d:
+        cfg = GenerationConfig(
+            schema_name="inmoment", count=count, seed=0, sink="memory", state_dir=str(Path(d))
+        )
+        session = InMomentGenerationSession(cfg)
+        contexts = [session.build_context(session.build_skeleton()) for _ in range(count)]
+        session.close()
+
+    results = []
+    for k in packs:
+        agent = InMomentTextAgent(MockProvider(), pack_size=k)
+        agent.generate_many(contexts)
+        st = agent.stats
+        results.append({
+            "pack_size": k,
+            "calls": st.calls,
+            "records_per_call": st.records_per_call,
+            "tokens_per_record": st.tokens_per_record,
+            "fallbacks": st.fallbacks,
+        })
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=64)
+    parser.add_argument("--packs", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    for r in run(args.count, args.packs):
+        print(
+            f"pack_size={r['pack_size']:>3}  calls={r['calls']:>4}  "
+            f"records/call={r['records_per_call']:.1f}  "
+            f"tokens/record={r['tokens_per_record']:.0f}  fallbacks={r['fallbacks']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+Offline benchmark suite for the ingestion hot path.
+
+Times each stage in isolation plus the full per-record and batched
+pipelines against a MockProvider with injectable latency/jitter, and
+reports ops/sec, p50/p99 latency and peak traced memory per case.
+Results can be saved as JSON and compared against a saved baseline.
+
+    python -m ingestion.benchmarks.suite --out bench.json
+    python -m ingestion.benchmarks.suite --baseline bench.json --threshold 0.10
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from ..config import GenerationConfig
+from ..generators.structured import StructuredGenerator
+from ..llm.inmoment_agent import InMomentTextAgent
+from ..pipeline import InMomentGenerationSession, generate_one_inmoment_record
+from ..providers.mock import MockProvider
+from ..schemas import registry
+from ..sinks.jsonl import JsonlSink
+from ..validators.pydantic_validator import JsonSchemaValidator
+
+Op = Callable[[], Any]
+
+
+@dataclass
+class CaseResult:
+    name: str
+    iterations: int
+    ops_per_sec: float
+    p50_us: float
+    p99_us: float
+    peak_mem_kb: float
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def bench(name: str, op: Op, iterations: int, warmup: int = 10, mem_iterations: int = 50) -> CaseResult:
+    """
+    Time `op` per call, then re-run a few calls under tracemalloc for peak
+    memory (kept separate so tracing does not skew the timings).
+    """
+    for _ in range(warmup):
+        op()
+
+    timings: List[float] = []
+    clock = time.perf_counter
+    t_start = clock()
+    for _ in range(iterations):
+        t0 = clock()
+        op()
+        timings.append(clock() - t0)
+    total = clock() - t_start
+    timings.sort()
+
+    tracemalloc.start()
+    try:
+        for _ in range(min(mem_iterations, iterations)):
+            op()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return CaseResult(
+        name=name,
+        iterations=iterations,
+        ops_per_sec=iterations / total if total else 0.0,
+        p50_us=_percentile(timings, 0.50) * 1e6,
+        p99_us=_percentile(timings, 0.99) * 1e6,
+        peak_mem_kb=peak / 1024,
+    )
+
+
+# --------------------------------------------------
+# Cases: each factory does its setup and returns the op to time
+# --------------------------------------------------
+
+def _cases(tmp: Path, latency: float, jitter: float) -> Dict[str, Callable[[], Op]]:
+    schema = registry.load_schema("inmoment")
+
+    def structured_generate_one() -> Op:
+        gen = StructuredGenerator(rng=random.Random(0))
+        return lambda: gen.generate_one(schema)
+
+    def validator_validate() -> Op:
+        validator = JsonSchemaValidator(schema)
+        record = _full_record(tmp)
+        return lambda: validator.validate(record)
+
+    def agent_build_prompt() -> Op:
+        agent = InMomentTextAgent(MockProvider())
+        context = _context(tmp)
+        return lambda: agent._build_prompt(context)
+
+    def agent_parse_output() -> Op:
+        agent = InMomentTextAgent(MockProvider())
+        raw = MockProvider().generate_text("")
+        return lambda: agent._parse_output(raw)
+
+    def sink_write_many() -> Op:
+        sink = JsonlSink(tmp / "sink.jsonl")
+        batch = [_full_record(tmp)] * 100
+        return lambda: sink.write_many(batch)
+
+    def load_schema_cold() -> Op:
+        def op() -> None:
+            registry._CACHE.pop("inmoment", None)
+            registry.load_schema("inmoment")
+        return op
+
+    def load_schema_cached() -> Op:
+        return lambda: registry.load_schema("inmoment")
+
+    def pipeline_generate_one() -> Op:
+        cfg = _cfg(tmp, "single", latency, jitter)
+        return lambda: generate_one_inmoment_record(cfg)
+
+    def session_generate_one() -> Op:
+        session = InMomentGenerationSession(_cfg(tmp, "session", latency, jitter))
+
+        def op() -> None:
+            session.generate_one()
+            session.commit()
+        return op
+
+    return {
+        "structured.generate_one": structured_generate_one,
+        "validator.validate": validator_validate,
+        "agent._build_prompt": agent_build_prompt,
+        "agent._parse_output": agent_parse_output,
+        "sink.write_many[100]": sink_write_many,
+        "registry.load_schema[cold]": load_schema_cold,
+        "registry.load_schema[cached]": load_schema_cached,
+        "pipeline.generate_one_inmoment_record": pipeline_generate_one,
+        "pipeline.session.generate_one": session_generate_one,
+    }
+
+
+def _cfg(tmp: Path, name: str, latency: float, jitter: float) -> GenerationConfig:
+    return GenerationConfig(
+        schema_name="inmoment",
+        seed=0,
+        sink="jsonl",
+        output_path=str(tmp / f"{name}.jsonl"),
+        provider="mock",
+        mock_latency=latency,
+        mock_jitter=jitter,
+        state_dir=str(tmp / f"{name}_state"),
+    )
+
+
+def _full_record(tmp: Path) -> Dict[str, Any]:
+    cfg = _cfg(tmp, "fixture", 0.0, 0.0)
+    cfg.sink = "memory"
+    session = InMomentGenerationSession(cfg)
+    try:
+        return session.generate_one()
+    finally:
+        session.close()
+
+
+def _context(tmp: Path) -> Dict[str, Any]:
+    cfg = _cfg(tmp, "fixture", 0.0, 0.0)
+    cfg.sink = "memory"
+    session = InMomentGenerationSession(cfg)
+    try:
+        return session.build_context(session.build_skeleton())
+    finally:
+        session.close()
+
+
+# --------------------------------------------------
+# Runner and baseline comparison
+# --------------------------------------------------
+
+# Cases that go through the (possibly slow) mock provider or disk state
+_SLOW_CASES = {"pipeline.generate_one_inmoment_record", "pipeline.session.generate_one"}
+
+
+def run_suite(
+    iterations: int = 2000,
+    pipeline_iterations: int = 200,
+    latency: float = 0.0,
+    jitter: float = 0.0,
+    only: List[str] | None = None,
+) -> Dict[str, Any]:
+    results: List[CaseResult] = []
+    with tempfile.TemporaryDirectory() as d:
+        for name, factory in _cases(Path(d), latency, jitter).items():
+            if only and not any(sel in name for sel in only):
+                continue
+            n = pipeline_iterations if name in _SLOW_CASES else iterations
+            results.append(bench(name, factory(), n, warmup=min(10, n)))
+
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "mock_latency": latency,
+        "mock_jitter": jitter,
+        "cases": {r.name: asdict(r) for r in results},
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float = 0.10) -> List[str]:
+    """
+    Return the names of cases whose ops/sec dropped by more than
+    `threshold` (fraction) against the baseline.
+    """
+    regressions = []
+    for name, cur in current["cases"].items():
+        base = baseline.get("cases", {}).get(name)
+        if not base or not base["ops_per_sec"]:
+            continue
+        change = cur["ops_per_sec"] / base["ops_per_sec"] - 1.0
+        cur["vs_baseline"] = change
+        if change < -threshold:
+            regressions.append(name)
+    return regressions
+
+
+def _print(report: Dict[str, Any]) -> None:
+    print(f"{'case':<40} {'ops/sec':>12} {'p50 us':>10} {'p99 us':>10} {'peak KB':>10} {'vs base':>9}")
+    for name, r in report["cases"].items():
+        delta = f"{r['vs_baseline']:+.1%}" if "vs_baseline" in r else ""
+        print(
+            f"{name:<40} {r['ops_per_sec']:>12,.0f} {r['p50_us']:>10.1f} "
+            f"{r['p99_us']:>10.1f} {r['peak_mem_kb']:>10.1f} {delta:>9}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--pipeline-iterations", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.0, help="mock LLM latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra uniform latency (s)")
+    parser.add_argument("--cases", nargs="*", help="substrings selecting which cases to run")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--baseline", help="compare against a saved results JSON")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed ops/sec drop")
+    args = parser.parse_args()
+
+    report = run_suite(
+        iterations=args.iterations,
+        pipeline_iterations=args.pipeline_iterations,
+        latency=args.latency,
+        jitter=args.jitter,
+        only=args.cases,
+    )
+
+    regressions: List[str] = []
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = compare(report, baseline, args.threshold)
+
+    _print(report)
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"\nSaved results → {args.out}")
+    if regressions:
+        print(f"\nRegressions (> {args.threshold:.0%} slower): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""
+Sharded, process-pool bulk generation for LLM-free datasets.
+
+N records are split into shards; each shard runs in its own process with a
+deterministic seed and its own pre-leased ID range, and writes its own
+JSONL file. At the end the shards are either concatenated into one file or
+left in place, and a manifest describing every shard is written.
+
+    python -m ingestion.bulk --schema inmoment --count 1000000 --workers 8 --out data/bulk
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Literal, Tuple
+
+from .generators.structured import StructuredGenerator
+from .id_state import IdAllocator, SchemaName
+from .llm.inmoment_agent import InMomentTextAgent, InMomentTextResult
+from .pipeline import (
+    build_inmoment_context,
+    merge_text_result,
+    sample_channel,
+    sample_timestamp,
+)
+from .providers.mock import MockProvider
+from .schemas.registry import load_schema
+from .sinks.jsonl import JsonlSink
+from .validators.pydantic_validator import JsonSchemaValidator
+
+TextMode = Literal["template", "mock"]
+
+_CHUNK = 10_000
+
+
+@dataclass
+class ShardSpec:
+    schema_name: SchemaName
+    index: int
+    count: int
+    seed: str
+    now: str                  # ISO reference time shared by all shards
+    customer_start: int
+    survey_start: int
+    record_start: int
+    output_path: str
+    text: TextMode = "template"
+    validate: bool = True
+
+
+@dataclass
+class ShardResult:
+    index: int
+    path: str
+    records: int
+    seed: str
+    customer_range: Tuple[int, int]
+    record_range: Tuple[int, int]
+    seconds: float
+    # After a merge: `path` is the merged file and this is the shard's
+    # [start, end) byte range in it
+    byte_range: Tuple[int, int] | None = None
+
+
+@dataclass
+class BulkResult:
+    schema_name: str
+    records: int
+    seconds: float
+    shards: List[ShardResult]
+    manifest_path: str
+    merged_path: str | None
+
+    @property
+    def records_per_sec(self) -> float:
+        return self.records / self.seconds if self.seconds else 0.0
+
+
+# --------------------------------------------------
+# Per-schema record finishing (IDs, timestamps, text)
+# --------------------------------------------------
+
+_TEMPLATES = {
+    "positive": [
+        "Really happy with how my {topic} issue was handled through {channel}.",
+        "The {topic} experience was smooth and the team was helpful.",
+    ],
+    "neutral": [
+        "My {topic} query was resolved, although it took a little longer than expected.",
+        "Service over {channel} was fine; nothing stood out about the {topic} process.",
+    ],
+    "negative": [
+        "I am frustrated with the {topic} problem and the slow response over {channel}.",
+        "The {topic} issue is still not sorted and I had to follow up several times.",
+    ],
+}
+
+
+def _template_text(context: Dict[str, Any], rng: random.Random) -> InMomentTextResult:
+    nps = context.get("nps") or 0
+    tone = "positive" if nps >= 9 else "neutral" if nps >= 7 else "negative"
+    topic = str(context.get("complaint_type", "service")).replace("_", " ")
+    channel = str(context.get("channel", "web")).replace("_", " ")
+    comment = rng.choice(_TEMPLATES[tone]).format(topic=topic, channel=channel)
+    answers = [
+        {"question_id": r["question_id"], "answer": rng.choice(_TEMPLATES[tone]).format(topic=topic, channel=channel)}
+        for r in context.get("responses", [])
+    ]
+    return InMomentTextResult(comment=comment, answers=answers, tags=[context.get("complaint_type"), context.get("channel")])
+
+
+def _finish_inmoment(
+    records: List[Dict[str, Any]], spec: ShardSpec, offset: int, rng: random.Random, now: datetime,
+    agent: InMomentTextAgent | None,
+) -> None:
+    contexts = []
+    for i, rec in enumerate(records, start=offset):
+        rec["customer_id"] = f"CUST{spec.customer_start + i:03d}"
+        rec["survey_id"] = f"SUR{spec.survey_start + i:03d}"
+        rec["response_id"] = f"RSP{spec.record_start + i:07d}"
+        rec["timestamp"] = sample_timestamp(rng, now)
+        rec["channel"] = sample_channel(rng)
+        contexts.append(build_inmoment_context(rec, rng))
+
+    if agent is not None:
+        results = agent.generate_many(contexts)
+    else:
+        results = [_template_text(ctx, rng) for ctx in contexts]
+    for rec, res in zip(records, results):
+        merge_text_result(rec, res)
+
+
+def _finish_fullstory(
+    records: List[Dict[str, Any]], spec: ShardSpec, offset: int, rng: random.Random, now: datetime,
+    agent: InMomentTextAgent | None,
+) -> None:
+    for i, rec in enumerate(records, start=offset):
+        rec["event_id"] = f"EVT{spec.record_start + i:07d}"
+        rec["timestamp"] = sample_timestamp(rng, now)
+        rec["user"]["user_id"] = f"CUST{spec.customer_start + i:03d}"
+
+
+_FINISHERS: Dict[str, Callable[..., None]] = {
+    "inmoment": _finish_inmoment,
+    "fullstory": _finish_fullstory,
+}
+
+
+# --------------------------------------------------
+# Shard worker
+# --------------------------------------------------
+
+def run_shard(spec: ShardSpec) -> ShardResult:
+    """
+    Generate one shard into spec.output_path (overwriting it).
+    Top-level so it can be pickled into a process pool.
+    """
+    t0 = time.perf_counter()
+    rng = random.Random(spec.seed)
+    gen = StructuredGenerator(rng=rng)
+    schema = load_schema(spec.schema_name)
+    validator = JsonSchemaValidator(schema) if spec.validate else None
+    finish = _FINISHERS[spec.schema_name]
+    now = datetime.fromisoformat(spec.now)
+    agent = None
+    if spec.schema_name == "inmoment" and spec.text == "mock":
+        agent = InMomentTextAgent(MockProvider(), pack_size=16)
+
+    path = Path(spec.output_path)
+    path.unlink(missing_ok=True)
+    with JsonlSink(path) as sink:
+        for offset in range(0, spec.count, _CHUNK):
+            records = gen.generate_batch(schema, min(_CHUNK, spec.count - offset))
+            finish(records, spec, offset, rng, now, agent)
+            if validator is not None:
+                for rec in records:
+                    validator.validate(rec)
+            sink.write_many(records)
+
+    return ShardResult(
+        index=spec.index,
+        path=str(path),
+        records=spec.count,
+        seed=spec.seed,
+        customer_range=(spec.customer_start, spec.customer_start + spec.count),
+        record_range=(spec.record_start, spec.record_start + spec.count),
+        seconds=time.perf_counter() - t0,
+    )
+
+
+# --------------------------------------------------
+# Driver
+# --------------------------------------------------
+
+def generate_bulk(
+    schema_name: SchemaName,
+    count: int,
+    output_dir: str | Path,
+    workers: int | None = None,
+    shards: int | None = None,
+    seed: int = 0,
+    text: TextMode = "template",
+    merge: bool = True,
+    validate: bool = True,
+    state_dir: Path | None = None,
+) -> BulkResult:
+    """
+    Generate `count` records of `schema_name` across a process pool.
+
+    IDs for the whole run are leased up front from the schema's ID state
+    and split into one contiguous range per shard, so runs never collide
+    with each other or with the streaming pipeline. Shard i is seeded with
+    "<seed>-<i>", so a run is reproducible for a given (seed, shards).
+
+    With merge=True the shard files are concatenated (in shard order) into
+    <output_dir>/<schema>.jsonl and removed, and each manifest shard entry
+    points at its byte range in the merged file; otherwise they are kept and
+    the manifest acts as the index.
+    """
+    if schema_name not in _FINISHERS:
+        raise ValueError(f"generate_bulk: unsupported schema {schema_name!r}")
+    workers = workers or os.cpu_count() or 1
+    shards = max(1, min(shards or workers, count or 1))
+    out = Path(output_dir)
+    out.mkdir(parents=True, exist_ok=True)
+
+    ids = IdAllocator(schema_name, state_dir=state_dir)
+    customer_start, _ = ids.lease_range("customer", count)
+    # Only InMoment records carry survey IDs
+    survey_start = ids.lease_range("survey", count)[0] if schema_name == "inmoment" else 0
+    record_start, _ = ids.lease_range("response", count)
+
+    now = datetime.now(timezone.utc).isoformat()
+    specs: List[ShardSpec] = []
+    base, extra = divmod(count, shards)
+    offset = 0
+    for i in range(shards):
+        n = base + (1 if i < extra else 0)
+        specs.append(ShardSpec(
+            schema_name=schema_name,
+            index=i,
+            count=n,
+            seed=f"{seed}-{i}",
+            now=now,
+            customer_start=customer_start + offset,
+            survey_start=survey_start + offset,
+            record_start=record_start + offset,
+            output_path=str(out / f"{schema_name}-shard-{i:05d}.jsonl"),
+            text=text,
+            validate=validate,
+        ))
+        offset += n
+
+    t0 = time.perf_counter()
+    if workers == 1:
+        results = [run_shard(spec) for spec in specs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run_shard, specs))
+
+    merged_path = None
+    if merge:
+        merged = out / f"{schema_name}.jsonl"
+        with merged.open("wb") as dst:
+            for res in results:
+                start = dst.tell()
+                with open(res.path, "rb") as src:
+                    shutil.copyfileobj(src, dst, 1 << 20)
+                Path(res.path).unlink()
+                # The shard file is gone: point the manifest at its slice
+                res.path = str(merged)
+                res.byte_range = (start, dst.tell())
+        merged_path = str(merged)
+    seconds = time.perf_counter() - t0
+
+    manifest_path = out / f"{schema_name}.manifest.json"
+    manifest = {
+        "schema": schema_name,
+        "records": count,
+        "seed": seed,
+        "text": text,
+        "generated_at": now,
+        "merged_path": merged_path,
+        "shards": [asdict(r) for r in results],
+    }
+    manifest_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+    return BulkResult(
+        schema_name=schema_name,
+        records=count,
+        seconds=seconds,
+        shards=results,
+        manifest_path=str(manifest_path),
+        merged_path=merged_path,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Sharded LLM-free bulk generation")
+    parser.add_argument("--schema", choices=sorted(_FINISHERS), default="inmoment")
+    parser.add_argument("--count", type=int, required=True)
+    parser.add_argument("--out", default="data/bulk")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--shards", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--text", choices=["template", "mock"], default="template")
+    parser.add_argument("--no-merge", action="store_true")
+    parser.add_argument("--no-validate", action="store_true")
+    args = parser.parse_args()
+
+    res = generate_bulk(
+        args.schema,
+        args.count,
+        args.out,
+        workers=args.workers,
+        shards=args.shards,
+        seed=args.seed,
+        text=args.text,
+        merge=not args.no_merge,
+        validate=not args.no_validate,
+    )
+    print(f"Generated {res.records} {res.schema_name} records in {res.seconds:.2f}s "
+          f"({res.records_per_sec:,.0f} records/sec, {len(res.shards)} shards)")
+    print(f"Manifest: {res.manifest_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
-from dataclasses import dataclass
-from typing import Literal
+from dataclasses import dataclass, field
+from typing import Any, Dict, Literal
 
 
 @dataclass
@@ -9,4 +9,23 @@ class GenerationConfig:
     seed: int | None = None
     sink: Literal["jsonl", "memory"] = "jsonl"
     output_path: str = "data/inmoment_data.jsonl"
-    provider: Literal["mock", "azure"] = "mock"
\ No newline at end of file
+    # Extra JsonlSink kwargs: buffer_size, fsync, fsync_every, max_bytes, ...
+    sink_options: Dict[str, Any] = field(default_factory=dict)
+    provider: Literal["mock", "azure"] = "mock"
+    # Simulated LLM latency for provider="mock" (seconds; see MockProvider)
+    mock_latency: float = 0.0
+    mock_jitter: float = 0.0
+    # Wrap the provider in a CachingProvider backed by this SQLite file
+    cache_path: str | None = None
+    cache_mode: Literal["read_write", "replay", "record"] = "read_write"
+    # Benchmark replay only: key the cache without per-record IDs/timestamps
+    # (VOLATILE_FIELDS), so different records share one cached completion
+    cache_mask_volatile: bool = False
+    # Contexts packed into one InMoment text-agent call (1 = no packing)
+    pack_size: int = 1
+    # Max LLM calls in flight for the async engine (ingestion.engine)
+    concurrency: int = 8
+    # IDs leased per allocator block (see ingestion.id_state.IdAllocator)
+    id_block_size: int = 1000
+    # Directory holding <schema>_id_state.json; None uses the repo's state/ dir
+    state_dir: str | None = None
\ No newline at end of file
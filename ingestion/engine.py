@@ -0,0 +1,122 @@
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Set, Union
+
+from .config import GenerationConfig
+from .pipeline import InMomentGenerationSession
+from .providers.base import BaseProvider
+
+
+class AsyncInMomentEngine:
+    """
+    Bounded-concurrency asyncio engine for InMoment generation.
+
+    Keeps up to `concurrency` LLM calls in flight and yields records in
+    completion order. With cfg.pack_size > 1 each call carries a pack of
+    up to pack_size contexts (InMomentTextAgent.agenerate_many).
+    Skeletons, IDs and contexts come from an InMomentGenerationSession on
+    the event loop thread, so the pending-record buffer needs no locking.
+
+    Usage:
+        engine = AsyncInMomentEngine(cfg, concurrency=16)
+        async for rec in engine.run():
+            ...
+    """
+
+    def __init__(
+        self,
+        cfg: GenerationConfig,
+        concurrency: int | None = None,
+        provider: BaseProvider | None = None,
+    ) -> None:
+        self.session = InMomentGenerationSession(cfg, provider=provider)
+        self.concurrency = max(1, concurrency or cfg.concurrency)
+
+    async def run(
+        self, count: int | None = None, commit_every: int | None = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield `count` records (defaults to cfg.count) as their LLM calls finish.
+
+        Sink writes are committed at the end (or every `commit_every`
+        records). On error or early exit the in-flight calls are cancelled,
+        finished records are still committed and unused leased IDs are
+        released; IDs of cancelled records are skipped, never reissued.
+        A record that fails to finalize is raised only after the other
+        records of its pack (and of calls finished with it) are yielded.
+        """
+        session = self.session
+        total = session.cfg.count if count is None else count
+        started = 0
+        emitted = 0
+        in_flight: Set[asyncio.Task] = set()
+
+        try:
+            pack = session.text_agent.pack_size
+            while started < total or in_flight:
+                while started < total and len(in_flight) < self.concurrency:
+                    n = min(pack, total - started)
+                    in_flight.add(asyncio.create_task(self._one() if n == 1 else self._pack(n)))
+                    started += n
+
+                done, in_flight = await asyncio.wait(
+                    in_flight, return_when=asyncio.FIRST_COMPLETED
+                )
+                failure = None
+                for task in done:
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        failure = failure or e
+                        continue
+                    for record in result if isinstance(result, list) else [result]:
+                        if isinstance(record, Exception):
+                            failure = failure or record
+                            continue
+                        yield record
+                        emitted += 1
+                        if commit_every and emitted % commit_every == 0:
+                            session.commit()
+                if failure is not None:
+                    raise failure
+        finally:
+            for task in in_flight:
+                task.cancel()
+            if in_flight:
+                await asyncio.gather(*in_flight, return_exceptions=True)
+            session.close()
+
+    async def _one(self) -> Dict[str, Any]:
+        session = self.session
+        record = session.build_skeleton()
+        context = session.build_context(record)
+        text_result = await session.text_agent.agenerate(context)
+        return session.finalize(record, text_result)
+
+    async def _pack(self, n: int) -> List[Union[Dict[str, Any], Exception]]:
+        # Finalize each record on its own: an invalid record is returned as
+        # its exception instead of discarding the valid rest of the pack
+        session = self.session
+        records = [session.build_skeleton() for _ in range(n)]
+        contexts = [session.build_context(r) for r in records]
+        results = await session.text_agent.agenerate_many(contexts)
+        finalized: List[Union[Dict[str, Any], Exception]] = []
+        for record, result in zip(records, results):
+            try:
+                finalized.append(session.finalize(record, result))
+            except Exception as e:
+                finalized.append(e)
+        return finalized
+
+
+async def agenerate_many_inmoment_records(
+    cfg: GenerationConfig,
+    concurrency: int | None = None,
+    provider: BaseProvider | None = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Async counterpart of generate_many_inmoment_records with up to
+    `concurrency` (default cfg.concurrency) LLM calls in flight.
+    """
+    engine = AsyncInMomentEngine(cfg, concurrency=concurrency, provider=provider)
+    async for record in engine.run():
+        yield record
@@ -1,9 +1,23 @@
 import random
 import string
-from typing import Any, Dict
+from typing import Any, Callable, Dict, List, Tuple
 
 from .base import BaseGenerator
 
+try:  # optional: bulk draws for generate_batch
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+
+_CHARS = string.ascii_letters + string.digits
+_STRING_LEN = 12
+_DATE_TIME = "2024-01-01T00:00:00Z"
+
+# A plan produces one value; a batch plan produces a list of n values.
+Plan = Callable[[], Any]
+BatchPlan = Callable[[int], List[Any]]
+
 
 class StructuredGenerator(BaseGenerator):
     """
@@ -13,58 +27,177 @@ class StructuredGenerator(BaseGenerator):
       - IDs, timestamps, enums, numeric values
       - responses[].question_id
     The LLM will overwrite text fields (e.g. comment, responses[].answer).
+
+    Each schema is compiled once into a tree of closures (a "plan") and
+    cached on the generator, so per-record work no longer re-inspects the
+    schema dict. generate_batch() uses a column-wise plan that draws values
+    in bulk, with NumPy when available.
     """
 
-    def __init__(self, rng: random.Random | None = None):
+    def __init__(self, rng: random.Random | None = None, use_numpy: bool | None = None):
         self._rng = rng or random.Random()
+        self._use_numpy = (np is not None) if use_numpy is None else (use_numpy and np is not None)
+        self._np_rng = None
+        # id(schema) -> (schema, plan); the schema is kept so its id stays unique
+        self._plans: Dict[int, Tuple[Dict[str, Any], Plan]] = {}
+        self._batch_plans: Dict[int, Tuple[Dict[str, Any], BatchPlan]] = {}
 
     def generate_one(self, schema: Dict[str, Any]) -> Dict[str, Any]:
+        return self._plan_for(schema)()
+
+    def generate_batch(self, schema: Dict[str, Any], n: int) -> List[Dict[str, Any]]:
+        """
+        Produce n records for the schema, drawing each field for the whole
+        batch at once.
+        """
+        if n <= 0:
+            return []
+        return self._batch_plan_for(schema)(n)
+
+    # --- plan cache ---
+
+    def _plan_for(self, schema: Dict[str, Any]) -> Plan:
+        cached = self._plans.get(id(schema))
+        if cached is not None and cached[0] is schema:
+            return cached[1]
+        if schema.get("type") != "object":
+            raise ValueError("Top-level schema must be an object")
+        plan = self._compile(schema)
+        self._plans[id(schema)] = (schema, plan)
+        return plan
+
+    def _batch_plan_for(self, schema: Dict[str, Any]) -> BatchPlan:
+        cached = self._batch_plans.get(id(schema))
+        if cached is not None and cached[0] is schema:
+            return cached[1]
         if schema.get("type") != "object":
             raise ValueError("Top-level schema must be an object")
-        return self._gen_object(schema)
+        plan = self._compile_batch(schema)
+        self._batch_plans[id(schema)] = (schema, plan)
+        return plan
 
-    # --- internal helpers ---
+    # --- single-record plans ---
 
-    def _gen_object(self, schema: Dict[str, Any]) -> Dict[str, Any]:
-        props: Dict[str, Any] = schema.get("properties", {})
-        out: Dict[str, Any] = {}
-        for name, subschema in props.items():
-            out[name] = self._gen_value(subschema)
-        return out
+    def _compile(self, schema: Dict[str, Any]) -> Plan:
+        rng = self._rng
 
-    def _gen_value(self, schema: Dict[str, Any]) -> Any:
         if "enum" in schema:
-            return self._rng.choice(schema["enum"])
+            choices = list(schema["enum"])
+            return lambda: rng.choice(choices)
 
         t = schema.get("type")
         if t == "string":
-            fmt = schema.get("format")
-            if fmt == "date-time":
+            if schema.get("format") == "date-time":
                 # You can replace this with realistic date ranges if needed
-                return "2024-01-01T00:00:00Z"
-            return self._random_string(12)
+                return lambda: _DATE_TIME
+            return lambda: self._random_string(_STRING_LEN)
 
         if t == "integer":
             lo = schema.get("minimum", 0)
             hi = schema.get("maximum", lo + 100)
-            return self._rng.randint(lo, hi)
+            return lambda: rng.randint(lo, hi)
 
         if t == "number":
             lo = schema.get("minimum", 0)
             hi = schema.get("maximum", lo + 100.0)
-            return self._rng.uniform(lo, hi)
+            return lambda: rng.uniform(lo, hi)
 
         if t == "object":
-            return self._gen_object(schema)
+            fields = [(name, self._compile(sub)) for name, sub in schema.get("properties", {}).items()]
+            return lambda: {name: gen() for name, gen in fields}
 
         if t == "array":
-            items = schema.get("items", {})
-            length = self._rng.randint(1, 3)
-            return [self._gen_value(items) for _ in range(length)]
+            item = self._compile(schema.get("items", {}))
+            return lambda: [item() for _ in range(rng.randint(1, 3))]
 
         # Fallback
-        return None
+        return lambda: None
 
     def _random_string(self, n: int) -> str:
-        chars = string.ascii_letters + string.digits
-        return "".join(self._rng.choice(chars) for _ in range(n))
\ No newline at end of file
+        return "".join(self._rng.choices(_CHARS, k=n))
+
+    # --- batch plans ---
+
+    def _compile_batch(self, schema: Dict[str, Any]) -> BatchPlan:
+        if "enum" in schema:
+            choices = list(schema["enum"])
+            return lambda n: self._bulk_choice(choices, n)
+
+        t = schema.get("type")
+        if t == "string":
+            if schema.get("format") == "date-time":
+                return lambda n: [_DATE_TIME] * n
+            return lambda n: self._bulk_strings(_STRING_LEN, n)
+
+        if t == "integer":
+            lo = schema.get("minimum", 0)
+            hi = schema.get("maximum", lo + 100)
+            return lambda n: self._bulk_ints(lo, hi, n)
+
+        if t == "number":
+            lo = schema.get("minimum", 0)
+            hi = schema.get("maximum", lo + 100.0)
+            return lambda n: self._bulk_uniform(lo, hi, n)
+
+        if t == "object":
+            names: List[str] = []
+            columns: List[BatchPlan] = []
+            for name, sub in schema.get("properties", {}).items():
+                names.append(name)
+                columns.append(self._compile_batch(sub))
+
+            def gen_objects(n: int) -> List[Dict[str, Any]]:
+                if not names:
+                    return [{} for _ in range(n)]
+                cols = [col(n) for col in columns]
+                return [dict(zip(names, row)) for row in zip(*cols)]
+
+            return gen_objects
+
+        if t == "array":
+            item = self._compile_batch(schema.get("items", {}))
+
+            def gen_arrays(n: int) -> List[List[Any]]:
+                lengths = self._bulk_ints(1, 3, n)
+                flat = item(sum(lengths))
+                out, pos = [], 0
+                for length in lengths:
+                    out.append(flat[pos:pos + length])
+                    pos += length
+                return out
+
+            return gen_arrays
+
+        return lambda n: [None] * n
+
+    def _numpy_rng(self):
+        if self._np_rng is None:
+            # Seeded from the Python RNG so seeded generators stay reproducible
+            self._np_rng = np.random.default_rng(self._rng.getrandbits(64))
+        return self._np_rng
+
+    def _bulk_ints(self, lo: int, hi: int, n: int) -> List[int]:
+        if self._use_numpy:
+            return self._numpy_rng().integers(lo, hi, size=n, endpoint=True).tolist()
+        randint = self._rng.randint
+        return [randint(lo, hi) for _ in range(n)]
+
+    def _bulk_uniform(self, lo: float, hi: float, n: int) -> List[float]:
+        if self._use_numpy:
+            return self._numpy_rng().uniform(lo, hi, size=n).tolist()
+        uniform = self._rng.uniform
+        return [uniform(lo, hi) for _ in range(n)]
+
+    def _bulk_choice(self, choices: List[Any], n: int) -> List[Any]:
+        if self._use_numpy:
+            idx = self._numpy_rng().integers(0, len(choices), size=n)
+            return [choices[i] for i in idx.tolist()]
+        return self._rng.choices(choices, k=n)
+
+    def _bulk_strings(self, length: int, n: int) -> List[str]:
+        if self._use_numpy:
+            alphabet = np.frombuffer(_CHARS.encode("ascii"), dtype=np.uint8)
+            codes = alphabet[self._numpy_rng().integers(0, len(alphabet), size=(n, length))]
+            return [s.decode("ascii") for s in codes.view(f"S{length}").ravel().tolist()]
+        blob = "".join(self._rng.choices(_CHARS, k=length * n))
+        return [blob[i:i + length] for i in range(0, length * n, length)]
@@ -1,12 +1,23 @@
 from __future__ import annotations
 
 import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
 from dataclasses import dataclass, asdict
 from pathlib import Path
-from typing import Literal
+from typing import Any, Dict, Iterator, List, Literal, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+    import msvcrt
 
 
 SchemaName = Literal["inmoment", "fullstory"]  # extend as needed
+CounterName = Literal["customer", "survey", "response"]
 
 
 @dataclass
@@ -19,15 +30,15 @@ class IdState:
 _STATE_DIR = Path(__file__).parent.parent / "state"
 
 
-def _state_path(schema_name: SchemaName) -> Path:
-    return _STATE_DIR / f"{schema_name}_id_state.json"
+def _state_path(schema_name: SchemaName, state_dir: Path | None = None) -> Path:
+    return (state_dir or _STATE_DIR) / f"{schema_name}_id_state.json"
 
 
-def load_id_state(schema_name: SchemaName) -> IdState:
+def load_id_state(schema_name: SchemaName, state_dir: Path | None = None) -> IdState:
     """
     Load ID state for a schema; if none exists, start from zeros.
     """
-    path = _state_path(schema_name)
+    path = _state_path(schema_name, state_dir)
     if not path.exists():
         return IdState()
 
@@ -39,10 +50,171 @@ def load_id_state(schema_name: SchemaName) -> IdState:
     )
 
 
-def save_id_state(schema_name: SchemaName, state: IdState) -> None:
+def save_id_state(
+    schema_name: SchemaName, state: IdState, state_dir: Path | None = None
+) -> None:
     """
     Persist ID state to disk.
     """
-    _STATE_DIR.mkdir(parents=True, exist_ok=True)
-    path = _state_path(schema_name)
-    path.write_text(json.dumps(asdict(state), indent=2), encoding="utf-8")
\ No newline at end of file
+    path = _state_path(schema_name, state_dir)
+    with _locked(path):
+        data = _read_raw(path)
+        data.update(asdict(state))
+        _atomic_write(path, data)
+
+
+# --------------------------------------------------
+# Multi-process block leasing
+# --------------------------------------------------
+
+def _lock_path(path: Path) -> Path:
+    return path.with_name(path.name + ".lock")
+
+
+@contextmanager
+def _locked(path: Path) -> Iterator[None]:
+    """
+    Exclusive inter-process lock on a sidecar <state>.lock file.
+    """
+    lock_path = _lock_path(path)
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with lock_path.open("a+b") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        else:  # pragma: no cover - Windows
+            fh.seek(0)
+            msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+            else:  # pragma: no cover - Windows
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _read_raw(path: Path) -> Dict[str, Any]:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _atomic_write(path: Path, data: Dict[str, Any]) -> None:
+    """
+    Write JSON to a temp file in the same directory, fsync, then rename
+    over the target so readers never see a partial file.
+    """
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(json.dumps(data, indent=2))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+class IdAllocator:
+    """
+    Process-safe ID allocator that leases contiguous blocks from the state file.
+
+    Each counter (customer / survey / response) is leased `block_size`
+    indices at a time under a file lock; IDs are then handed out from
+    memory. release() (or leaving the context manager) returns what is left
+    of each block: if no one leased after us the counter is simply rolled
+    back, otherwise the range is recorded under "free_ranges" and handed out
+    by the next lease. Many workers can share one state file without
+    colliding.
+
+    Usage:
+        with IdAllocator("inmoment", block_size=1000) as ids:
+            idx = ids.next_index("customer")
+    """
+
+    def __init__(
+        self,
+        schema_name: SchemaName,
+        block_size: int = 1000,
+        state_dir: Path | None = None,
+    ) -> None:
+        if block_size < 1:
+            raise ValueError("IdAllocator: block_size must be >= 1")
+        self.schema_name = schema_name
+        self.block_size = block_size
+        self._path = _state_path(schema_name, state_dir)
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        # counter -> [next, end) of the currently leased block
+        self._blocks: Dict[str, List[int]] = {}
+        self._mutex = threading.Lock()
+
+    def next_index(self, counter: CounterName) -> int:
+        with self._mutex:
+            block = self._blocks.get(counter)
+            if block is None or block[0] >= block[1]:
+                block = self._blocks[counter] = self._lease(counter)
+            idx = block[0]
+            block[0] += 1
+            return idx
+
+    def lease_range(self, counter: CounterName, n: int) -> Tuple[int, int]:
+        """
+        Reserve exactly n contiguous indices [start, end) for `counter`.
+
+        The range is owned by the caller (e.g. split across shard workers)
+        and is not returned by release().
+        """
+        field = f"{counter}_next_index"
+        with _locked(self._path):
+            data = _read_raw(self._path)
+            start = data.get(field, 0)
+            data[field] = start + n
+            _atomic_write(self._path, data)
+        return start, start + n
+
+    def release(self) -> None:
+        """
+        Return the unused part of every leased block to the state file.
+        """
+        with self._mutex:
+            leftovers = {c: b for c, b in self._blocks.items() if b[0] < b[1]}
+            self._blocks = {}
+            if not leftovers:
+                return
+            with _locked(self._path):
+                data = _read_raw(self._path)
+                free = data.setdefault("free_ranges", {})
+                for counter, (start, end) in leftovers.items():
+                    field = f"{counter}_next_index"
+                    if data.get(field, 0) == end:
+                        data[field] = start
+                    else:
+                        free.setdefault(counter, []).append([start, end])
+                _atomic_write(self._path, data)
+
+    def __enter__(self) -> "IdAllocator":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.release()
+
+    # --- internal ---
+
+    def _lease(self, counter: str) -> List[int]:
+        field = f"{counter}_next_index"
+        with _locked(self._path):
+            data = _read_raw(self._path)
+            free = data.get("free_ranges", {}).get(counter)
+            if free:
+                start, end = free.pop(0)
+                if end - start > self.block_size:
+                    free.insert(0, [start + self.block_size, end])
+                    end = start + self.block_size
+            else:
+                start = data.get(field, 0)
+                end = start + self.block_size
+                data[field] = end
+            _atomic_write(self._path, data)
+        return [start, end]
\ No newline at end of file
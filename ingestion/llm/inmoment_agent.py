@@ -1,10 +1,26 @@
 import json
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Sequence
 
 from ..providers.base import BaseProvider
 
+_PROMPTS_DIR = Path(__file__).parent.parent / "prompts" / "inmoment"
+
+
+@lru_cache(maxsize=None)
+def _load_template(name: str) -> str:
+    return (_PROMPTS_DIR / name).read_text(encoding="utf-8")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count (~4 characters per token), enough to compare
+    prompt-packing settings without a tokenizer dependency.
+    """
+    return (len(text) + 3) // 4
+
 
 @dataclass
 class InMomentTextResult:
@@ -19,6 +35,27 @@ class InMomentTextResult:
     tags: List[str]
 
 
+@dataclass
+class PackingStats:
+    """
+    Counters for generate_many(): LLM calls, records produced, records that
+    needed a single-context fallback, and estimated prompt/completion tokens.
+    """
+    calls: int = 0
+    records: int = 0
+    fallbacks: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    @property
+    def tokens_per_record(self) -> float:
+        return (self.prompt_tokens + self.completion_tokens) / self.records if self.records else 0.0
+
+    @property
+    def records_per_call(self) -> float:
+        return self.records / self.calls if self.calls else 0.0
+
+
 class InMomentTextAgent:
     """
     LLM agent wrapper for InMoment text fields.
@@ -34,17 +71,18 @@ class InMomentTextAgent:
         ],
         "tags": ["billing", "web"]
       }
+
+    generate_many() packs up to `pack_size` contexts into one call using
+    prompts/inmoment/prompt_batch.txt and expects a JSON array of the same
+    objects, each with the "index" of its context.
     """
 
-    def __init__(self, provider: BaseProvider) -> None:
-        prompt_path = (
-            Path(__file__).parent.parent
-            / "prompts"
-            / "inmoment"
-            / "prompt.txt"
-        )
+    def __init__(self, provider: BaseProvider, pack_size: int = 8) -> None:
         self._provider = provider
-        self._prompt_template = prompt_path.read_text(encoding="utf-8")
+        self._prompt_template = _load_template("prompt.txt")
+        self._batch_template = _load_template("prompt_batch.txt")
+        self.pack_size = max(1, pack_size)
+        self.stats = PackingStats()
 
     def generate(self, context: Dict[str, Any]) -> InMomentTextResult:
         """
@@ -59,15 +97,92 @@ class InMomentTextAgent:
         """
         prompt = self._build_prompt(context)
         raw = self._provider.generate_text(prompt)
-        obj = self._parse_output(raw)
+        self._count_call(prompt, raw, records=1)
+        return self._to_result(self._parse_output(raw))
+
+    def generate_many(
+        self, contexts: Sequence[Dict[str, Any]], pack_size: int | None = None
+    ) -> List[InMomentTextResult]:
+        """
+        Generate results for many contexts, `pack_size` contexts per LLM call.
+
+        Each element of the packed reply is checked with the same rules as
+        generate(); contexts whose element is missing or invalid are retried
+        with a single-context call. Results are returned in input order.
+        """
+        k = max(1, pack_size or self.pack_size)
+        results: List[InMomentTextResult] = []
+        for start in range(0, len(contexts), k):
+            chunk = contexts[start:start + k]
+            if len(chunk) == 1:
+                results.append(self.generate(chunk[0]))
+                continue
+
+            prompt = self._build_batch_prompt(chunk)
+            raw = self._provider.generate_text(prompt)
+            parsed = self._parse_batch_output(raw, len(chunk))
+            self._count_call(prompt, raw, records=sum(1 for p in parsed if p is not None))
+
+            for ctx, obj in zip(chunk, parsed):
+                if obj is None:
+                    self.stats.fallbacks += 1
+                    results.append(self.generate(ctx))
+                else:
+                    results.append(self._to_result(obj))
+        return results
+
+    async def agenerate(self, context: Dict[str, Any]) -> InMomentTextResult:
+        """
+        Async variant of generate(), using the provider's agenerate_text.
+        """
+        prompt = self._build_prompt(context)
+        raw = await self._provider.agenerate_text(prompt)
+        self._count_call(prompt, raw, records=1)
+        return self._to_result(self._parse_output(raw))
+
+    async def agenerate_many(
+        self, contexts: Sequence[Dict[str, Any]], pack_size: int | None = None
+    ) -> List[InMomentTextResult]:
+        """
+        Async variant of generate_many(): one agenerate_text call per pack,
+        with the same single-context fallback for missing or invalid slots.
+        """
+        k = max(1, pack_size or self.pack_size)
+        results: List[InMomentTextResult] = []
+        for start in range(0, len(contexts), k):
+            chunk = contexts[start:start + k]
+            if len(chunk) == 1:
+                results.append(await self.agenerate(chunk[0]))
+                continue
+
+            prompt = self._build_batch_prompt(chunk)
+            raw = await self._provider.agenerate_text(prompt)
+            parsed = self._parse_batch_output(raw, len(chunk))
+            self._count_call(prompt, raw, records=sum(1 for p in parsed if p is not None))
+
+            for ctx, obj in zip(chunk, parsed):
+                if obj is None:
+                    self.stats.fallbacks += 1
+                    results.append(await self.agenerate(ctx))
+                else:
+                    results.append(self._to_result(obj))
+        return results
+
+    # --- internal ---
+
+    def _count_call(self, prompt: str, raw: str, records: int) -> None:
+        self.stats.calls += 1
+        self.stats.records += records
+        self.stats.prompt_tokens += estimate_tokens(prompt)
+        self.stats.completion_tokens += estimate_tokens(raw)
+
+    def _to_result(self, obj: Dict[str, Any]) -> InMomentTextResult:
         return InMomentTextResult(
             comment=obj["comment"],
             answers=obj["answers"],
             tags=obj.get("tags", []),
         )
 
-    # --- internal ---
-
     def _build_prompt(self, context: Dict[str, Any]) -> str:
         """
         Insert the JSON-encoded context into the prompt template.
@@ -76,6 +191,42 @@ class InMomentTextAgent:
         context_json = json.dumps(context, ensure_ascii=False)
         return self._prompt_template.replace("{{context_json}}", context_json)
 
+    def _build_batch_prompt(self, contexts: Sequence[Dict[str, Any]]) -> str:
+        """
+        Insert the indexed contexts into the batch template's
+        {{contexts_json}} placeholder.
+        """
+        items = [{"index": i, "context": ctx} for i, ctx in enumerate(contexts)]
+        contexts_json = json.dumps(items, ensure_ascii=False)
+        return self._batch_template.replace("{{contexts_json}}", contexts_json)
+
+    def _parse_batch_output(self, raw: str, n: int) -> List[Dict[str, Any] | None]:
+        """
+        Parse a packed reply into n slots (by "index"); slots with a missing
+        or invalid element are None.
+        """
+        slots: List[Dict[str, Any] | None] = [None] * n
+        try:
+            items = json.loads(raw)
+        except json.JSONDecodeError:
+            return slots
+        if not isinstance(items, list):
+            return slots
+
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            idx = item.get("index")
+            if not isinstance(idx, int) or isinstance(idx, bool) or not 0 <= idx < n:
+                continue
+            if slots[idx] is not None:
+                continue
+            try:
+                slots[idx] = self._check_output(item)
+            except ValueError:
+                continue
+        return slots
+
     def _parse_output(self, raw: str) -> Dict[str, Any]:
         """
         Parse JSON from the LLM output and do basic validation.
@@ -85,6 +236,12 @@ class InMomentTextAgent:
         except json.JSONDecodeError as e:
             raise ValueError(f"InMoment agent: invalid JSON output: {e}") from e
 
+        return self._check_output(obj)
+
+    def _check_output(self, obj: Any) -> Dict[str, Any]:
+        """
+        Basic validation of one parsed output object.
+        """
         if not isinstance(obj, dict):
             raise ValueError("InMoment agent: expected JSON object")
 
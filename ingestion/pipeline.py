@@ -1,88 +1,67 @@
+import atexit
 import random
 from datetime import datetime, timedelta, timezone
-from typing import Dict, Any
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Tuple
 
 from .config import GenerationConfig
 from .schemas.registry import load_schema
 from .generators.structured import StructuredGenerator
-from .llm.inmoment_agent import InMomentTextAgent
+from .llm.inmoment_agent import InMomentTextAgent, InMomentTextResult
+from .providers.base import BaseProvider
+from .providers.caching import VOLATILE_FIELDS, CachingProvider
 from .providers.mock import MockProvider
 from .providers.azure import AzureOpenAIProvider
 from .validators.pydantic_validator import JsonSchemaValidator
 from .sinks.jsonl import JsonlSink
-from .id_state import load_id_state, save_id_state, IdState
+from .id_state import IdAllocator
 
 
-def generate_one_inmoment_record(cfg: GenerationConfig) -> Dict[str, Any]:
-    """
-    Generate a single InMoment record using structured code + LLM, with
-    stable, non-repeating IDs across runs (via ID state).
-    """
-    if cfg.schema_name != "inmoment":
-        raise ValueError("generate_one_inmoment_record: schema_name must be 'inmoment'")
-
-    rng = random.Random(cfg.seed) if cfg.seed is not None else random.Random()
-
-    # 0) Load current ID state
-    state: IdState = load_id_state("inmoment")
-
-    schema = load_schema("inmoment")
-    structured_gen = StructuredGenerator(rng=rng)
+COMPLAINT_TYPES = ["billing", "outage", "pricing", "customer_service", "app"]
 
-    provider = AzureOpenAIProvider() if cfg.provider == "azure" else MockProvider()
-    text_agent = InMomentTextAgent(provider=provider)
-    validator = JsonSchemaValidator(schema)
+CHANNEL_WEIGHTS = [
+    ("web", 0.5),
+    ("mobile", 0.3),
+    ("email", 0.15),
+    ("in_store", 0.05),
+]
 
-    # 1) Structured generation for entire record
-    record: Dict[str, Any] = structured_gen.generate_one(schema)
 
-    # 1a) Customer ID pattern: CUST000, CUST001, ...
-    customer_id_pattern = "CUST{index:03d}"
-    record["customer_id"] = customer_id_pattern.format(index=state.customer_next_index)
-    state.customer_next_index += 1
-
-    # 1b) Survey ID pattern: SUR000, SUR001, ...
-    survey_id_pattern = "SUR{index:03d}"
-    record["survey_id"] = survey_id_pattern.format(index=state.survey_next_index)
-    # Option: either reuse a small set or advance each time; here we advance
-    state.survey_next_index += 1
-
-    # 1c) Response ID pattern: RSP0000000, RSP0000001, ...
-    response_id_pattern = "RSP{index:07d}"
-    record["response_id"] = response_id_pattern.format(index=state.response_next_index)
-    state.response_next_index += 1
-
-    # 1d) Realistic timestamp within a recent window (last 30 days)
-    now = datetime.now(timezone.utc)
+def sample_timestamp(rng: random.Random, now: datetime | None = None) -> str:
+    """
+    Realistic timestamp within a recent window (last 30 days), ISO-8601 UTC.
+    """
+    now = now or datetime.now(timezone.utc)
     days_back = rng.randint(0, 29)
     seconds_in_day = rng.randint(0, 24 * 3600 - 1)
     ts = now - timedelta(days=days_back, seconds=seconds_in_day)
-    record["timestamp"] = ts.isoformat().replace("+00:00", "Z")
-
-    # 1e) More realistic channel distribution
-    channels = [
-        ("web", 0.5),
-        ("mobile", 0.3),
-        ("email", 0.15),
-        ("in_store", 0.05),
-    ]
+    return ts.isoformat().replace("+00:00", "Z")
+
+
+def sample_channel(rng: random.Random) -> str:
+    """
+    Channel drawn from CHANNEL_WEIGHTS.
+    """
     r_channel = rng.random()
     cum = 0.0
-    chosen_channel = "web"
-    for name, weight in channels:
+    for name, weight in CHANNEL_WEIGHTS:
         cum += weight
         if r_channel <= cum:
-            chosen_channel = name
-            break
-    record["channel"] = chosen_channel
+            return name
+    return "web"
 
-    # 2) Build LLM context
+
+def build_inmoment_context(record: Dict[str, Any], rng: random.Random) -> Dict[str, Any]:
+    """
+    LLM context for an InMoment skeleton record (IDs, timestamp, channel set).
+    """
+    # customer_id_int mirrors the CUST index assigned to the record
     try:
-        customer_id_int = int(state.customer_next_index - 1)  # or parse from string if your prompt truly needs int
+        customer_id_int = int(str(record.get("customer_id", "")).removeprefix("CUST"))
     except (TypeError, ValueError):
         customer_id_int = 0
 
-    complaint_type = rng.choice(["billing", "outage", "pricing", "customer_service", "app"])
+    complaint_type = rng.choice(COMPLAINT_TYPES)
 
     responses_ctx = []
     for resp in record.get("responses") or []:
@@ -90,7 +69,7 @@ def generate_one_inmoment_record(cfg: GenerationConfig) -> Dict[str, Any]:
         if qid is not None:
             responses_ctx.append({"question_id": qid})
 
-    context: Dict[str, Any] = {
+    return {
         "customer_id": customer_id_int,
         "nps": record.get("nps"),
         "channel": record.get("channel"),
@@ -100,10 +79,11 @@ def generate_one_inmoment_record(cfg: GenerationConfig) -> Dict[str, Any]:
         "metadata": record.get("metadata", {}),
     }
 
-    # 3) Call LLM agent for comment + answers + tags
-    text_result = text_agent.generate(context)
 
-    # 4) Merge LLM output into record
+def merge_text_result(record: Dict[str, Any], text_result: InMomentTextResult) -> Dict[str, Any]:
+    """
+    Merge text-agent output (comment, answers, tags) into an InMoment record.
+    """
     record["comment"] = text_result.comment
 
     answers_by_qid = {a.get("question_id"): a.get("answer") for a in text_result.answers}
@@ -116,16 +96,231 @@ def generate_one_inmoment_record(cfg: GenerationConfig) -> Dict[str, Any]:
         record["tags"] = text_result.tags
     elif "metadata" in record and isinstance(record["metadata"], dict):
         record["metadata"]["tags"] = text_result.tags
+    return record
+
+
+# Caching providers are shared by every session with the same settings, so
+# per-record helpers (generate_one_inmoment_record) reuse one SQLite
+# connection; they are closed at interpreter exit.
+_CACHING_PROVIDERS: Dict[Tuple, CachingProvider] = {}
+
+
+def _base_provider(cfg: GenerationConfig) -> BaseProvider:
+    if cfg.provider == "azure":
+        return AzureOpenAIProvider()
+    return MockProvider(latency=cfg.mock_latency, jitter=cfg.mock_jitter, seed=cfg.seed)
+
+
+def _build_provider(cfg: GenerationConfig) -> BaseProvider:
+    if cfg.cache_path is None:
+        return _base_provider(cfg)
+    key = (
+        str(Path(cfg.cache_path).resolve()), cfg.cache_mode, cfg.cache_mask_volatile,
+        cfg.provider, cfg.mock_latency, cfg.mock_jitter, cfg.seed,
+    )
+    provider = _CACHING_PROVIDERS.get(key)
+    if provider is None:
+        provider = CachingProvider(
+            _base_provider(cfg), path=cfg.cache_path, mode=cfg.cache_mode,
+            volatile_fields=VOLATILE_FIELDS if cfg.cache_mask_volatile else (),
+        )
+        _CACHING_PROVIDERS[key] = provider
+        atexit.register(provider.close)
+    return provider
+
+
+class InMomentGenerationSession:
+    """
+    Long-lived InMoment generation session.
+
+    Everything that used to be rebuilt per record (ID allocator, schema,
+    structured generator, provider, text agent, validator, sink) is set up
+    once here. IDs come from blocks leased by an IdAllocator, so several
+    sessions/processes can share one state file. Generated records are kept
+    in memory until commit(), which writes them to the sink in a single call;
+    close() also returns unused IDs to the state file.
+
+    Usage:
+        session = InMomentGenerationSession(cfg)
+        for rec in session.generate_many():
+            ...
+    """
+
+    def __init__(self, cfg: GenerationConfig, provider: BaseProvider | None = None) -> None:
+        if cfg.schema_name != "inmoment":
+            raise ValueError("InMomentGenerationSession: schema_name must be 'inmoment'")
 
-    # 5) Final validation
-    validator.validate(record)
+        self.cfg = cfg
+        self._state_dir = Path(cfg.state_dir) if cfg.state_dir else None
+        self._rng = random.Random(cfg.seed) if cfg.seed is not None else random.Random()
 
-    # 6) Persist updated ID state
-    save_id_state("inmoment", state)
+        self.ids = IdAllocator("inmoment", block_size=cfg.id_block_size, state_dir=self._state_dir)
 
-    # 7) Write to sink if desired
-    if cfg.sink == "jsonl":
-        sink = JsonlSink(cfg.output_path)
-        sink.write_many([record])
+        self.schema = load_schema("inmoment")
+        self.structured_gen = StructuredGenerator(rng=self._rng)
+        self.provider = provider or _build_provider(cfg)
+        # A provider passed in belongs to the caller; shared caching ones stay open
+        self._owns_provider = provider is None and cfg.cache_path is None
+        self.text_agent = InMomentTextAgent(provider=self.provider, pack_size=cfg.pack_size)
+        self.validator = JsonSchemaValidator(self.schema)
+        self.sink = JsonlSink(cfg.output_path, **cfg.sink_options) if cfg.sink == "jsonl" else None
 
-    return record
\ No newline at end of file
+        self._pending: List[Dict[str, Any]] = []
+
+    # --- public API ---
+
+    def generate_one(self) -> Dict[str, Any]:
+        """
+        Generate and validate a single record. The record is queued for the
+        sink until commit().
+        """
+        record = self.build_skeleton()
+        context = self.build_context(record)
+        text_result = self.text_agent.generate(context)
+        return self.finalize(record, text_result)
+
+    def generate_many(
+        self, count: int | None = None, commit_every: int | None = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yield `count` records (defaults to cfg.count).
+
+        With cfg.pack_size > 1, contexts are sent to the text agent
+        pack_size at a time (one LLM call per pack).
+
+        Sink writes are committed once at the end of the batch, or every
+        `commit_every` records for long runs. If the consumer stops early or
+        an error is raised, the records produced so far are still committed
+        and unused IDs are released.
+        """
+        total = self.cfg.count if count is None else count
+        try:
+            for i, record in enumerate(self._iter_records(total)):
+                yield record
+                if commit_every and (i + 1) % commit_every == 0:
+                    self.commit()
+        finally:
+            self.close()
+
+    def commit(self) -> None:
+        """
+        Flush pending records to the sink.
+
+        IDs are already reserved in the state file when their block is
+        leased, so a failed write skips IDs rather than reissuing them.
+        """
+        if self._pending:
+            if self.sink is not None:
+                self.sink.write_many(self._pending)
+                self.sink.flush()
+            self._pending = []
+
+    def close(self) -> None:
+        """
+        Commit pending records, close the sink, return unused leased IDs and
+        close the provider if the session built it (not shared cache ones).
+        """
+        try:
+            self.commit()
+            if self.sink is not None:
+                self.sink.close()
+        finally:
+            self.ids.release()
+            if self._owns_provider:
+                self.provider.close()
+
+    def generate_packed(self, n: int) -> List[Dict[str, Any]]:
+        """
+        Generate n records with one packed text-agent call per pack_size.
+        """
+        records = [self.build_skeleton() for _ in range(n)]
+        contexts = [self.build_context(r) for r in records]
+        results = self.text_agent.generate_many(contexts)
+        return [self.finalize(r, res) for r, res in zip(records, results)]
+
+    def _iter_records(self, total: int) -> Iterator[Dict[str, Any]]:
+        pack = self.text_agent.pack_size
+        if pack <= 1:
+            for _ in range(total):
+                yield self.generate_one()
+            return
+        for start in range(0, total, pack):
+            yield from self.generate_packed(min(pack, total - start))
+
+    # --- record assembly ---
+
+    def build_skeleton(self) -> Dict[str, Any]:
+        """
+        Structured part of a record: schema values, IDs, timestamp, channel.
+        Takes the next customer / survey / response IDs from the allocator.
+        """
+        rng = self._rng
+        ids = self.ids
+
+        # 1) Structured generation for entire record
+        record: Dict[str, Any] = self.structured_gen.generate_one(self.schema)
+
+        # 1a) Customer ID pattern: CUST000, CUST001, ...
+        customer_id_pattern = "CUST{index:03d}"
+        record["customer_id"] = customer_id_pattern.format(index=ids.next_index("customer"))
+
+        # 1b) Survey ID pattern: SUR000, SUR001, ...
+        survey_id_pattern = "SUR{index:03d}"
+        # Option: either reuse a small set or advance each time; here we advance
+        record["survey_id"] = survey_id_pattern.format(index=ids.next_index("survey"))
+
+        # 1c) Response ID pattern: RSP0000000, RSP0000001, ...
+        response_id_pattern = "RSP{index:07d}"
+        record["response_id"] = response_id_pattern.format(index=ids.next_index("response"))
+
+        # 1d) Realistic timestamp within a recent window (last 30 days)
+        record["timestamp"] = sample_timestamp(rng)
+
+        # 1e) More realistic channel distribution
+        record["channel"] = sample_channel(rng)
+
+        return record
+
+    def build_context(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Build the LLM context for a skeleton record.
+        """
+        return build_inmoment_context(record, self._rng)
+
+    def finalize(self, record: Dict[str, Any], text_result: InMomentTextResult) -> Dict[str, Any]:
+        """
+        Merge LLM output into the record, validate it and queue it for the sink.
+        """
+        merge_text_result(record, text_result)
+        self.validator.validate(record)
+        self._pending.append(record)
+        return record
+
+
+def generate_many_inmoment_records(
+    cfg: GenerationConfig, commit_every: int | None = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Generate cfg.count InMoment records with a single session: setup happens
+    once, IDs are leased in blocks and sink writes are committed once per batch.
+    """
+    session = InMomentGenerationSession(cfg)
+    yield from session.generate_many(commit_every=commit_every)
+
+
+def generate_one_inmoment_record(cfg: GenerationConfig) -> Dict[str, Any]:
+    """
+    Generate a single InMoment record using structured code + LLM, with
+    stable, non-repeating IDs across runs (via ID state).
+
+    Builds a fresh session per call; prefer generate_many_inmoment_records
+    for more than a handful of records.
+    """
+    if cfg.schema_name != "inmoment":
+        raise ValueError("generate_one_inmoment_record: schema_name must be 'inmoment'")
+
+    session = InMomentGenerationSession(cfg)
+    try:
+        return session.generate_one()
+    finally:
+        session.close()
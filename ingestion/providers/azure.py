@@ -3,7 +3,7 @@ from typing import Any
 
 from dotenv import load_dotenv
 from .base import BaseProvider
-from openai import AzureOpenAI  # pip install openai
+from openai import AzureOpenAI, AsyncAzureOpenAI  # pip install openai
 
 load_dotenv()
 
@@ -37,6 +37,12 @@ class AzureOpenAIProvider(BaseProvider):
             api_version=api_version,
             azure_endpoint=endpoint,
         )
+        # Native async client so many requests can be in flight at once
+        self._aclient = AsyncAzureOpenAI(
+            api_key=api_key,
+            api_version=api_version,
+            azure_endpoint=endpoint,
+        )
 
     def generate_text(self, prompt: str, **kwargs: Any) -> str:
 
@@ -49,4 +55,20 @@ class AzureOpenAIProvider(BaseProvider):
 
         text = response.choices[0].message.content or ""
         # Strip whitespace only; prompt must ensure output is pure JSON
-        return text.strip()
\ No newline at end of file
+        return text.strip()
+
+    async def agenerate_text(self, prompt: str, **kwargs: Any) -> str:
+
+        response = await self._aclient.chat.completions.create(
+            model=self.deployment_name,
+            messages=[
+                {"role": "user", "content": prompt},
+            ],
+        )
+
+        text = response.choices[0].message.content or ""
+        return text.strip()
+
+    def close(self) -> None:
+        # The async client's pool is closed with the event loop that used it
+        self._client.close()
@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC, abstractmethod
 from typing import Any
 
@@ -5,4 +6,25 @@ from typing import Any
 class BaseProvider(ABC):
     @abstractmethod
     def generate_text(self, prompt: str, **kwargs: Any) -> str:
-        ...
\ No newline at end of file
+        ...
+
+    async def agenerate_text(self, prompt: str, **kwargs: Any) -> str:
+        """
+        Async variant of generate_text.
+
+        Default runs the blocking call in a worker thread so any provider can
+        be driven by the async engine; providers with a native async client
+        should override this.
+        """
+        return await asyncio.to_thread(self.generate_text, prompt, **kwargs)
+
+    def close(self) -> None:
+        """
+        Release clients / connections. Default: nothing to release.
+        """
+
+    def __enter__(self) -> "BaseProvider":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
@@ -0,0 +1,232 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Literal
+
+from .base import BaseProvider
+
+CacheMode = Literal["read_write", "replay", "record"]
+
+_DEFAULT_PATH = Path(__file__).parent.parent.parent / "state" / "llm_cache.sqlite"
+_WS = re.compile(r"\s+")
+
+# Context fields that differ on every record (IDs, timestamps). Masking them
+# lets records share one cached completion, so it is opt-in and meant for
+# benchmark replay only: real output must not reuse another customer's text
+VOLATILE_FIELDS = ("customer_id", "complaint_time", "response_id", "survey_id", "timestamp")
+_JSON_SCALAR = r'"(?:[^"\\]|\\.)*"|-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?|true|false|null'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key         TEXT PRIMARY KEY,
+    response    TEXT NOT NULL,
+    size        INTEGER NOT NULL,
+    created_at  REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at);
+"""
+
+
+class CacheMissError(KeyError):
+    """
+    Raised in replay mode when a prompt has no recorded response.
+    """
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    evictions: int = 0
+
+
+class CachingProvider(BaseProvider):
+    """
+    Content-addressed, on-disk (SQLite) response cache around any provider.
+
+    The key is a SHA-256 of the namespace, the prompt (whitespace-collapsed
+    when `normalize` is set, so near-identical prompts share an entry) and
+    the call kwargs. By default the whole prompt is keyed, so every record
+    gets its own completion. For benchmark replay, `volatile_fields` (e.g.
+    VOLATILE_FIELDS) masks those values in the prompt's embedded JSON
+    ("customer_id": 17, ...) so records that differ only in IDs or
+    timestamps share an entry; never use it for data that is kept.
+
+    The provider holds one SQLite connection for its lifetime; close() (or
+    leaving a `with` block) closes it and the wrapped provider.
+
+    Modes:
+      - "read_write": serve hits, call the provider on a miss and store it
+      - "replay":     serve hits only; a miss raises CacheMissError
+                      (offline benchmarks over recorded outputs)
+      - "record":     always call the provider and overwrite the entry
+
+    Eviction is least-recently-used once `max_entries` or `max_bytes` is
+    exceeded; entries older than `ttl` seconds are treated as misses.
+
+    Usage:
+        provider = CachingProvider(AzureOpenAIProvider(), path="state/llm_cache.sqlite")
+    """
+
+    def __init__(
+        self,
+        provider: BaseProvider,
+        path: str | Path | None = None,
+        mode: CacheMode = "read_write",
+        namespace: str | None = None,
+        ttl: float | None = None,
+        max_entries: int | None = None,
+        max_bytes: int | None = None,
+        normalize: bool = True,
+        volatile_fields: tuple[str, ...] = (),
+    ) -> None:
+        if mode not in ("read_write", "replay", "record"):
+            raise ValueError(f"CachingProvider: unknown mode {mode!r}")
+        self._provider = provider
+        self.mode = mode
+        self.namespace = namespace or _default_namespace(provider)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.normalize = normalize
+        self._volatile = (
+            re.compile(r'"(%s)"\s*:\s*(?:%s)' % ("|".join(map(re.escape, volatile_fields)), _JSON_SCALAR))
+            if volatile_fields else None
+        )
+        self.stats = CacheStats()
+
+        self.path = Path(path) if path is not None else _DEFAULT_PATH
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    # --- provider API ---
+
+    def generate_text(self, prompt: str, **kwargs: Any) -> str:
+        key = self.key_for(prompt, **kwargs)
+        if self.mode != "record":
+            hit = self._get(key)
+            if hit is not None:
+                return hit
+        self._check_miss(key)
+        text = self._provider.generate_text(prompt, **kwargs)
+        self._put(key, text)
+        return text
+
+    async def agenerate_text(self, prompt: str, **kwargs: Any) -> str:
+        key = self.key_for(prompt, **kwargs)
+        if self.mode != "record":
+            hit = self._get(key)
+            if hit is not None:
+                return hit
+        self._check_miss(key)
+        text = await self._provider.agenerate_text(prompt, **kwargs)
+        self._put(key, text)
+        return text
+
+    # --- cache management ---
+
+    def key_for(self, prompt: str, **kwargs: Any) -> str:
+        if self._volatile is not None:
+            prompt = self._volatile.sub(r'"\1": "*"', prompt)
+        if self.normalize:
+            prompt = _WS.sub(" ", prompt).strip()
+        payload = json.dumps(
+            [self.namespace, prompt, kwargs], sort_keys=True, ensure_ascii=False, default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is None:
+                return
+            self._conn.close()
+            self._conn = None
+        self._provider.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    # --- internal ---
+
+    def _check_miss(self, key: str) -> None:
+        self.stats.misses += 1
+        if self.mode == "replay":
+            raise CacheMissError(f"CachingProvider: no recorded response for key {key[:12]}…")
+
+    def _get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            response, created_at = row
+            if self.ttl is not None and now - created_at > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            # Access time only matters for LRU eviction
+            if self.max_entries is not None or self.max_bytes is not None:
+                self._conn.execute(
+                    "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+                )
+        self.stats.hits += 1
+        return response
+
+    def _put(self, key: str, text: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, text, len(text.encode("utf-8")), now, now),
+            )
+            self.stats.writes += 1
+            self._evict()
+
+    def _evict(self) -> None:
+        # Caller holds self._lock
+        conn = self._conn
+        if self.max_entries is not None:
+            count = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            excess = count - self.max_entries
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY accessed_at LIMIT ?)",
+                    (excess,),
+                )
+                self.stats.evictions += excess
+        if self.max_bytes is not None:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            while total > self.max_bytes:
+                row = conn.execute(
+                    "SELECT key, size FROM responses ORDER BY accessed_at LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    break
+                conn.execute("DELETE FROM responses WHERE key = ?", (row[0],))
+                total -= row[1]
+                self.stats.evictions += 1
+
+
+def _default_namespace(provider: BaseProvider) -> str:
+    name = type(provider).__name__
+    deployment = getattr(provider, "deployment_name", None)
+    return f"{name}:{deployment}" if deployment else name
@@ -1,10 +1,59 @@
+import asyncio
+import json
+import random
+import re
+import time
 from typing import Any
 
 from .base import BaseProvider
 
+# Packed InMoment prompts list their contexts as {"index": i, "context": {...}}
+_PACKED_ITEM = re.compile(r'"index": (\d+), "context": ')
+
 
 class MockProvider(BaseProvider):
+    """
+    Offline provider returning a fixed, valid InMoment agent payload.
+
+    latency / jitter (seconds) simulate LLM round-trip time: each call sleeps
+    for latency + uniform(0, jitter). Both default to 0 (no delay).
+
+    Packed (multi-context) prompts get a JSON array with one indexed payload
+    per context.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, seed: int | None = None) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+
     def generate_text(self, prompt: str, **kwargs: Any) -> str:
+        delay = self._delay()
+        if delay:
+            time.sleep(delay)
+        return self._payload(prompt)
+
+    async def agenerate_text(self, prompt: str, **kwargs: Any) -> str:
+        delay = self._delay()
+        if delay:
+            await asyncio.sleep(delay)
+        return self._payload(prompt)
+
+    # --- internal ---
+
+    def _delay(self) -> float:
+        if self.jitter:
+            return self.latency + self._rng.uniform(0, self.jitter)
+        return self.latency
+
+    def _payload(self, prompt: str) -> str:
+        indices = _PACKED_ITEM.findall(prompt)
+        if indices:
+            single = json.loads(self._single_payload())
+            return json.dumps([{"index": int(i), **single} for i in indices])
+        return self._single_payload()
+
+    def _single_payload(self) -> str:
         # Minimal, valid JSON the agent can parse
         return """
         {
@@ -15,4 +64,4 @@ class MockProvider(BaseProvider):
           ],
           "tags": ["billing", "web"]
         }
-        """
\ No newline at end of file
+        """
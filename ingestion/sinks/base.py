@@ -0,0 +1,29 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable
+
+
+class BaseSink(ABC):
+    """
+    Destination for generated records.
+
+    Sinks may hold resources (open files, buffers); use them as context
+    managers or call close() when done.
+    """
+
+    @abstractmethod
+    def write_many(self, records: Iterable[Dict[str, Any]]) -> None:
+        ...
+
+    def flush(self) -> None:
+        """
+        Push buffered records to the underlying storage.
+        """
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self) -> "BaseSink":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
@@ -1,14 +1,187 @@
 import json
+import os
+import re
+import time
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, Iterable
+from typing import Any, BinaryIO, Dict, Iterable, List, Literal, Tuple
 
+from .base import BaseSink
 
-class JsonlSink:
-    def __init__(self, path: str | Path):
+FsyncPolicy = Literal["none", "every_n", "interval"]
+
+
+@dataclass
+class SinkStats:
+    records_written: int = 0
+    bytes_written: int = 0
+    files_opened: int = 0
+    fsyncs: int = 0
+    current_path: str | None = None
+
+
+class JsonlSink(BaseSink):
+    """
+    Long-lived, buffered JSON Lines sink.
+
+    The file is opened once (append mode) and kept open until close();
+    writes go through a `buffer_size`-byte buffer.
+
+    Durability (fsync):
+      - "none":     leave it to the OS
+      - "every_n":  fsync after every `fsync_every` records
+      - "interval": fsync when `fsync_interval` seconds have passed
+
+    Rotation: with `max_bytes` and/or `max_records` set, output goes to
+    <stem>-00000<suffix>, <stem>-00001<suffix>, ... next to `path`, starting
+    a new file before a write would exceed either limit. Re-opening resumes
+    the highest existing part.
+
+    Usage:
+        with JsonlSink("out.jsonl", max_records=100_000) as sink:
+            sink.write_many(records)
+        print(sink.stats)
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        buffer_size: int = 1 << 20,
+        fsync: FsyncPolicy = "none",
+        fsync_every: int = 1000,
+        fsync_interval: float = 1.0,
+        max_bytes: int | None = None,
+        max_records: int | None = None,
+    ):
+        if fsync not in ("none", "every_n", "interval"):
+            raise ValueError(f"JsonlSink: unknown fsync policy {fsync!r}")
         self._path = Path(path)
+        self._buffer_size = buffer_size
+        self._fsync = fsync
+        self._fsync_every = max(1, fsync_every)
+        self._fsync_interval = fsync_interval
+        self._max_bytes = max_bytes
+        self._max_records = max_records
+        self._encode = json.JSONEncoder(ensure_ascii=False).encode
+
+        self._fh: BinaryIO | None = None
+        self._part = 0
+        self._file_bytes = 0
+        self._file_records = 0
+        self._since_fsync = 0
+        self._last_fsync = time.monotonic()
+        self.stats = SinkStats()
+
+    @property
+    def rotating(self) -> bool:
+        return self._max_bytes is not None or self._max_records is not None
 
     def write_many(self, records: Iterable[Dict[str, Any]]) -> None:
+        fh = self._fh or self._open()
+        encode = self._encode
+        stats = self.stats
+        for rec in records:
+            data = (encode(rec) + "\n").encode("utf-8")
+            if self.rotating and self._needs_rotation(len(data)):
+                fh = self._rotate()
+            fh.write(data)
+            self._file_bytes += len(data)
+            self._file_records += 1
+            stats.bytes_written += len(data)
+            stats.records_written += 1
+            self._since_fsync += 1
+            if self._fsync == "every_n" and self._since_fsync >= self._fsync_every:
+                self._sync()
+        if self._fsync == "interval" and self._since_fsync:
+            if time.monotonic() - self._last_fsync >= self._fsync_interval:
+                self._sync()
+
+    def flush(self) -> None:
+        if self._fh is not None:
+            self._fh.flush()
+
+    def close(self) -> None:
+        if self._fh is None:
+            return
+        if self._fsync != "none" and self._since_fsync:
+            self._sync()
+        self._fh.close()
+        self._fh = None
+
+    def part_paths(self) -> List[Path]:
+        """
+        Existing output files, in write order.
+        """
+        if not self.rotating:
+            return [self._path] if self._path.exists() else []
+        return [path for _, path in sorted(self._indexed_parts())]
+
+    # --- internal ---
+
+    def _indexed_parts(self) -> List[Tuple[int, Path]]:
+        # Only <stem>-<digits><suffix>; stray files like out-old.jsonl are ignored
+        pattern = re.compile(rf"{re.escape(self._path.stem)}-(\d+){re.escape(self._path.suffix)}")
+        parts = []
+        for path in self._path.parent.glob(f"{self._path.stem}-*{self._path.suffix}"):
+            match = pattern.fullmatch(path.name)
+            if match:
+                parts.append((int(match.group(1)), path))
+        return parts
+
+    def _part_path(self, index: int) -> Path:
+        if not self.rotating:
+            return self._path
+        return self._path.with_name(f"{self._path.stem}-{index:05d}{self._path.suffix}")
+
+    def _open(self) -> BinaryIO:
         self._path.parent.mkdir(parents=True, exist_ok=True)
-        with self._path.open("a", encoding="utf-8") as f:
-            for rec in records:
-                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
\ No newline at end of file
+        if self.rotating:
+            parts = self._indexed_parts()
+            if parts:
+                self._part = max(parts)[0]
+        path = self._part_path(self._part)
+        self._file_bytes = path.stat().st_size if path.exists() else 0
+        if self._max_bytes is not None and self._file_bytes >= self._max_bytes:
+            # The resumed part is already full: start the next one
+            self._part += 1
+            path = self._part_path(self._part)
+            self._file_bytes = path.stat().st_size if path.exists() else 0
+        self._file_records = self._count_lines(path) if self._max_records and self._file_bytes else 0
+        self._fh = path.open("ab", buffering=self._buffer_size)
+        self.stats.files_opened += 1
+        self.stats.current_path = str(path)
+        return self._fh
+
+    def _needs_rotation(self, size: int) -> bool:
+        # A fresh file always takes at least one record, however large
+        if self._file_records == 0 and self._file_bytes == 0:
+            return False
+        if self._max_records is not None and self._file_records >= self._max_records:
+            return True
+        return self._max_bytes is not None and self._file_bytes + size > self._max_bytes
+
+    def _rotate(self) -> BinaryIO:
+        self.close()
+        self._part += 1
+        path = self._part_path(self._part)
+        self._file_bytes = 0
+        self._file_records = 0
+        self._fh = path.open("ab", buffering=self._buffer_size)
+        self.stats.files_opened += 1
+        self.stats.current_path = str(path)
+        return self._fh
+
+    def _sync(self) -> None:
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+        self.stats.fsyncs += 1
+        self._since_fsync = 0
+        self._last_fsync = time.monotonic()
+
+    @staticmethod
+    def _count_lines(path: Path) -> int:
+        count = 0
+        with path.open("rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                count += chunk.count(b"\n")
+        return count
@@ -0,0 +1,165 @@
+"""
+Generate specialised Python check functions for simple JSON schemas.
+
+compile_fast_check(schema) returns a function `check(instance) -> bool`
+built from generated source, or None when the schema uses keywords the
+generator does not handle. The check is only an accelerator: True means
+the instance is definitely valid, False means "run the full validator"
+(it may be stricter than jsonschema, e.g. it rejects 1.0 for "integer").
+"""
+import math
+from typing import Any, Callable, Dict, List
+
+FastCheck = Callable[[Any], bool]
+
+# Keywords that are either checked here or are pure annotations
+_SUPPORTED = {
+    "type",
+    "properties",
+    "required",
+    "enum",
+    "minimum",
+    "maximum",
+    "items",
+    "additionalProperties",
+    "format",  # annotation only: jsonschema does not assert format by default
+    "title",
+    "description",
+}
+
+_TYPE_FAIL = {
+    "object": "not isinstance({v}, dict)",
+    "array": "not isinstance({v}, list)",
+    "string": "not isinstance({v}, str)",
+    "integer": "not isinstance({v}, int) or isinstance({v}, bool)",
+    "number": "not isinstance({v}, (int, float)) or isinstance({v}, bool)",
+    "boolean": "not isinstance({v}, bool)",
+    "null": "{v} is not None",
+}
+
+_IS_NUMBER = "isinstance({v}, (int, float)) and not isinstance({v}, bool)"
+
+
+class _Unsupported(Exception):
+    pass
+
+
+class _Emitter:
+    def __init__(self) -> None:
+        self.consts: Dict[str, Any] = {}
+        self._n = 0
+
+    def var(self) -> str:
+        self._n += 1
+        return f"v{self._n}"
+
+    def const(self, value: Any) -> str:
+        name = f"c{len(self.consts)}"
+        self.consts[name] = value
+        return name
+
+    def emit(self, schema: Any, v: str, depth: int) -> List[str]:
+        """
+        Return source lines (indented at `depth`) that `return False` when
+        `v` does not satisfy `schema`.
+        """
+        if schema is True:
+            return []
+        if not isinstance(schema, dict) or set(schema) - _SUPPORTED:
+            raise _Unsupported
+        pad = "    " * depth
+        lines: List[str] = []
+
+        t = schema.get("type")
+        if t is not None:
+            # Union types (["string", "null"]) are left to jsonschema
+            if not isinstance(t, str) or t not in _TYPE_FAIL:
+                raise _Unsupported
+            lines.append(f"{pad}if {_TYPE_FAIL[t].format(v=v)}: return False")
+
+        if "enum" in schema:
+            values = schema["enum"]
+            if not all(isinstance(x, str) for x in values):
+                raise _Unsupported
+            c = self.const(frozenset(values))
+            if t == "string":
+                lines.append(f"{pad}if {v} not in {c}: return False")
+            else:
+                lines.append(f"{pad}if not (isinstance({v}, str) and {v} in {c}): return False")
+
+        for key, op in (("minimum", "<"), ("maximum", ">")):
+            if key in schema:
+                bound = schema[key]
+                # inf / nan have no literal repr: leave them to jsonschema
+                if isinstance(bound, bool) or not isinstance(bound, (int, float)) or not math.isfinite(bound):
+                    raise _Unsupported
+                guard = "" if t in ("integer", "number") else f"{_IS_NUMBER.format(v=v)} and "
+                lines.append(f"{pad}if {guard}{v} {op} {bound!r}: return False")
+
+        ap = schema.get("additionalProperties", True)
+        if ap is not True and ap != {}:
+            raise _Unsupported
+
+        obj_lines: List[str] = []
+        obj_depth = depth if t == "object" else depth + 1
+        obj_pad = "    " * obj_depth
+        for key in schema.get("required", []):
+            obj_lines.append(f"{obj_pad}if {key!r} not in {v}: return False")
+        for key, sub in schema.get("properties", {}).items():
+            sv = self.var()
+            body = self.emit(sub, sv, obj_depth + 1)
+            if body:
+                obj_lines.append(f"{obj_pad}if {key!r} in {v}:")
+                obj_lines.append(f"{obj_pad}    {sv} = {v}[{key!r}]")
+                obj_lines.extend(body)
+        if obj_lines:
+            if t != "object":
+                lines.append(f"{pad}if isinstance({v}, dict):")
+            lines.extend(obj_lines)
+
+        if "items" in schema:
+            items = schema["items"]
+            if not isinstance(items, dict):
+                raise _Unsupported
+            arr_depth = depth if t == "array" else depth + 1
+            iv = self.var()
+            body = self.emit(items, iv, arr_depth + 1)
+            if body:
+                if t != "array":
+                    lines.append(f"{pad}if isinstance({v}, list):")
+                lines.append(f"{'    ' * arr_depth}for {iv} in {v}:")
+                lines.extend(body)
+
+        return lines
+
+
+def generate_source(schema: Dict[str, Any]) -> str | None:
+    """
+    Return the generated source for `schema`'s check function, or None if
+    the schema is not simple enough.
+    """
+    return _generate(schema)[0]
+
+
+def compile_fast_check(schema: Dict[str, Any]) -> FastCheck | None:
+    # The fast path is optional: any generator failure means "no fast path",
+    # never an error for a schema jsonschema itself accepts
+    try:
+        source, consts = _generate(schema)
+        if source is None:
+            return None
+        namespace: Dict[str, Any] = dict(consts)
+        exec(compile(source, "<jsonschema-fast-check>", "exec"), namespace)
+        return namespace["check"]
+    except Exception:
+        return None
+
+
+def _generate(schema: Dict[str, Any]):
+    emitter = _Emitter()
+    try:
+        body = emitter.emit(schema, "v0", 1)
+    except _Unsupported:
+        return None, {}
+    source = "\n".join(["def check(v0):", *body, "    return True", ""])
+    return source, emitter.consts
@@ -1,11 +1,67 @@
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, List, Tuple
 
 import jsonschema
+from jsonschema.exceptions import ValidationError, best_match
+
+from .codegen import FastCheck, compile_fast_check
+
+# id(schema) -> (schema, compiled validator, fast check or None).
+# The schema is kept alongside so its id cannot be reused while cached.
+_CACHE: dict[int, Tuple[Dict[str, Any], Any, FastCheck | None]] = {}
+
+
+def _compiled(schema: Dict[str, Any]) -> Tuple[Any, FastCheck | None]:
+    """
+    Check the schema and build its validator once per schema object.
+    Registry schemas are cached dicts, so this is once per schema name.
+    """
+    cached = _CACHE.get(id(schema))
+    if cached is not None and cached[0] is schema:
+        return cached[1], cached[2]
+
+    cls = jsonschema.validators.validator_for(schema)
+    cls.check_schema(schema)
+    validator = cls(schema)
+    fast_check = compile_fast_check(schema)
+    _CACHE[id(schema)] = (schema, validator, fast_check)
+    return validator, fast_check
 
 
 class JsonSchemaValidator:
-    def __init__(self, schema: Dict[str, Any]):
-            self._schema = schema
+    """
+    JSON Schema validation with a precompiled, cached validator.
+
+    With fast_path=True, simple schemas (those in schemas/definitions) also
+    get a generated check function; records it accepts skip jsonschema
+    entirely, anything else goes through the full validator so errors are
+    identical to jsonschema.validate.
+    """
+
+    def __init__(self, schema: Dict[str, Any], fast_path: bool = True):
+        self._schema = schema
+        self._validator, fast_check = _compiled(schema)
+        self._fast_check = fast_check if fast_path else None
 
     def validate(self, record: Dict[str, Any]) -> None:
-            jsonschema.validate(instance=record, schema=self._schema)
\ No newline at end of file
+        if self._fast_check is not None and self._fast_check(record):
+            return
+        error = best_match(self._validator.iter_errors(record))
+        if error is not None:
+            raise error
+
+    def iter_errors(self, record: Dict[str, Any]) -> List[ValidationError]:
+        """
+        All validation errors for one record (empty if valid).
+        """
+        if self._fast_check is not None and self._fast_check(record):
+            return []
+        return list(self._validator.iter_errors(record))
+
+    def validate_many(self, records: Iterable[Dict[str, Any]]) -> List[List[ValidationError]]:
+        """
+        Validate a batch without stopping at the first failure.
+
+        Returns one list of errors per input record, in order; an empty list
+        means the record is valid.
+        """
+        return [self.iter_errors(record) for record in records]
@@ -0,0 +1,57 @@
+import os
+
+import httpx
+from openai import DefaultHttpxClient
+
+# --------------------------------------------------
+# Single-shot agent calls
+# --------------------------------------------------
+# Pipeline agents (CSI, escalation, data creation) are stateless: every record
+# is one input -> one output and the conversation is never reused. Creating a
+# conversation first costs an extra network round trip per record, so by
+# default responses.create is called without one.
+#
+# Set AGENT_USE_CONVERSATIONS=1 to restore the old conversations.create()
+# + responses.create() behaviour (e.g. to inspect runs per conversation in the
+# portal). Conversations are deliberately not pooled/reused: a reused
+# conversation carries earlier turns into the next record's context.
+USE_CONVERSATIONS = os.getenv("AGENT_USE_CONVERSATIONS", "0").lower() in ("1", "true", "yes")
+
+
+def agent_reference(agent_name: str) -> dict:
+    return {"agent": {"name": agent_name, "type": "agent_reference"}}
+
+
+def call_agent_text(openai_client, agent_name: str, input_text: str, use_conversation: bool | None = None) -> str:
+    """Invoke an agent once and return its raw output text."""
+    if use_conversation is None:
+        use_conversation = USE_CONVERSATIONS
+
+    kwargs = {}
+    if use_conversation:
+        conversation = openai_client.conversations.create()
+        kwargs["conversation"] = conversation.id
+
+    response = openai_client.responses.create(
+        input=input_text,
+        extra_body=agent_reference(agent_name),
+        **kwargs,
+    )
+    return response.output_text
+
+# --------------------------------------------------
+# HTTP connection pool sized to the worker count
+# --------------------------------------------------
+def pooled_http_client(max_connections: int, timeout: float = 120.0) -> httpx.Client:
+    """
+    httpx client for get_openai_client(http_client=...) with enough
+    keep-alive connections for every worker thread, so concurrent calls
+    reuse TLS connections instead of queueing or reconnecting.
+    """
+    return DefaultHttpxClient(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        ),
+        timeout=timeout,
+    )
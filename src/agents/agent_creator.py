@@ -1,99 +1,109 @@
 import os
+import sys
 from pathlib import Path
 
 from dotenv import load_dotenv
-from azure.identity import DefaultAzureCredential
-from azure.ai.projects import AIProjectClient
-from azure.ai.projects.models import PromptAgentDefinition
 from src.config.paths import ENV, AGENT_PROMPTS_DIR
+from src.agents.clients import get_project_client
 
 # --------------------------------------------------
-# Load environment
+# Agent creator
 # --------------------------------------------------
-load_dotenv(ENV)
+# Nothing runs at import time: main() asks for the agent name, registers a
+# new agent (.env key + blank prompt file, no Azure access needed) or
+# creates a new version of an existing one (needs MODEL_DEPLOYMENT_NAME and
+# the project client).
 
-PROJECT_ENDPOINT = os.environ["PROJECT_ENDPOINT"]
-MODEL_DEPLOYMENT_NAME = os.environ["MODEL_DEPLOYMENT_NAME"]
-
-# Ensure prompt directory exists
-AGENT_PROMPTS_DIR.mkdir(parents=True, exist_ok=True)
-
-# --------------------------------------------------
-# Azure Project client
-# --------------------------------------------------
-project_client = AIProjectClient(
-    endpoint=PROJECT_ENDPOINT,
-    credential=DefaultAzureCredential(),
-)
-
-# --------------------------------------------------
-# Agent name input
-# --------------------------------------------------
-AGENT_KEY = input("Provide the name for the agent: ").strip().upper()
 
 def to_agent_name(agent_key: str) -> str:
     """Convert ENV key to kebab-case agent name"""
     return agent_key.lower().replace("_", "-")
 
+
+def prompt_path(agent_name: str) -> Path:
+    return AGENT_PROMPTS_DIR / f"{agent_name}-prompt.txt"
+
 # --------------------------------------------------
 # New agent bootstrap
 # --------------------------------------------------
-if AGENT_KEY not in os.environ:
-    AGENT_NAME = to_agent_name(AGENT_KEY)
-    PROMPT_FILE = f"{AGENT_NAME}-prompt.txt"
-    PROMPT_PATH = AGENT_PROMPTS_DIR / PROMPT_FILE
+def register_agent(agent_key: str) -> Path:
+    agent_name = to_agent_name(agent_key)
+    path = prompt_path(agent_name)
 
     # 1. Append agent key to .env
     with ENV.open("a", encoding="utf-8") as env:
-        env.write(f"\n{AGENT_KEY}={AGENT_NAME}\n")
+        env.write(f"\n{agent_key}={agent_name}\n")
 
     # 2. Create blank prompt file
-    with PROMPT_PATH.open("w", encoding="utf-8") as f:
+    with path.open("w", encoding="utf-8") as f:
         f.write(
             "### Instructions\n"
             "Describe the agent's role, inputs, outputs, and constraints here.\n"
         )
 
     print(" New agent registered")
-    print(f"   AGENT KEY     : {AGENT_KEY}")
-    print(f"   AGENT NAME  : {AGENT_NAME}")
-    print(f"   PROMPT FILE : {PROMPT_PATH}")
+    print(f"   AGENT KEY     : {agent_key}")
+    print(f"   AGENT NAME  : {agent_name}")
+    print(f"   PROMPT FILE : {path}")
     print("\n Edit the prompt file, then rerun this script to create the agent.")
-    exit(0)
+    return path
 
 # --------------------------------------------------
 # Existing agent update
 # --------------------------------------------------
-AGENT_NAME = os.environ[AGENT_KEY]
-PROMPT_PATH = AGENT_PROMPTS_DIR / f"{AGENT_NAME}-prompt.txt"
+def load_prompt(path: Path) -> str:
+    if not path.exists():
+        raise FileNotFoundError(f"Prompt file missing: {path}")
+    with path.open("r", encoding="utf-8") as f:
+        prompt = f.read().strip()
+    if not prompt:
+        raise ValueError("Prompt file is empty. Fill it before creating agent.")
+    return prompt
+
+
+def create_agent_version(agent_name: str):
+    from azure.ai.projects.models import PromptAgentDefinition
+
+    model_deployment_name = os.environ["MODEL_DEPLOYMENT_NAME"]
+    prompt = load_prompt(prompt_path(agent_name))
+
+    print(f"Creating new version for agent: {agent_name}")
+    agent = get_project_client().agents.create_version(
+        agent_name=agent_name,
+        definition=PromptAgentDefinition(
+            model=model_deployment_name,
+            instructions=prompt,
+        ),
+    )
+
+    print(
+        f"  Agent version created\n"
+        f"   ID      : {agent.id}\n"
+        f"   Name    : {agent.name}\n"
+        f"   Version : {agent.version}"
+    )
+    return agent
 
-if not PROMPT_PATH.exists():
-    raise FileNotFoundError(f"Prompt file missing: {PROMPT_PATH}")
+# --------------------------------------------------
+# Main
+# --------------------------------------------------
+def main():
+    load_dotenv(ENV)
 
-def load_prompt() -> str:
-    with PROMPT_PATH.open("r", encoding="utf-8") as f:
-        return f.read().strip()
+    # Ensure prompt directory exists
+    AGENT_PROMPTS_DIR.mkdir(parents=True, exist_ok=True)
 
-prompt = load_prompt()
-if not prompt:
-    raise ValueError("Prompt file is empty. Fill it before creating agent.")
+    agent_key = input("Provide the name for the agent: ").strip().upper()
+    if not agent_key:
+        sys.exit("An agent name is required.")
 
-print(f"Creating new version for agent: {AGENT_NAME}")
+    if agent_key not in os.environ:
+        register_agent(agent_key)
+        return
 
-# --------------------------------------------------
-# Create agent version
-# --------------------------------------------------
-agent = project_client.agents.create_version(
-    agent_name=AGENT_NAME,
-    definition=PromptAgentDefinition(
-        model=MODEL_DEPLOYMENT_NAME,
-        instructions=prompt,
-    ),
-)
-
-print(
-    f"  Agent version created\n"
-    f"   ID      : {agent.id}\n"
-    f"   Name    : {agent.name}\n"
-    f"   Version : {agent.version}"
-)
+    # Project client is only built here: registering a new agent needs no Azure access
+    create_agent_version(os.environ[agent_key])
+
+
+if __name__ == "__main__":
+    main()
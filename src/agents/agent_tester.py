@@ -1,27 +1,13 @@
 import os
 from dotenv import load_dotenv
-from azure.identity import DefaultAzureCredential
-from azure.ai.projects import AIProjectClient
 from src.config.paths import ENV
+from src.agents.clients import get_openai_client
 
 # --------------------------------------------------
 # Load environment variables
 # --------------------------------------------------
 load_dotenv(ENV)
 
-PROJECT_ENDPOINT = os.getenv("PROJECT_ENDPOINT")
-if not PROJECT_ENDPOINT:
-    raise ValueError("PROJECT_ENDPOINT not set in .env")
-
-# --------------------------------------------------
-# Initialize Azure AI Project client
-# --------------------------------------------------
-project_client = AIProjectClient(
-    endpoint=PROJECT_ENDPOINT,
-    credential=DefaultAzureCredential(),
-)
-openai_client = project_client.get_openai_client()
-
 # --------------------------------------------------
 # Agent interaction
 # --------------------------------------------------
@@ -39,6 +25,7 @@ def main():
         raise ValueError("Prompt cannot be empty")
 
     # Create conversation
+    openai_client = get_openai_client()
     conversation = openai_client.conversations.create()
     print(f"\nConversation ID: {conversation.id}")
 
@@ -0,0 +1,112 @@
+import os
+import threading
+
+from dotenv import load_dotenv
+from src.config.paths import ENV
+from src.agents.agent_calls import pooled_http_client
+
+# --------------------------------------------------
+# Lazy, shared Azure client registry
+# --------------------------------------------------
+# Nothing here touches Azure at import time. The first call to
+# get_project_client() / get_openai_client() loads .env, builds one shared
+# DefaultAzureCredential (so its token cache is reused by every client) and
+# the clients themselves; later calls from any module return the cached ones.
+#
+# Tests and local tooling can install a stand-in with set_openai_client()
+# (anything exposing conversations.create / responses.create) and no
+# credential or endpoint is ever needed. AGENT_BACKEND=local does the same
+# with a latency-simulating LocalAgentClient (see local_backend.py).
+
+_lock = threading.Lock()
+_credential = None
+_project_clients: dict = {}
+_openai_clients: dict = {}
+_openai_override = None
+
+
+def project_endpoint() -> str:
+    load_dotenv(ENV)
+    endpoint = os.getenv("PROJECT_ENDPOINT")
+    if not endpoint:
+        raise ValueError("PROJECT_ENDPOINT not set in .env")
+    return endpoint
+
+
+def get_credential():
+    global _credential
+    if _credential is None:
+        with _lock:
+            if _credential is None:
+                from azure.identity import DefaultAzureCredential
+                _credential = DefaultAzureCredential()
+    return _credential
+
+
+def get_project_client(endpoint: str | None = None):
+    endpoint = endpoint or project_endpoint()
+    client = _project_clients.get(endpoint)
+    if client is None:
+        credential = get_credential()
+        with _lock:
+            client = _project_clients.get(endpoint)
+            if client is None:
+                from azure.ai.projects import AIProjectClient
+                client = AIProjectClient(endpoint=endpoint, credential=credential)
+                _project_clients[endpoint] = client
+    return client
+
+
+def get_openai_client(max_connections: int | None = None, endpoint: str | None = None):
+    """
+    Shared OpenAI client for the project. With max_connections the client
+    gets a keep-alive pool of that size (see pooled_http_client); clients
+    are cached per (endpoint, max_connections).
+    """
+    if _openai_override is not None:
+        return _openai_override
+    if os.getenv("AGENT_BACKEND", "azure").lower() == "local":
+        with _lock:
+            if _openai_override is None:
+                from src.agents.local_backend import local_client_from_env
+                _install(local_client_from_env())
+        return _openai_override
+
+    endpoint = endpoint or project_endpoint()
+    key = (endpoint, max_connections)
+    client = _openai_clients.get(key)
+    if client is None:
+        project_client = get_project_client(endpoint)
+        with _lock:
+            client = _openai_clients.get(key)
+            if client is None:
+                if max_connections:
+                    client = project_client.get_openai_client(
+                        http_client=pooled_http_client(max_connections)
+                    )
+                else:
+                    client = project_client.get_openai_client()
+                _openai_clients[key] = client
+    return client
+
+# --------------------------------------------------
+# Substitution (tests, local runs)
+# --------------------------------------------------
+def set_openai_client(client):
+    """Route every get_openai_client() call to `client` (None to undo)."""
+    _install(client)
+
+
+def _install(client):
+    global _openai_override
+    _openai_override = client
+
+
+def reset_clients():
+    """Drop all cached clients and any override; the next call rebuilds them."""
+    global _credential, _openai_override
+    with _lock:
+        _credential = None
+        _project_clients.clear()
+        _openai_clients.clear()
+        _openai_override = None
@@ -0,0 +1,202 @@
+import os
+import json
+import math
+import time
+import random
+import threading
+import itertools
+from pathlib import Path
+from types import SimpleNamespace
+
+import httpx
+import openai
+
+# --------------------------------------------------
+# Local stand-in for the agent OpenAI surface
+# --------------------------------------------------
+# LocalAgentClient implements just what the pipelines call:
+#
+#   client.conversations.create()                       -> .id
+#   client.responses.create(input=..., extra_body=..., conversation=...)
+#                                                       -> .output_text
+#
+# Each response sleeps for a latency drawn from a LatencyModel and can fail
+# with an injected 429 (RateLimitError, with retry-after-ms) or 500
+# (InternalServerError), so the adaptive controller and retries behave as
+# they would against Azure. Output per agent name is canned text, a list of
+# texts (cycled), a callable(input_text) -> text, or, by default, the input
+# echoed back (a valid single JSON object for every pipeline agent).
+#
+# Install it with clients.set_openai_client(LocalAgentClient(...)), or set
+# AGENT_BACKEND=local to have the client registry build one from env.
+
+
+class LatencyModel:
+    """
+    kind: "fixed" | "uniform" | "exponential" | "lognormal".
+    mean_ms is the mean for every kind; sigma is the lognormal shape (larger
+    = heavier tail) and spread the uniform half-width as a fraction of mean.
+    """
+
+    KINDS = ("fixed", "uniform", "exponential", "lognormal")
+
+    def __init__(self, kind: str = "lognormal", mean_ms: float = 200.0, sigma: float = 0.5, spread: float = 0.5):
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown latency distribution {kind!r}; expected one of {self.KINDS}")
+        self.kind = kind
+        self.mean = mean_ms / 1000.0
+        self.sigma = sigma
+        self.spread = spread
+
+    def sample(self, rng: random.Random) -> float:
+        if self.mean <= 0:
+            return 0.0
+        if self.kind == "fixed":
+            return self.mean
+        if self.kind == "uniform":
+            return rng.uniform(self.mean * (1 - self.spread), self.mean * (1 + self.spread))
+        if self.kind == "exponential":
+            return rng.expovariate(1.0 / self.mean)
+        # lognormal with the requested mean: mu = ln(mean) - sigma^2 / 2
+        return rng.lognormvariate(math.log(self.mean) - self.sigma ** 2 / 2, self.sigma)
+
+
+def load_recorded(path) -> dict[str, list[str]]:
+    """Outputs recorded by RecordingClient: {agent_name: [output_text, ...]}."""
+    outputs: dict[str, list[str]] = {}
+    with Path(path).open("r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                outputs.setdefault(row["agent"], []).append(row["output"])
+    return outputs
+
+
+def _agent_name(extra_body) -> str:
+    return ((extra_body or {}).get("agent") or {}).get("name", "")
+
+
+def _http_error(status: int, message: str, retry_after_ms: int | None = None):
+    headers = {"retry-after-ms": str(retry_after_ms)} if retry_after_ms is not None else {}
+    response = httpx.Response(status, headers=headers, request=httpx.Request("POST", "http://local-agent/responses"))
+    if status == 429:
+        return openai.RateLimitError(message, response=response, body=None)
+    return openai.InternalServerError(message, response=response, body=None)
+
+
+class LocalAgentClient:
+    def __init__(
+        self,
+        latency: LatencyModel | None = None,
+        outputs: dict | None = None,
+        throttle_rate: float = 0.0,
+        error_rate: float = 0.0,
+        retry_after_ms: int = 100,
+        conversation_latency: LatencyModel | None = None,
+        seed: int | None = None,
+    ):
+        self.latency = latency or LatencyModel()
+        # Creating a conversation is a cheap call: a quarter of the mean response latency
+        self.conversation_latency = conversation_latency or LatencyModel("fixed", self.latency.mean * 250)
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.retry_after_ms = retry_after_ms
+        self._outputs = {}
+        for name, out in (outputs or {}).items():
+            self._outputs[name] = itertools.cycle(out) if isinstance(out, list) else out
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._conversations = itertools.count(1)
+
+        self.calls = 0
+        self.throttled = 0
+        self.errors = 0
+
+        self.conversations = SimpleNamespace(create=self._create_conversation)
+        self.responses = SimpleNamespace(create=self._create_response)
+
+    def _draw(self, model: LatencyModel) -> tuple[float, float]:
+        with self._lock:
+            return model.sample(self._rng), self._rng.random()
+
+    def _create_conversation(self, **kwargs):
+        delay, _ = self._draw(self.conversation_latency)
+        time.sleep(delay)
+        return SimpleNamespace(id=f"conv_local_{next(self._conversations)}")
+
+    def _create_response(self, input=None, extra_body=None, conversation=None, **kwargs):
+        delay, roll = self._draw(self.latency)
+        with self._lock:
+            self.calls += 1
+            if roll < self.throttle_rate:
+                self.throttled += 1
+                fail = 429
+            elif roll < self.throttle_rate + self.error_rate:
+                self.errors += 1
+                fail = 500
+            else:
+                fail = None
+
+        if fail == 429:
+            # Throttles come back fast, as a real gateway rejects before work
+            time.sleep(min(delay, 0.01))
+            raise _http_error(429, "Rate limit exceeded (local backend)", self.retry_after_ms)
+        time.sleep(delay)
+        if fail == 500:
+            raise _http_error(500, "Internal server error (local backend)")
+
+        return SimpleNamespace(output_text=self._output(_agent_name(extra_body), input))
+
+    def _output(self, agent_name: str, input_text) -> str:
+        out = self._outputs.get(agent_name, self._outputs.get("*"))
+        if out is None:
+            return input_text if isinstance(input_text, str) else json.dumps(input_text)
+        if callable(out):
+            return out(input_text)
+        if isinstance(out, str):
+            return out
+        with self._lock:
+            return next(out)
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "throttled": self.throttled, "errors": self.errors}
+
+
+def local_client_from_env() -> LocalAgentClient:
+    """LocalAgentClient configured by LOCAL_AGENT_* environment variables."""
+    recorded = os.getenv("LOCAL_AGENT_RECORDED")
+    return LocalAgentClient(
+        latency=LatencyModel(
+            os.getenv("LOCAL_AGENT_LATENCY", "lognormal"),
+            float(os.getenv("LOCAL_AGENT_LATENCY_MS", "200")),
+            sigma=float(os.getenv("LOCAL_AGENT_LATENCY_SIGMA", "0.5")),
+        ),
+        outputs=load_recorded(recorded) if recorded else None,
+        throttle_rate=float(os.getenv("LOCAL_AGENT_THROTTLE_RATE", "0")),
+        error_rate=float(os.getenv("LOCAL_AGENT_ERROR_RATE", "0")),
+    )
+
+# --------------------------------------------------
+# Recording real outputs for later replay
+# --------------------------------------------------
+class RecordingClient:
+    """
+    Wraps a real OpenAI client and appends {"agent", "output"} for every
+    response to a JSONL file that load_recorded() / LOCAL_AGENT_RECORDED
+    can replay.
+    """
+
+    def __init__(self, client, path):
+        self._client = client
+        self._path = Path(path)
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conversations = client.conversations
+        self.responses = SimpleNamespace(create=self._create_response)
+
+    def _create_response(self, **kwargs):
+        response = self._client.responses.create(**kwargs)
+        row = {"agent": _agent_name(kwargs.get("extra_body")), "output": response.output_text}
+        with self._lock, self._path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        return response
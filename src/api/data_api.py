@@ -1,11 +1,20 @@
 import os
+import json
+import gzip
+import base64
+import time
 import signal
+import hashlib
+import threading
 import subprocess
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pathlib import Path
-import json
-from src.config.paths import RAW_DATA_DIR
+from src.config.paths import RAW_DATA_DIR, ENRICHED_DATA_DIR
+from src.pipelines.raw_store import RAW_DATASETS, open_raw_store
+from src.pipelines.field_paths import ProjectionPlan, parse_fields_param
 
 app = FastAPI(title="Synergy Raw Data API")
 
@@ -16,30 +25,243 @@ RAW_DATA_DIR.mkdir(parents=True, exist_ok=True)
 
 RAW_INMOMENT_FILE = RAW_DATA_DIR / "synergy_inmoment.json"
 RAW_FULLSTORY_FILE = RAW_DATA_DIR / "synergy_fullstory.json"
+ENRICHED_SYNERGY_FILE = ENRICHED_DATA_DIR / "synergy_enriched.jsonl"
 
 # --------------------------------------------------
-# Helper to load JSON
+# Pre-serialized response cache
 # --------------------------------------------------
-def load_json_file(path: Path):
-    if not path.exists():
-        raise HTTPException(status_code=404, detail=f"{path.name} not found")
-    with path.open("r", encoding="utf-8") as f:
-        return json.load(f)
+# Each dataset is serialized to JSON bytes once and kept in memory, keyed by
+# the (mtime, size) of the file that changes whenever the data does (the
+# store manifest, or the data file itself). Repeated GETs copy those bytes;
+# a gzip copy is built the first time a client asks for it. ETag and
+# Last-Modified let pollers revalidate with a 304 and no body at all.
+#
+# If-None-Match wins over If-Modified-Since. HTTP dates have one-second
+# granularity, so Last-Modified is the file mtime rounded up to the next
+# second, and it is only sent (and If-Modified-Since only honoured) once
+# that second is over: a later change in the same second can then never
+# carry the same date.
+
+class CachedBody:
+    def __init__(self, key, body: bytes, mtime_ns: int):
+        self.key = key
+        self.body = body
+        self.etag = f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+        self.mtime = -(-mtime_ns // 1_000_000_000)
+        self.last_modified = formatdate(self.mtime, usegmt=True)
+        self._gzip = None
+
+    @property
+    def date_is_final(self) -> bool:
+        """No later change can have the same Last-Modified second."""
+        return time.time() > self.mtime
+
+    @property
+    def gzip(self) -> bytes:
+        if self._gzip is None:
+            self._gzip = gzip.compress(self.body, compresslevel=6, mtime=0)
+        return self._gzip
+
+
+# Full datasets plus recent ?fields= projections; least recently used evicted
+CACHE_MAX_ENTRIES = 32
+_cache: "OrderedDict[str, CachedBody]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def cached_body(name: str, stamp: Path, build) -> CachedBody:
+    if not stamp.exists():
+        raise HTTPException(status_code=404, detail=f"{name} not found")
+    st = stamp.stat()
+    key = (st.st_mtime_ns, st.st_size)
+    entry = _cache.get(name)
+    if entry is None or entry.key != key:
+        with _cache_lock:
+            entry = _cache.get(name)
+            if entry is None or entry.key != key:
+                entry = CachedBody(key, build(), st.st_mtime_ns)
+                _cache[name] = entry
+                while len(_cache) > CACHE_MAX_ENTRIES:
+                    _cache.popitem(last=False)
+    with _cache_lock:
+        if name in _cache:
+            _cache.move_to_end(name)
+    return entry
+
+
+def _not_modified(request: Request, entry: CachedBody) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [t.strip() for t in if_none_match.split(",")]
+        return "*" in tags or entry.etag in tags or f"W/{entry.etag}" in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and entry.date_is_final:
+        try:
+            return entry.mtime <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def cached_response(request: Request, entry: CachedBody) -> Response:
+    headers = {
+        "ETag": entry.etag,
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if entry.date_is_final:
+        headers["Last-Modified"] = entry.last_modified
+    if _not_modified(request, entry):
+        return Response(status_code=304, headers=headers)
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return Response(entry.gzip, media_type="application/json", headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
+
+# --------------------------------------------------
+# Serializers (bytes in, bytes out: records are never parsed)
+# --------------------------------------------------
+_stores: dict = {}
+
+
+def raw_store(name: str):
+    # The legacy <name>.json is imported into the store on first open
+    if name not in _stores:
+        _stores[name] = open_raw_store(name)
+    return _stores[name]
+
+
+def projected_lines(lines, plan: ProjectionPlan | None):
+    # Without ?fields= the stored bytes pass through untouched
+    if plan is None:
+        return lines
+    return (json.dumps(plan.project(json.loads(line)), ensure_ascii=False).encode("utf-8") for line in lines)
+
+
+def projection_plan(fields: str | None) -> ProjectionPlan | None:
+    try:
+        parsed = parse_fields_param(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ProjectionPlan(parsed) if parsed else None
+
+
+def raw_store_response(request: Request, name: str, fields: str | None = None) -> Response:
+    store = raw_store(name)
+    plan = projection_plan(fields)
+
+    def build() -> bytes:
+        # The store always has a manifest; an empty one that never imported
+        # a legacy file means the dataset simply does not exist yet
+        manifest = store.manifest()
+        if not manifest["segments"] and "legacy_imported" not in manifest:
+            raise HTTPException(status_code=404, detail=f"{name} not found")
+        lines = list(projected_lines(store.iter_lines(), plan))
+        return b"[\n" + b",\n".join(lines) + b"\n]\n" if lines else b"[\n]\n"
+
+    cache_name = name if plan is None else f"{name}?fields={','.join(plan.fields)}"
+    entry = cached_body(cache_name, store.manifest_path, build)
+    return cached_response(request, entry)
+
+
+def jsonl_array_bytes(path: Path) -> bytes:
+    with path.open("rb") as f:
+        lines = [line.rstrip(b"\n") for line in f if line.strip()]
+    return b"[\n" + b",\n".join(lines) + b"\n]\n"
 
 # --------------------------------------------------
 # Routes for raw data
 # --------------------------------------------------
 @app.get("/data/raw/synergy_inmoment.json", response_class=JSONResponse)
-def get_inmoment_data():
-    return load_json_file(RAW_INMOMENT_FILE)
+def get_inmoment_data(request: Request, fields: str | None = None):
+    return raw_store_response(request, "synergy_inmoment", fields)
 
 @app.get("/data/raw/synergy_fullstory.json", response_class=JSONResponse)
-def get_fullstory_data():
-    return load_json_file(RAW_FULLSTORY_FILE)
+def get_fullstory_data(request: Request, fields: str | None = None):
+    return raw_store_response(request, "synergy_fullstory", fields)
+
+# --------------------------------------------------
+# Incremental access: cursor pages and NDJSON streaming
+# --------------------------------------------------
+# Both read the segment files directly, a page / chunk at a time, so server
+# memory is bounded by the page size rather than the dataset.
+MAX_PAGE_SIZE = 5000
+
+
+def _dataset_store(dataset: str):
+    if dataset not in RAW_DATASETS:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset {dataset}")
+    return raw_store(dataset)
+
+
+def encode_cursor(cursor) -> str | None:
+    if cursor is None:
+        return None
+    file, offset = cursor
+    return base64.urlsafe_b64encode(f"{file}:{offset}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str):
+    try:
+        file, offset = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode().rsplit(":", 1)
+        return file, int(offset)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@app.get("/data/raw/{dataset}/records")
+def get_raw_page(
+    dataset: str,
+    limit: int = Query(500, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    offset: int | None = Query(None, ge=0),
+    fields: str | None = None,
+):
+    """
+    One page of records:
+    {"records": [...], "next_cursor": str | null, "resume_cursor": str | null, "total": n}.
+    Start with no cursor (or an `offset`), then pass back `next_cursor`
+    until it is null. `resume_cursor` points just past the last record
+    read; keep it as a watermark and pass it as `cursor` later to get only
+    records appended since. `fields` projects each record (see field_paths).
+    """
+    store = _dataset_store(dataset)
+    plan = projection_plan(fields)
+    if cursor is not None:
+        position = decode_cursor(cursor)
+    elif offset:
+        position = store.locate(offset)
+        if position is None:
+            body = b'{"records": [], "next_cursor": null, "resume_cursor": null, "total": %d}' % store.record_count
+            return Response(body, media_type="application/json")
+    else:
+        position = None
+
+    try:
+        lines, next_position, resume_position = store.read_since(position, limit)
+    except KeyError:
+        raise HTTPException(status_code=410, detail="Cursor expired (store was compacted); restart from the beginning")
+
+    next_cursor = json.dumps(encode_cursor(next_position)).encode()
+    resume_cursor = json.dumps(encode_cursor(resume_position)).encode()
+    body = b'{"records": [' + b",".join(projected_lines(lines, plan)) + b'], "next_cursor": ' + next_cursor + \
+        b', "resume_cursor": ' + resume_cursor + b', "total": %d}' % store.record_count
+    return Response(body, media_type="application/json")
+
+
+@app.get("/data/raw/{dataset}.ndjson")
+def get_raw_ndjson(dataset: str, fields: str | None = None):
+    """The whole dataset as newline-delimited JSON, streamed segment by segment."""
+    store = _dataset_store(dataset)
+    plan = projection_plan(fields)
+    lines = projected_lines(store.iter_lines(), plan)
+    return StreamingResponse((line + b"\n" for line in lines), media_type="application/x-ndjson")
 
 @app.get("/data/enriched/synergy_enriched.json", response_class=JSONResponse)
-def get_fullstory_data():
-    return load_json_file(ENRICHED_SYNERGY_FILE)
+def get_enriched_data(request: Request):
+    entry = cached_body("synergy_enriched", ENRICHED_SYNERGY_FILE, lambda: jsonl_array_bytes(ENRICHED_SYNERGY_FILE))
+    return cached_response(request, entry)
+
 # --------------------------------------------------
 # Kill any process using port 8080 before starting
 # --------------------------------------------------
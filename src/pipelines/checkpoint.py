@@ -0,0 +1,168 @@
+import os
+import json
+import sqlite3
+import threading
+from pathlib import Path
+
+# --------------------------------------------------
+# Crash-safe JSONL output with a persistent ID index
+# --------------------------------------------------
+# Each output file <name>.jsonl gets a sidecar <name>.jsonl.idx.sqlite holding
+# every record ID plus the byte offset of the end of the last indexed line.
+#
+# append() writes the line (flush + fsync), then records the ID and new offset
+# in one SQLite transaction. If the process dies between the two, the next open
+# scans only the bytes after the stored offset and indexes them; a partially
+# written last line is truncated away. Lookups never parse the JSONL.
+#
+# An ID can also carry the digest of the input its latest line was produced
+# from (append(record, source=...)). is_current() then tells whether that
+# input changed since, so a record whose input changed is produced again; the
+# new line is appended and, as in the input, the last line for an ID wins.
+# IDs indexed without a digest (older indexes, lines recovered after a crash)
+# are not current: the input they came from is unknown, so they are produced
+# once more and the new line records its digest.
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ids (id TEXT PRIMARY KEY, source TEXT);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+"""
+
+
+def index_path(file_path: Path) -> Path:
+    return file_path.with_name(file_path.name + ".idx.sqlite")
+
+
+class IndexedJsonl:
+    """Append-only JSONL file with an O(1) on-disk seen-ID index."""
+
+    def __init__(self, file_path, durable: bool = True, id_field: str = "id"):
+        self.path = Path(file_path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.durable = durable
+        self.id_field = id_field
+        self.appended = 0
+        self._lock = threading.Lock()
+
+        self._db = sqlite3.connect(str(index_path(self.path)), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        if "source" not in {row[1] for row in self._db.execute("PRAGMA table_info(ids)")}:
+            self._db.execute("ALTER TABLE ids ADD COLUMN source TEXT")
+
+        self._recover()
+        self._f = self.path.open("ab")
+
+    # --------------------------------------------------
+    # Lookups
+    # --------------------------------------------------
+    def __contains__(self, record_id) -> bool:
+        if record_id is None:
+            return False
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM ids WHERE id = ?", (str(record_id),)
+            ).fetchone()
+        return row is not None
+
+    def is_current(self, record_id, source: str) -> bool:
+        """True if `record_id` was appended from `source`; False if no source was recorded."""
+        if record_id is None:
+            return False
+        with self._lock:
+            row = self._db.execute(
+                "SELECT source FROM ids WHERE id = ?", (str(record_id),)
+            ).fetchone()
+        return row is not None and row[0] == source
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM ids").fetchone()[0]
+
+    def ids(self) -> set[str]:
+        with self._lock:
+            return {row[0] for row in self._db.execute("SELECT id FROM ids")}
+
+    # --------------------------------------------------
+    # Writes
+    # --------------------------------------------------
+    def append(self, record: dict, source: str | None = None):
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        record_id = record.get(self.id_field)
+        with self._lock:
+            self._f.write(line)
+            self._f.flush()
+            if self.durable:
+                os.fsync(self._f.fileno())
+            offset = self._f.tell()
+            with self._db:
+                if record_id is not None:
+                    self._index(record_id, source)
+                self._set_offset(offset)
+            self.appended += 1
+
+    def close(self):
+        with self._lock:
+            self._f.close()
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _index(self, record_id, source: str | None):
+        self._db.execute(
+            "INSERT INTO ids (id, source) VALUES (?, ?) ON CONFLICT (id) DO UPDATE SET source = excluded.source",
+            (str(record_id), source),
+        )
+
+    # --------------------------------------------------
+    # Recovery
+    # --------------------------------------------------
+    def _get_offset(self) -> int:
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'offset'").fetchone()
+        return row[0] if row else 0
+
+    def _set_offset(self, offset: int):
+        self._db.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('offset', ?)", (offset,)
+        )
+
+    def _recover(self):
+        offset = self._get_offset()
+        size = self.path.stat().st_size if self.path.exists() else 0
+
+        if size < offset:
+            # File was replaced or truncated outside this class: rebuild
+            with self._db:
+                self._db.execute("DELETE FROM ids")
+                self._set_offset(0)
+            offset = 0
+
+        if size == offset:
+            return
+
+        good = offset
+        with self.path.open("rb") as f, self._db:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # partial last line from a crash mid-write
+                good += len(line)
+                if not line.strip():
+                    continue
+                try:
+                    record_id = json.loads(line).get(self.id_field)
+                except (json.JSONDecodeError, AttributeError):
+                    continue
+                if record_id is not None:
+                    self._index(record_id, None)
+            self._set_offset(good)
+
+        if good < size:
+            with self.path.open("r+b") as f:
+                f.truncate(good)
+            print(f"Truncated partial record at end of {self.path.name} ({size - good} bytes)")
@@ -0,0 +1,245 @@
+import time
+import random
+import threading
+from collections import deque
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+
+import openai
+
+# --------------------------------------------------
+# Adaptive concurrency (AIMD + latency gradient)
+# --------------------------------------------------
+class AdaptiveLimiter:
+    """
+    Dynamic concurrency limit for calls to one agent.
+
+    - Additive increase: every healthy completion adds increase/limit, i.e.
+      about +1 per window of `limit` calls.
+    - Multiplicative decrease: a throttle (429) or 5xx multiplies the limit
+      by `decrease`, at most once per smoothed latency so one burst of 429s
+      counts as one signal.
+    - Latency gradient: when short-term smoothed latency exceeds
+      `latency_tolerance` x the long-term baseline, the endpoint is queueing,
+      so the limit is eased by `latency_decrease` instead of growing. The
+      baseline is a slow EWMA rather than the minimum, which with noisy
+      (long-tailed) latencies would sit far below typical calls.
+    """
+
+    def __init__(
+        self,
+        initial: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        latency_tolerance: float = 2.0,
+        latency_decrease: float = 0.9,
+        smoothing: float = 0.2,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.latency_decrease = latency_decrease
+        self.smoothing = smoothing
+
+        self._limit = float(max(min_limit, min(initial, max_limit)))
+        self._in_flight = 0
+        self._latency_ewma = None
+        self._latency_baseline = None
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_limit, int(self._limit))
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def acquire(self):
+        with self._cond:
+            while self._in_flight >= self.limit:
+                self._cond.wait()
+            self._in_flight += 1
+
+    def release(self, outcome: str, latency: float | None = None):
+        """outcome: "ok", "throttled" (429/5xx) or "error" (no signal)."""
+        with self._cond:
+            self._in_flight -= 1
+            if outcome == "throttled":
+                self._decrease(self.decrease)
+            elif outcome == "ok" and latency is not None:
+                self._observe(latency)
+            self._cond.notify_all()
+
+    def _observe(self, latency: float):
+        if self._latency_ewma is None:
+            self._latency_ewma = self._latency_baseline = latency
+        else:
+            self._latency_ewma += self.smoothing * (latency - self._latency_ewma)
+            self._latency_baseline += (self.smoothing / 10) * (latency - self._latency_baseline)
+
+        if self._latency_ewma > self.latency_tolerance * self._latency_baseline:
+            self._decrease(self.latency_decrease)
+        else:
+            self._limit = min(self.max_limit, self._limit + self.increase / self._limit)
+
+    def _decrease(self, factor: float):
+        now = time.monotonic()
+        if now - self._last_decrease < (self._latency_ewma or 1.0):
+            return
+        self._last_decrease = now
+        self._limit = max(self.min_limit, self._limit * factor)
+
+# --------------------------------------------------
+# Retry classification and backoff
+# --------------------------------------------------
+@dataclass
+class RetryPolicy:
+    max_retries: int = 5
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+
+    def backoff(self, attempt: int, retry_after: float | None = None) -> float:
+        # Full jitter; never sooner than the server's Retry-After
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+
+def _status_code(exc: BaseException) -> int | None:
+    while exc is not None:
+        code = getattr(exc, "status_code", None)
+        if isinstance(code, int):
+            return code
+        exc = exc.__cause__
+    return None
+
+
+def classify_error(exc: BaseException) -> str:
+    """
+    "throttled": 429 / 5xx (retry and slow down)
+    "transient": connection errors, timeouts, 408 (retry)
+    "fatal":     anything else, e.g. 4xx or unparseable agent output
+    """
+    code = _status_code(exc)
+    if code is not None:
+        if code == 429 or code >= 500:
+            return "throttled"
+        if code == 408:
+            return "transient"
+        return "fatal"
+    if isinstance(exc, (openai.APIConnectionError, openai.APITimeoutError, TimeoutError, ConnectionError)):
+        return "transient"
+    return "fatal"
+
+
+def retry_after_seconds(exc: BaseException) -> float | None:
+    """Retry-After / retry-after-ms from the error's HTTP response, if any."""
+    while exc is not None:
+        response = getattr(exc, "response", None)
+        headers = getattr(response, "headers", None)
+        if headers:
+            ms = headers.get("retry-after-ms")
+            if ms:
+                try:
+                    return float(ms) / 1000.0
+                except ValueError:
+                    pass
+            value = headers.get("retry-after")
+            if value:
+                try:
+                    return max(0.0, float(value))
+                except ValueError:
+                    try:
+                        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+                    except (TypeError, ValueError):
+                        return None
+        exc = exc.__cause__
+    return None
+
+# --------------------------------------------------
+# Controller: limiter + retries + metrics for one agent
+# --------------------------------------------------
+class AdaptiveController:
+    """
+    Runs agent calls under an AdaptiveLimiter with jittered exponential
+    retries, and tracks throughput / retry / throttle counts.
+    """
+
+    def __init__(self, name: str, limiter: AdaptiveLimiter | None = None, retry: RetryPolicy | None = None,
+                 throughput_window: float = 60.0):
+        self.name = name
+        self.limiter = limiter or AdaptiveLimiter()
+        self.retry = retry or RetryPolicy()
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+        self.throttled = 0
+        self._window = throughput_window
+        self._done_at: deque = deque()
+        self._started = None
+        self._lock = threading.Lock()
+
+    def call(self, fn, *args, **kwargs):
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            t0 = time.monotonic()
+            with self._lock:
+                if self._started is None:
+                    self._started = t0
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                kind = classify_error(e)
+                self.limiter.release("throttled" if kind == "throttled" else "error")
+                with self._lock:
+                    if kind == "throttled":
+                        self.throttled += 1
+                    if kind == "fatal" or attempt >= self.retry.max_retries:
+                        self.failed += 1
+                        raise
+                    self.retries += 1
+                time.sleep(self.retry.backoff(attempt, retry_after_seconds(e)))
+                attempt += 1
+                continue
+
+            now = time.monotonic()
+            self.limiter.release("ok", now - t0)
+            with self._lock:
+                self.completed += 1
+                self._done_at.append(now)
+                while self._done_at and now - self._done_at[0] > self._window:
+                    self._done_at.popleft()
+            return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            while self._done_at and now - self._done_at[0] > self._window:
+                self._done_at.popleft()
+            span = min(self._window, now - self._started) if self._started else 0.0
+            return {
+                "agent": self.name,
+                "concurrency": self.limiter.limit,
+                "in_flight": self.limiter.in_flight,
+                "completed": self.completed,
+                "failed": self.failed,
+                "retries": self.retries,
+                "throttled": self.throttled,
+                "throughput_per_sec": len(self._done_at) / span if span > 0 else 0.0,
+            }
+
+    def summary(self) -> str:
+        s = self.stats()
+        return (
+            f"[{s['agent']}] concurrency={s['concurrency']} completed={s['completed']} "
+            f"failed={s['failed']} retries={s['retries']} throttled={s['throttled']} "
+            f"throughput={s['throughput_per_sec']:.2f}/s"
+        )
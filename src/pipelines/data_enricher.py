@@ -1,10 +1,19 @@
 import os
 import json
+import queue
+import hashlib
+import threading
+import argparse
+from typing import Iterator
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
-from azure.identity import DefaultAzureCredential
-from azure.ai.projects import AIProjectClient
 from src.config.paths import EXTRACTED_DATA_DIR, ENRICHED_DATA_DIR, ESCALATED_DATA_DIR
+from src.pipelines.checkpoint import IndexedJsonl
+from src.agents.agent_calls import call_agent_text
+from src.agents.clients import get_openai_client
+from src.pipelines.concurrency import AdaptiveController, AdaptiveLimiter, RetryPolicy
+from src.pipelines.escalation_rules import ESCALATION_RULES_FILE, EscalationCascade
+from src.pipelines.payload import AGENT_PAYLOADS_FILE, AgentProjection
 
 # --------------------------------------------------
 # Setup paths
@@ -20,67 +29,102 @@ ESCALATED_FILE = ESCALATED_DATA_DIR / "synergy_escalated.jsonl"
 # Load environment
 # --------------------------------------------------
 load_dotenv()
-PROJECT_ENDPOINT = os.getenv("PROJECT_ENDPOINT")
 CSI_AGENT_NAME = os.getenv("CSI_AGENT")
 ESCALATION_AGENT_NAME = os.getenv("ESCALATION_AGENT")
 
-if not PROJECT_ENDPOINT or not CSI_AGENT_NAME or not ESCALATION_AGENT_NAME:
-    raise ValueError("PROJECT_ENDPOINT, CSI_AGENT, or ESCALATION_AGENT not set in .env")
+# Worker threads per agent stage; the HTTP pool covers both stages at once
+MAX_WORKERS = int(os.getenv("ENRICHER_MAX_WORKERS", "10"))
 
 # --------------------------------------------------
-# Azure AI client
+# Adaptive concurrency per agent (start low, grow while healthy,
+# back off on 429/5xx; retries honour Retry-After)
 # --------------------------------------------------
-project_client = AIProjectClient(
-    endpoint=PROJECT_ENDPOINT,
-    credential=DefaultAzureCredential(),
+CSI_CONTROLLER = AdaptiveController(
+    "csi",
+    AdaptiveLimiter(
+        initial=int(os.getenv("CSI_INITIAL_CONCURRENCY", "4")),
+        max_limit=int(os.getenv("CSI_MAX_CONCURRENCY", str(MAX_WORKERS))),
+    ),
+    RetryPolicy(max_retries=int(os.getenv("CSI_MAX_RETRIES", "5"))),
+)
+ESCALATION_CONTROLLER = AdaptiveController(
+    "escalation",
+    AdaptiveLimiter(
+        initial=int(os.getenv("ESCALATION_INITIAL_CONCURRENCY", "4")),
+        max_limit=int(os.getenv("ESCALATION_MAX_CONCURRENCY", str(MAX_WORKERS))),
+    ),
+    RetryPolicy(max_retries=int(os.getenv("ESCALATION_MAX_RETRIES", "5"))),
 )
-openai_client = project_client.get_openai_client()
 
 # --------------------------------------------------
-# Helper: Load JSONL
+# Rule pre-filter: clear cases skip the escalation agent
 # --------------------------------------------------
-def load_jsonl(file_path) -> list[dict]:
-    if not file_path.exists():
-        print(f"File not found: {file_path}")
-        return []
-    records = []
-    with file_path.open("r", encoding="utf-8") as f:
-        for line in f:
-            if line.strip():
-                records.append(json.loads(line))
-    return records
+ESCALATION_CASCADE = EscalationCascade.from_file(os.getenv("ESCALATION_RULES", ESCALATION_RULES_FILE))
+
+# --------------------------------------------------
+# Per-agent payload projection (only the fields each agent reads)
+# --------------------------------------------------
+AGENT_PAYLOADS = os.getenv("AGENT_PAYLOADS", AGENT_PAYLOADS_FILE)
+CSI_PROJECTION = AgentProjection.from_file("csi", AGENT_PAYLOADS)
+ESCALATION_PROJECTION = AgentProjection.from_file("escalation", AGENT_PAYLOADS)
 
 # --------------------------------------------------
-# Helper: Already processed IDs
+# Azure AI client (shared, built on first agent call)
 # --------------------------------------------------
-def load_seen_ids(file_path) -> set[str]:
+HTTP_POOL_SIZE = CSI_CONTROLLER.limiter.max_limit + ESCALATION_CONTROLLER.limiter.max_limit
+
+
+def check_config():
+    if not CSI_AGENT_NAME or not ESCALATION_AGENT_NAME:
+        raise ValueError("CSI_AGENT or ESCALATION_AGENT not set in .env")
+
+# --------------------------------------------------
+# Helper: Current record per ID
+# --------------------------------------------------
+# The extractor appends a changed customer again further down its output
+# (and re-enriched records are appended the same way), so the last line for
+# an ID is the current one and earlier lines are superseded.
+def record_digest(record: dict) -> str:
+    # Same serialization the extractor and IndexedJsonl write lines with, so a
+    # record read back from disk keeps the digest it was appended with
+    return hashlib.sha1(json.dumps(record, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def latest_records(file_path) -> Iterator[dict]:
+    """The last line for each ID, in file order (memory: one offset per ID)."""
     if not file_path.exists():
-        return set()
-    seen = set()
-    with file_path.open("r", encoding="utf-8") as f:
+        return
+    last = {}
+    with file_path.open("rb") as f:
+        offset = 0
         for line in f:
-            try:
-                seen.add(json.loads(line)["id"])
-            except Exception:
-                continue
-    return seen
+            if line.strip():
+                record_id = json.loads(line).get("id")
+                last[record_id if record_id is not None else ("_no_id", offset)] = offset
+            offset += len(line)
+    keep = set(last.values())
+    del last
+    with file_path.open("rb") as f:
+        offset = 0
+        for line in f:
+            if offset in keep:
+                yield json.loads(line)
+            offset += len(line)
 
 # --------------------------------------------------
 # CSI Agent: enrich single record
 # --------------------------------------------------
 def call_csi_agent_single(record: dict) -> dict:
-    conversation = openai_client.conversations.create()
-    response = openai_client.responses.create(
-        conversation=conversation.id,
-        input=json.dumps(record, ensure_ascii=False),
-        extra_body={"agent": {"name": CSI_AGENT_NAME, "type": "agent_reference"}}
+    payload = CSI_PROJECTION.project(record)
+    output_text = call_agent_text(
+        get_openai_client(HTTP_POOL_SIZE), CSI_AGENT_NAME, json.dumps(payload, ensure_ascii=False)
     )
 
-    parsed = json.loads(response.output_text.strip())
+    parsed = json.loads(output_text.strip())
     if isinstance(parsed, dict):
-        return parsed
+        return CSI_PROJECTION.merge(record, parsed)
     elif isinstance(parsed, list) and len(parsed) == 1 and isinstance(parsed[0], dict):
-        return parsed[0]
+        return CSI_PROJECTION.merge(record, parsed[0])
     else:
         raise RuntimeError("CSI agent output must be a single JSON object or a single-item array")
 
@@ -88,20 +132,18 @@ def call_csi_agent_single(record: dict) -> dict:
 # Escalation Agent: tag single record
 # --------------------------------------------------
 def call_escalation_agent_single(record: dict) -> dict:
-    conversation = openai_client.conversations.create()
-    response = openai_client.responses.create(
-        conversation=conversation.id,
-        input=json.dumps(record, ensure_ascii=False),
-        extra_body={"agent": {"name": ESCALATION_AGENT_NAME, "type": "agent_reference"}}
+    payload = ESCALATION_PROJECTION.project(record)
+    output_text = call_agent_text(
+        get_openai_client(HTTP_POOL_SIZE), ESCALATION_AGENT_NAME, json.dumps(payload, ensure_ascii=False)
     )
 
     try:
-        parsed = json.loads(response.output_text.strip())
+        parsed = json.loads(output_text.strip())
         # Handle single object or single-item array
         if isinstance(parsed, dict):
-            return parsed
+            return ESCALATION_PROJECTION.merge(record, parsed)
         elif isinstance(parsed, list) and len(parsed) == 1 and isinstance(parsed[0], dict):
-            return parsed[0]
+            return ESCALATION_PROJECTION.merge(record, parsed[0])
         else:
             raise ValueError(
                 "Escalation agent output must be a single JSON object or an array of length 1"
@@ -109,59 +151,269 @@ def call_escalation_agent_single(record: dict) -> dict:
     except Exception as e:
         raise RuntimeError("Failed to parse Escalation agent output") from e
 
+# --------------------------------------------------
+# Escalation: rules first, agent for the ambiguous rest
+# --------------------------------------------------
+def escalate_record(record: dict) -> dict:
+    decided = ESCALATION_CASCADE.decide(record)
+    if decided is not None:
+        return decided
+    return ESCALATION_CONTROLLER.call(call_escalation_agent_single, record)
+
 # --------------------------------------------------
 # Parallel processing
 # --------------------------------------------------
-def process_parallel(records: list[dict], agent_fn, max_workers: int = 10) -> list[dict]:
+def process_parallel(records: list[dict], agent_fn, max_workers: int = MAX_WORKERS, on_result=None,
+                     controller: AdaptiveController | None = None) -> list[dict]:
+    # on_result(result) is called as each record completes (e.g. store.append),
+    # so finished work is persisted even if other records fail. A failed
+    # record is reported and skipped (not written, so the next run retries
+    # it); the number of failures is printed at the end.
+    # With a controller, calls are retried and their concurrency is adapted
+    # between 1 and the controller's max_limit (which then sets the pool size).
     results = []
+    failed = 0
+    if controller is not None:
+        max_workers = controller.limiter.max_limit
+        fn = lambda r: controller.call(agent_fn, r)
+    else:
+        fn = agent_fn
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = {executor.submit(agent_fn, r): r["id"] for r in records}
+        futures = {executor.submit(fn, r): r["id"] for r in records}
         for future in as_completed(futures):
-            results.append(future.result())
+            try:
+                result = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"Agent call failed for {futures[future]}: {e}")
+                continue
+            if on_result is not None:
+                on_result(result)
+            results.append(result)
+    if failed:
+        print(f"Failures: {failed} of {len(records)} records (retried next run)")
     return results
 
 # --------------------------------------------------
-# Save JSONL
+# Streaming pipeline: CSI -> escalation via bounded queues
 # --------------------------------------------------
-def save_jsonl(file_path, records: list[dict]):
-    with file_path.open("a", encoding="utf-8") as f:
-        for record in records:
-            f.write(json.dumps(record, ensure_ascii=False) + "\n")
-    print(f"Saved {len(records)} records → {file_path}")
+_STOP = object()
+
+
+def process_streaming(
+    csi_workers: int | None = None,
+    escalation_workers: int | None = None,
+    queue_size: int = 100,
+) -> dict:
+    """
+    Run CSI enrichment and escalation as two concurrent stages.
+
+    Extracted records are streamed from disk into a bounded CSI queue; each
+    CSI result is appended to ENRICHED_FILE as soon as it returns and handed
+    to the escalation stage through a second bounded queue, whose results are
+    appended to ESCALATED_FILE. Enriched records from earlier runs that were
+    never escalated are fed to the escalation stage too.
+
+    Only the last line per ID of each input is used, and a record is redone
+    when that line differs from the one its output was produced from (the
+    output indexes keep a digest of it) or when no digest was kept for it
+    (an output from before the digests); the new output line is appended and
+    supersedes the old one.
+
+    Memory is not bounded by the queues alone: it also holds one offset per
+    input ID while an input is read, and one digest per record enriched in
+    this run. Seen IDs are looked up in the on-disk index of each output
+    file. Every result is fsynced and indexed as it is appended, so a crash
+    loses no finished work. A failed record (agent call, write or hand-off)
+    is reported and skipped; it is not written, so the next run picks it up
+    again, and the worker moves on to the next record.
+
+    Worker threads default to each agent controller's max concurrency; the
+    controllers decide how many of them call the agent at once.
+    """
+    check_config()
+    csi_workers = csi_workers or CSI_CONTROLLER.limiter.max_limit
+    escalation_workers = escalation_workers or ESCALATION_CONTROLLER.limiter.max_limit
+    csi_q: queue.Queue = queue.Queue(maxsize=queue_size)
+    esc_q: queue.Queue = queue.Queue(maxsize=queue_size)
+    enriched_out = IndexedJsonl(ENRICHED_FILE)
+    escalated_out = IndexedJsonl(ESCALATED_FILE)
+    failures = {"csi": 0, "escalation": 0}
+    failures_lock = threading.Lock()
+    # Digest of each record enriched in this run: an escalation of an older
+    # enriched line (from the backlog) that finishes later must not win
+    enriched_now: dict = {}
+    escalated_lock = threading.Lock()
+
+    def fail(stage: str, record: dict, e: Exception):
+        with failures_lock:
+            failures[stage] += 1
+        print(f"{stage} failed for {record.get('id')}: {e}")
+
+    def csi_worker():
+        while True:
+            item = csi_q.get()
+            if item is _STOP:
+                return
+            record, source = item
+            # Everything per record is guarded: a dead worker would leave the
+            # feeder blocked on a full queue forever
+            try:
+                enriched = CSI_CONTROLLER.call(call_csi_agent_single, record)
+                enriched_out.append(enriched, source=source)
+                digest = record_digest(enriched)
+                with escalated_lock:
+                    enriched_now[enriched.get("id")] = digest
+                if not escalated_out.is_current(enriched.get("id"), digest):
+                    esc_q.put(enriched)
+            except Exception as e:
+                fail("csi", record, e)
+
+    def escalation_worker():
+        while True:
+            record = esc_q.get()
+            if record is _STOP:
+                return
+            try:
+                source = record_digest(record)
+                escalated = escalate_record(record)
+                with escalated_lock:
+                    if enriched_now.get(record.get("id"), source) != source:
+                        continue  # superseded by a record re-enriched in this run
+                    escalated_out.append(escalated, source=source)
+            except Exception as e:
+                fail("escalation", record, e)
+
+    csi_threads = [threading.Thread(target=csi_worker, daemon=True) for _ in range(csi_workers)]
+    esc_threads = [threading.Thread(target=escalation_worker, daemon=True) for _ in range(escalation_workers)]
+    for t in csi_threads + esc_threads:
+        t.start()
+
+    try:
+        # Backlog: enriched earlier but never escalated
+        # (CSI workers are idle until the loop below, so this is old data only)
+        for record in latest_records(ENRICHED_FILE):
+            if not escalated_out.is_current(record.get("id"), record_digest(record)):
+                esc_q.put(record)
+
+        for record in latest_records(EXTRACTED_FILE):
+            source = record_digest(record)
+            if not enriched_out.is_current(record.get("id"), source):
+                csi_q.put((record, source))
+    finally:
+        for _ in csi_threads:
+            csi_q.put(_STOP)
+        for t in csi_threads:
+            t.join()
+        for _ in esc_threads:
+            esc_q.put(_STOP)
+        for t in esc_threads:
+            t.join()
+        enriched_out.close()
+        escalated_out.close()
+
+    stats = {
+        "enriched": enriched_out.appended,
+        "escalated": escalated_out.appended,
+        "csi_failures": failures["csi"],
+        "escalation_failures": failures["escalation"],
+    }
+    print(f"Enriched {stats['enriched']} → {ENRICHED_FILE}")
+    print(f"Escalated {stats['escalated']} → {ESCALATED_FILE}")
+    if failures["csi"] or failures["escalation"]:
+        print(f"Failures: CSI={failures['csi']} escalation={failures['escalation']} (retried next run)")
+    print(CSI_CONTROLLER.summary())
+    print(ESCALATION_CONTROLLER.summary())
+    print(ESCALATION_CASCADE.summary())
+    print(CSI_PROJECTION.stats.summary())
+    print(ESCALATION_PROJECTION.stats.summary())
+    return stats
 
 # --------------------------------------------------
 # Main pipeline
 # --------------------------------------------------
 def main():
-    #Load extracted data
+    check_config()
+
+    #Load extracted data (last line per customer)
     print("Loading extracted data...")
-    extracted_data = load_jsonl(EXTRACTED_FILE)
+    extracted_data = list(latest_records(EXTRACTED_FILE))
     if not extracted_data:
         print("No extracted data found. Exiting.")
         return
 
-    #Enrichment: skip already enriched
-    seen_enriched = load_seen_ids(ENRICHED_FILE)
-    to_enrich = [r for r in extracted_data if r.get("id") not in seen_enriched]
+    #Enrichment: skip records already enriched from the same extracted line
+    #(each result is persisted as it completes)
+    with IndexedJsonl(ENRICHED_FILE) as enriched_store:
+        sources = {r.get("id"): record_digest(r) for r in extracted_data}
+        to_enrich = [r for r in extracted_data if not enriched_store.is_current(r.get("id"), sources[r.get("id")])]
 
-    if to_enrich:
-        print(f"Enriching {len(to_enrich)} records in parallel...")
-        enriched_records = process_parallel(to_enrich, call_csi_agent_single, max_workers=10)
-        save_jsonl(ENRICHED_FILE, enriched_records)
-    else:
-        print("No new records to enrich.")
-        enriched_records = load_jsonl(ENRICHED_FILE)
+        if to_enrich:
+            print(f"Enriching {len(to_enrich)} records in parallel...")
+            enriched_records = process_parallel(
+                to_enrich, call_csi_agent_single,
+                on_result=lambda r: enriched_store.append(r, source=sources.get(r.get("id"))),
+                controller=CSI_CONTROLLER,
+            )
+            print(CSI_CONTROLLER.summary())
+            print(f"Saved {len(enriched_records)} records → {ENRICHED_FILE}")
+        else:
+            print("No new records to enrich.")
 
-    #Escalation tagging: skip already escalated
-    seen_escalated = load_seen_ids(ESCALATED_FILE)
-    to_escalate = [r for r in enriched_records if r.get("id") not in seen_escalated]
+    #Escalation tagging: skip records already escalated from the same enriched line
+    with IndexedJsonl(ESCALATED_FILE) as escalated_store:
+        sources = {}
+        to_escalate = []
+        for record in latest_records(ENRICHED_FILE):
+            sources[record.get("id")] = record_digest(record)
+            if not escalated_store.is_current(record.get("id"), sources[record.get("id")]):
+                to_escalate.append(record)
 
-    if to_escalate:
-        print(f"Escalating {len(to_escalate)} records in parallel...")
-        escalated_records = process_parallel(to_escalate, call_escalation_agent_single, max_workers=10)
-        save_jsonl(ESCALATED_FILE, escalated_records)
-    else:
-        print("No new records to escalate.")
+        if to_escalate:
+            # Clear cases are tagged by the rule pre-filter; only the rest hit the agent
+            to_agent = []
+            for record in to_escalate:
+                decided = ESCALATION_CASCADE.decide(record)
+                if decided is not None:
+                    escalated_store.append(decided, source=sources[record.get("id")])
+                else:
+                    to_agent.append(record)
+            print(ESCALATION_CASCADE.summary())
+
+            print(f"Escalating {len(to_agent)} records in parallel...")
+            process_parallel(
+                to_agent, call_escalation_agent_single,
+                on_result=lambda r: escalated_store.append(r, source=sources.get(r.get("id"))),
+                controller=ESCALATION_CONTROLLER,
+            )
+            print(ESCALATION_CONTROLLER.summary())
+            print(f"Saved {escalated_store.appended} records → {ESCALATED_FILE}")
+        else:
+            print("No new records to escalate.")
+
+    print(CSI_PROJECTION.stats.summary())
+    print(ESCALATION_PROJECTION.stats.summary())
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="CSI enrichment + escalation tagging")
+    parser.add_argument("--mode", choices=["stream", "batch"], default="stream")
+    parser.add_argument("--csi-workers", type=int, default=None)
+    parser.add_argument("--escalation-workers", type=int, default=None)
+    parser.add_argument("--queue-size", type=int, default=100)
+    parser.add_argument("--no-prefilter", action="store_true", help="send every record to the escalation agent")
+    parser.add_argument("--full-payload", action="store_true", help="send whole records instead of projections")
+    parser.add_argument("--payload-report", help="append per-record token counts (JSONL) here")
+    args = parser.parse_args()
+    if args.no_prefilter:
+        ESCALATION_CASCADE.enabled = False
+    if args.full_payload:
+        CSI_PROJECTION.enabled = ESCALATION_PROJECTION.enabled = False
+
+    if args.mode == "batch":
+        main()
+    else:
+        process_streaming(args.csi_workers, args.escalation_workers, args.queue_size)
+
+    if args.payload_report:
+        CSI_PROJECTION.stats.write_report(args.payload_report)
+        ESCALATION_PROJECTION.stats.write_report(args.payload_report)
@@ -1,8 +1,14 @@
+import os
 import json
+import time
+import argparse
 import requests
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Iterable, Iterator, Tuple
 from src.config.paths import EXTRACTED_DATA_DIR, FIELD_EXTRACTION_CONFIG_DIR
+from src.pipelines.field_paths import ExtractionPlan
+from src.pipelines.extract_state import ExtractionState
+from src.pipelines.join import JoinSpec, join_datasets
 
 # --------------------------------------------------
 # Config paths
@@ -14,8 +20,13 @@ EXTRACTED_DATA_DIR.mkdir(parents=True, exist_ok=True)
 # --------------------------------------------------
 # API URLs
 # --------------------------------------------------
-INMOMENT_API_URL = "http://127.0.0.1:8080/data/raw/synergy_inmoment.json"
-FULLSTORY_API_URL = "http://127.0.0.1:8080/data/raw/synergy_fullstory.json"
+API_BASE_URL = os.getenv("DATA_API_URL", "http://127.0.0.1:8080")
+
+# Records per /records page request
+PAGE_SIZE = int(os.getenv("EXTRACTOR_PAGE_SIZE", "1000"))
+# (connect, read) timeouts: the read timeout applies between chunks, so
+# large datasets are not cut off by a cap on the total transfer time
+API_TIMEOUT = (5, 60)
 
 # --------------------------------------------------
 # Load fields configuration
@@ -26,88 +37,132 @@ INMOMENT_FIELDS = fields_to_extract.get("inmoment", [])
 FULLSTORY_FIELDS = fields_to_extract.get("fullstory", [])
 
 # --------------------------------------------------
-# Fetch JSON via API
+# Page records via API (bounded memory)
 # --------------------------------------------------
-def fetch_json_via_api(url: str) -> List[Dict]:
-    try:
-        print(f"Fetching data from API: {url}")
-        response = requests.get(url, timeout=5)
-        response.raise_for_status()
-        data = response.json()
-        return data if isinstance(data, list) else [data]
-    except Exception as e:
-        print(f"API fetch failed ({e})")
-        return []
+# `fields` is pushed down to the API so unneeded fields (e.g. full FullStory
+# events) are dropped server-side and never go over the wire
+class CursorExpired(Exception):
+    """The API no longer knows the cursor (the raw store was compacted)."""
 
-# --------------------------------------------------
-# Helper to get nested value via dot notation
-# --------------------------------------------------
-def get_nested_value(d: Dict[str, Any], path: str, default=None):
-    keys = path.split(".")
-    for k in keys:
-        if isinstance(d, dict):
-            d = d.get(k, default)
-        else:
-            return default
-    return d
+
+def iter_pages_since(
+    dataset: str, cursor: str | None = None, page_size: int = PAGE_SIZE, fields: List[str] | None = None
+) -> Iterator[Tuple[List[Dict], str | None]]:
+    """(records, resume_cursor) per page, starting at `cursor` (None: the beginning)."""
+    url = f"{API_BASE_URL}/data/raw/{dataset}/records"
+    with requests.Session() as session:
+        while True:
+            params = {"limit": page_size}
+            if fields:
+                params["fields"] = ",".join(fields)
+            if cursor:
+                params["cursor"] = cursor
+            response = session.get(url, params=params, timeout=API_TIMEOUT)
+            if response.status_code == 410:
+                raise CursorExpired(dataset)
+            response.raise_for_status()
+            page = response.json()
+            yield page["records"], page.get("resume_cursor")
+            cursor = page.get("next_cursor")
+            if not cursor:
+                return
 
 # --------------------------------------------------
-# Generic extractor with nested fields
+# Merge datasets by customer ID (join keys in src/config/join.json)
 # --------------------------------------------------
-def extract_fields(records: List[Dict], fields: List[str]) -> List[Dict]:
-    extracted = []
-    for r in records:
-        record_extracted = {f: get_nested_value(r, f) for f in fields}
-        extracted.append(record_extracted)
-    return extracted
+# One record per customer: "inmoment", every FullStory session in
+# "fullstory_sessions" and the most recent one as "fullstory". The join
+# streams (external sort-merge, see src/pipelines/join.py), so inputs larger
+# than memory spill to temp files instead of being held in dicts.
+JOIN_SPEC = JoinSpec.from_file()
+
+
+def merge_datasets(inmoment_data: Iterable[Dict], fullstory_data: Iterable[Dict]) -> List[Dict]:
+    return list(join_datasets(inmoment_data, fullstory_data, JOIN_SPEC))
 
 # --------------------------------------------------
-# Merge datasets by customer ID (InMoment.contact.id <-> FullStory.customer_id)
+# Incremental extraction (per-source watermarks)
 # --------------------------------------------------
-def merge_datasets(inmoment_data: List[Dict], fullstory_data: List[Dict]) -> List[Dict]:
-    inmoment_lookup = {str(d.get("externalId") or d.get("id")): d for d in inmoment_data}
-    fullstory_lookup = {str(d.get("customer_id") or d.get("id")): d for d in fullstory_data}
+# Each run pages through only the raw records appended since the stored
+# resume cursor, upserts their extracted fields per customer and appends one
+# merged line per customer whose InMoment or FullStory fields changed. The
+# output stays append-only; a customer that changed appears again further
+# down and the last line for an ID is the current one. With no new raw data
+# a run is two empty page requests and writes nothing.
+def _store_inmoment(state: ExtractionState, record: Dict) -> bool:
+    return state.upsert_inmoment(JOIN_SPEC.inmoment_key(record), record)
 
-    all_ids = set(inmoment_lookup.keys()).union(fullstory_lookup.keys())
-    enriched_data = []
 
-    for cust_id in all_ids:
-        combined = {
-            "id": cust_id,
-            "inmoment": inmoment_lookup.get(cust_id, {}),
-            "fullstory": fullstory_lookup.get(cust_id, {})
-        }
-        enriched_data.append(combined)
+def _store_session(state: ExtractionState, record: Dict) -> bool:
+    return state.upsert_session(JOIN_SPEC.fullstory_key(record), JOIN_SPEC.session_identity(record), record)
 
-    return enriched_data
 
-# --------------------------------------------------
-# Save JSONL safely
-# --------------------------------------------------
-def save_as_jsonl(data: List[Dict], path: Path):
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", encoding="utf-8") as f:
-        for record in data:
-            f.write(json.dumps(record, ensure_ascii=False) + "\n")
-    print(f"Saved enriched JSONL data to {path} ({len(data)} records)")
+SOURCES = (
+    ("synergy_inmoment", INMOMENT_FIELDS, _store_inmoment),
+    ("synergy_fullstory", FULLSTORY_FIELDS, _store_session),
+)
+
+
+def _sync_source(state: ExtractionState, dataset: str, fields: List[str], store) -> Dict:
+    plan = ExtractionPlan(fields)
+    start = state.watermark(dataset)
+    stats = {"fetched": 0, "changed": 0}
+    try:
+        resume = start
+        for records, resume_cursor in iter_pages_since(dataset, start, fields=fields):
+            for record in plan.iter_extract(records):
+                stats["fetched"] += 1
+                stats["changed"] += store(state, record)
+            resume = resume_cursor or resume
+    except CursorExpired:
+        if start is None:
+            raise
+        # Segments were compacted away: rescan. Unchanged customers are not
+        # marked dirty, so only real changes are appended.
+        print(f"{dataset}: watermark expired (raw store compacted); rescanning from the start")
+        state.set_watermark(dataset, None)
+        return _sync_source(state, dataset, fields, store)
+
+    if resume != start:
+        state.set_watermark(dataset, resume)
+    return stats
+
+
+def extract_incremental(output_file: Path = OUTPUT_FILE, full: bool = False) -> Dict:
+    started = time.perf_counter()
+    with ExtractionState(output_file) as state:
+        if full:
+            state.reset()
+        stats = {dataset: _sync_source(state, dataset, fields, store) for dataset, fields, store in SOURCES}
+
+        appended = 0
+        for chunk in state.dirty_customers():
+            merged = merge_datasets([i for i, _ in chunk if i], [s for _, sessions in chunk for s in sessions])
+            appended += state.append_output(merged)
+        if state.in_transaction:
+            state.commit()
+
+    stats["appended"] = appended
+    stats["seconds"] = time.perf_counter() - started
+    return stats
 
 # --------------------------------------------------
 # Main runner
 # --------------------------------------------------
 def main():
-    # Fetch data via API
-    inmoment_raw = fetch_json_via_api(INMOMENT_API_URL)
-    fullstory_raw = fetch_json_via_api(FULLSTORY_API_URL)
-
-    # Extract only configured fields
-    inmoment_extracted = extract_fields(inmoment_raw, INMOMENT_FIELDS)
-    fullstory_extracted = extract_fields(fullstory_raw, FULLSTORY_FIELDS)
-
-    # Merge datasets
-    enriched_data = merge_datasets(inmoment_extracted, fullstory_extracted)
-
-    # Save output
-    save_as_jsonl(enriched_data, OUTPUT_FILE)
+    parser = argparse.ArgumentParser(description="Extract and merge raw data from the data API")
+    parser.add_argument("--full", action="store_true", help="Ignore watermarks and rebuild the output from scratch")
+    args = parser.parse_args()
+
+    # Fetch only raw records past each source's watermark (via API, keeping
+    # only the configured fields) and append the affected customers
+    stats = extract_incremental(OUTPUT_FILE, full=args.full)
+    for dataset, _, _ in SOURCES:
+        print(f"{dataset}: {stats[dataset]['fetched']} new records, {stats[dataset]['changed']} changed")
+    if stats["appended"]:
+        print(f"Appended {stats['appended']} customers to {OUTPUT_FILE} in {stats['seconds'] * 1000:.0f} ms")
+    else:
+        print(f"No new data; {OUTPUT_FILE.name} unchanged ({stats['seconds'] * 1000:.0f} ms)")
 
 if __name__ == "__main__":
     main()
@@ -1,28 +1,15 @@
 import os
 import json
 from dotenv import load_dotenv
-from azure.identity import DefaultAzureCredential
-from azure.ai.projects import AIProjectClient
-from src.config.paths import ENV, RAW_DATA_DIR
+from src.config.paths import ENV
+from src.agents.clients import get_openai_client
+from src.pipelines.raw_store import open_raw_store
 
 # --------------------------------------------------
 # Load environment variables
 # --------------------------------------------------
 load_dotenv(ENV)
 
-# --------------------------------------------------
-# Initialize Azure AI Project client
-# --------------------------------------------------
-PROJECT_ENDPOINT = os.getenv("PROJECT_ENDPOINT")
-if not PROJECT_ENDPOINT:
-    raise ValueError("PROJECT_ENDPOINT not set in .env")
-
-project_client = AIProjectClient(
-    endpoint=PROJECT_ENDPOINT,
-    credential=DefaultAzureCredential(),
-)
-openai_client = project_client.get_openai_client()
-
 # --------------------------------------------------
 # Select agent dynamically
 # --------------------------------------------------
@@ -35,9 +22,9 @@ def select_agent():
     ).strip()
 
     if choice == "1":
-        return "INMOMENT_DATA_CREATION_AGENT", "synergy_inmoment.json"
+        return "INMOMENT_DATA_CREATION_AGENT", "synergy_inmoment"
     elif choice == "2":
-        return "FULLSTORY_DATA_CREATION_AGENT", "synergy_fullstory.json"
+        return "FULLSTORY_DATA_CREATION_AGENT", "synergy_fullstory"
     else:
         raise ValueError("Invalid selection")
 
@@ -45,7 +32,7 @@ def select_agent():
 # Main logic
 # --------------------------------------------------
 def main():
-    AGENT_KEY, savefilename = select_agent()
+    AGENT_KEY, dataset = select_agent()
 
     if AGENT_KEY not in os.environ:
         raise ValueError(f"{AGENT_KEY} not found in .env")
@@ -58,6 +45,7 @@ def main():
         raise ValueError("Prompt cannot be empty")
 
     # Create conversation
+    openai_client = get_openai_client()
     conversation = openai_client.conversations.create()
     print(f"\nConversation ID: {conversation.id}")
 
@@ -72,10 +60,6 @@ def main():
 
         print("\n===== AGENT OUTPUT =====")
 
-        # Prepare output file
-        output_file = RAW_DATA_DIR / savefilename
-        output_file.parent.mkdir(parents=True, exist_ok=True)
-
         # Load new data
         try:
             new_data = json.loads(response.output_text)
@@ -84,25 +68,13 @@ def main():
         except json.JSONDecodeError as e:
             raise ValueError(f"Error parsing agent output: {e}")
 
-        # Load existing data if file exists
-        if output_file.exists():
-            try:
-                with output_file.open("r", encoding="utf-8") as f:
-                    existing_data = json.load(f)
-                    if not isinstance(existing_data, list):
-                        raise ValueError("Existing JSON file is not an array!")
-            except json.JSONDecodeError:
-                existing_data = []
-        else:
-            existing_data = []
-
-        # Append and save
-        combined_data = existing_data + new_data
-        with output_file.open("w", encoding="utf-8") as f:
-            json.dump(combined_data, f, indent=2, ensure_ascii=False)
+        # Append as a new segment (existing data is never re-read or rewritten)
+        store = open_raw_store(dataset)
+        segment = store.append(new_data)
 
-        print(f"\nAppended {len(new_data)} new objects. Total now: {len(combined_data)}")
-        print(f"Data saved to: {output_file}")
+        print(f"\nAppended {len(new_data)} new objects. Total now: {store.record_count}")
+        if segment:
+            print(f"Data saved to: {store.dir / segment['file']}")
 
     except Exception as e:
         print("\nError running agent:", e)
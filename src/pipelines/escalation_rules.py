@@ -0,0 +1,215 @@
+import copy
+import json
+import threading
+from pathlib import Path
+
+from src.config.paths import FIELD_EXTRACTION_CONFIG_DIR
+
+# --------------------------------------------------
+# Rule-based pre-filter for the escalation agent
+# --------------------------------------------------
+# Clear-cut enriched records (e.g. positive, no incidents, clean session) are
+# tagged locally with the same output shape the escalation agent produces:
+#
+#   inmoment.tags            += "AI_priority:<level>"
+#   inmoment.incidents[*]    .AI_escalation_reason = "<reason>"
+#
+# Everything the rules do not match goes to the agent. Rules are evaluated
+# in order against a small set of signals; the first match wins. A rule
+# condition is either
+#
+#   "<signal>": value | [values]      signal equals / is one of
+#   "min_<signal>": number            signal >= number
+#   "max_<signal>": number            signal <= number
+#
+# and a signal that cannot be derived from the record (None) fails every
+# condition on it, so incomplete records always fall through to the agent.
+# Missing FullStory data or a missing incidents list makes the signals that
+# depend on them None rather than zero: the rules abstain, they do not read
+# "no data" as "clean".
+
+ESCALATION_RULES_FILE = FIELD_EXTRACTION_CONFIG_DIR / "escalation_rules.json"
+
+RISK_LEVELS = {"low": 0, "medium": 1, "high": 2}
+
+
+def _incident_comments(incident: dict) -> dict:
+    comments = incident.get("comments")
+    return comments if isinstance(comments, dict) else {}
+
+
+def escalation_signals(record: dict, frustration_events: set[str]) -> dict:
+    """
+    sentiment          "positive" | "neutral" | "negative" | "mixed" | None
+    open_incidents     incidents whose status / incidentManagementState is OPEN
+    risk_level         highest AI_risk_level (0 low .. 2 high); 0 if no incidents
+    confidence         lowest AI_confidence_score, None if none given
+    frustration_events FullStory events named in `frustration_events`, over
+                       all of the customer's sessions ("fullstory_sessions",
+                       or the single "fullstory" session if there is no list)
+
+    A missing input is not a clean one: open_incidents and risk_level are None
+    when the record has no incidents list (an empty list is fine), and
+    frustration_events is None when it has no FullStory session or any of
+    its sessions has no events list.
+    """
+    inmoment = record.get("inmoment") or {}
+    has_incidents = isinstance(inmoment.get("incidents"), list)
+    incidents = [i for i in inmoment.get("incidents") if isinstance(i, dict)] if has_incidents else []
+
+    sentiments = {
+        t.split(":", 1)[1].strip().lower()
+        for t in inmoment.get("tags") or []
+        if isinstance(t, str) and t.startswith("AI_sentiment:")
+    }
+    if not sentiments:
+        sentiments = {
+            str(_incident_comments(i)["AI_sentiment"]).lower()
+            for i in incidents if _incident_comments(i).get("AI_sentiment")
+        }
+    sentiment = None if not sentiments else sentiments.pop() if len(sentiments) == 1 else "mixed"
+
+    open_incidents = sum(
+        1 for i in incidents
+        if str(i.get("status") or i.get("incidentManagementState") or "").lower() == "open"
+    ) if has_incidents else None
+
+    risks = [
+        RISK_LEVELS.get(str(_incident_comments(i).get("AI_risk_level") or i.get("AI_risk_level")).lower())
+        for i in incidents if _incident_comments(i).get("AI_risk_level") or i.get("AI_risk_level")
+    ]
+    if not has_incidents:
+        risk_level = None
+    elif not incidents:
+        risk_level = 0
+    elif not risks or None in risks:
+        risk_level = None
+    else:
+        risk_level = max(risks)
+
+    scores = [
+        _incident_comments(i)["AI_confidence_score"] for i in incidents
+        if isinstance(_incident_comments(i).get("AI_confidence_score"), (int, float))
+    ]
+
+    sessions = record.get("fullstory_sessions")
+    if not isinstance(sessions, list):
+        sessions = [record.get("fullstory")]
+    sessions = [s for s in sessions if s is not None]
+    frustration = None
+    if sessions and all(isinstance(s, dict) and isinstance(s.get("events"), list) for s in sessions):
+        frustration = 0
+        for e in (e for s in sessions for e in s["events"]):
+            if not isinstance(e, dict):
+                continue
+            name = (e.get("event_properties") or {}).get("name") or e.get("event_type")
+            if name in frustration_events or e.get("event_type") in frustration_events:
+                frustration += 1
+
+    return {
+        "sentiment": sentiment,
+        "open_incidents": open_incidents,
+        "risk_level": risk_level,
+        "confidence": min(scores) if scores else None,
+        "frustration_events": frustration,
+    }
+
+
+def _matches(signals: dict, when: dict) -> bool:
+    for key, expected in when.items():
+        if key.startswith("min_"):
+            value = signals.get(key[4:])
+            if value is None or value < expected:
+                return False
+        elif key.startswith("max_"):
+            value = signals.get(key[4:])
+            if value is None or value > expected:
+                return False
+        else:
+            value = signals.get(key)
+            allowed = expected if isinstance(expected, list) else [expected]
+            if value is None or value not in allowed:
+                return False
+    return True
+
+
+def apply_priority(record: dict, priority: str, reason: str) -> dict:
+    """Copy of `record` tagged the way the escalation agent tags it."""
+    tagged = copy.deepcopy(record)
+    inmoment = tagged.setdefault("inmoment", {})
+    tags = inmoment.get("tags")
+    if not isinstance(tags, list):
+        tags = inmoment["tags"] = []
+    tags.append(f"AI_priority:{priority}")
+    for incident in inmoment.get("incidents") or []:
+        if isinstance(incident, dict):
+            incident["AI_escalation_reason"] = reason
+    return tagged
+
+# --------------------------------------------------
+# Cascade with skip-rate metrics
+# --------------------------------------------------
+class EscalationCascade:
+    """Decides clear cases locally; decide() returns None for the agent's share."""
+
+    def __init__(self, rules: list[dict], frustration_events=(), enabled: bool = True):
+        self.rules = rules
+        self.frustration_events = set(frustration_events)
+        self.enabled = enabled
+        self.evaluated = 0
+        self.to_agent = 0
+        self.by_rule = {rule["name"]: 0 for rule in rules}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: Path = ESCALATION_RULES_FILE, enabled: bool | None = None) -> "EscalationCascade":
+        with Path(path).open("r", encoding="utf-8") as f:
+            config = json.load(f)
+        return cls(
+            config.get("rules", []),
+            config.get("frustration_events", []),
+            config.get("enabled", True) if enabled is None else enabled,
+        )
+
+    def decide(self, record: dict) -> dict | None:
+        if not self.enabled:
+            with self._lock:
+                self.evaluated += 1
+                self.to_agent += 1
+            return None
+
+        signals = escalation_signals(record, self.frustration_events)
+        for rule in self.rules:
+            if _matches(signals, rule.get("when", {})):
+                with self._lock:
+                    self.evaluated += 1
+                    self.by_rule[rule["name"]] += 1
+                reason = f"[rule:{rule['name']}] {rule.get('reason', '')}".strip()
+                return apply_priority(record, rule["priority"], reason)
+
+        with self._lock:
+            self.evaluated += 1
+            self.to_agent += 1
+        return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            decided = self.evaluated - self.to_agent
+            return {
+                "evaluated": self.evaluated,
+                "decided_by_rules": decided,
+                "sent_to_agent": self.to_agent,
+                "skip_rate": decided / self.evaluated if self.evaluated else 0.0,
+                # Each rule decision replaces at least one escalation agent call
+                "llm_calls_saved": decided,
+                "by_rule": dict(self.by_rule),
+            }
+
+    def summary(self) -> str:
+        s = self.stats()
+        rules = " ".join(f"{name}={n}" for name, n in s["by_rule"].items())
+        return (
+            f"[escalation pre-filter] evaluated={s['evaluated']} rules={s['decided_by_rules']} "
+            f"agent={s['sent_to_agent']} skip_rate={s['skip_rate']:.1%} "
+            f"llm_calls_saved={s['llm_calls_saved']} ({rules})"
+        )
@@ -0,0 +1,235 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+# --------------------------------------------------
+# Incremental extraction state
+# --------------------------------------------------
+# The extractor output <name>.jsonl gets a sidecar <name>.jsonl.state.sqlite:
+#
+#   watermarks   per raw source, the API resume cursor after the last run
+#   customers    latest extracted InMoment record per customer, a dirty
+#                flag set when it or any of the customer's sessions changed,
+#                and a digest of the merged line last appended for them
+#   sessions     every FullStory session per customer, by session identity
+#   meta         byte length of the output file as of the last commit, and
+#                the schema version (an older state is rebuilt from scratch)
+#
+# A run upserts the new raw records, appends one merged line per dirty
+# customer (unless it equals the line already appended for it) to the output,
+# then commits watermarks, dirty flags and the new output length in one
+# transaction. A crash before the commit rolls the state back, and the next
+# open truncates the output to the committed length, so no customer is
+# appended twice.
+#
+# An output the state does not account for (one written before incremental
+# extraction, one whose state has an older schema, or one shorter than its
+# committed length) is never truncated or emptied: it is moved aside to
+# <name>.jsonl.bak and the output is rebuilt from scratch.
+
+SCHEMA_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS watermarks (source TEXT PRIMARY KEY, cursor TEXT);
+CREATE TABLE IF NOT EXISTS customers (
+    id TEXT PRIMARY KEY,
+    inmoment TEXT,
+    dirty INTEGER NOT NULL DEFAULT 0,
+    emitted TEXT
+);
+CREATE INDEX IF NOT EXISTS customers_dirty ON customers (dirty) WHERE dirty = 1;
+CREATE TABLE IF NOT EXISTS sessions (
+    customer_id TEXT NOT NULL,
+    session TEXT NOT NULL,
+    record TEXT NOT NULL,
+    PRIMARY KEY (customer_id, session)
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+"""
+
+
+def state_path(output_path: Path) -> Path:
+    return output_path.with_name(output_path.name + ".state.sqlite")
+
+
+def _dumps(record: Dict) -> str:
+    # Extraction plans emit fields in config order, so this is stable per record
+    return json.dumps(record, ensure_ascii=False)
+
+
+class ExtractionState:
+    def __init__(self, output_path):
+        self.output_path = Path(output_path)
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        path = state_path(self.output_path)
+        self._db = sqlite3.connect(str(path))
+        self._db.execute("PRAGMA journal_mode=WAL")
+        tables = {row[0] for row in self._db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        # A state from before schema versioning has a meta table but no version
+        version = self._meta("schema_version", 1) if "meta" in tables else SCHEMA_VERSION
+        if version != SCHEMA_VERSION:
+            print(f"{path.name} has an older schema; rebuilding from scratch")
+            self._db.close()
+            for stale in path.parent.glob(path.name + "*"):
+                stale.unlink()
+            self._set_aside()
+            self._db = sqlite3.connect(str(path))
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        if self._meta("schema_version", None) is None:
+            with self._db:
+                self._db.execute("INSERT INTO meta (key, value) VALUES ('schema_version', ?)", (SCHEMA_VERSION,))
+        self._recover_output()
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is not None:
+            self._db.rollback()
+        self.close()
+
+    # --------------------------------------------------
+    # Output file
+    # --------------------------------------------------
+    def _meta(self, key: str, default: int | None) -> int | None:
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_aside(self):
+        """Move a non-empty output out of the way (never delete it)."""
+        if not self.output_path.exists() or self.output_path.stat().st_size == 0:
+            return
+        backup = self.output_path.with_name(self.output_path.name + ".bak")
+        if backup.exists():
+            backup = self.output_path.with_name(f"{self.output_path.name}.{time.strftime('%Y%m%d%H%M%S')}.bak")
+        os.replace(self.output_path, backup)
+        print(f"Moved the existing {self.output_path.name} to {backup.name}")
+
+    def _recover_output(self):
+        offset = self._meta("output_offset", None)
+        size = self.output_path.stat().st_size if self.output_path.exists() else 0
+        if offset is None:
+            # New state: any existing output was not written by it
+            if size:
+                print(f"{self.output_path.name} has no extraction state; rebuilding from scratch")
+                self._set_aside()
+            self.reset()
+        elif size < offset:
+            # Output was replaced or removed outside the extractor: rebuild it
+            print(f"{self.output_path.name} is shorter than its extraction state; rebuilding from scratch")
+            self._set_aside()
+            self.reset()
+        elif size > offset:
+            # Lines from a run that never committed
+            with self.output_path.open("r+b") as f:
+                f.truncate(offset)
+            print(f"Truncated {size - offset} uncommitted bytes from {self.output_path.name}")
+
+    def reset(self):
+        """Forget all watermarks and customers and empty the output file."""
+        with self._db:
+            self._db.execute("DELETE FROM watermarks")
+            self._db.execute("DELETE FROM customers")
+            self._db.execute("DELETE FROM sessions")
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('output_offset', 0)")
+        self.output_path.write_bytes(b"")
+
+    # --------------------------------------------------
+    # Watermarks
+    # --------------------------------------------------
+    def watermark(self, source: str) -> str | None:
+        row = self._db.execute("SELECT cursor FROM watermarks WHERE source = ?", (source,)).fetchone()
+        return row[0] if row else None
+
+    def set_watermark(self, source: str, cursor: str | None):
+        self._db.execute("INSERT OR REPLACE INTO watermarks (source, cursor) VALUES (?, ?)", (source, cursor))
+
+    # --------------------------------------------------
+    # Customers
+    # --------------------------------------------------
+    def upsert_inmoment(self, customer_id: str, record: Dict) -> bool:
+        """Store the customer's InMoment record; True if it changed."""
+        cursor = self._db.execute(
+            "INSERT INTO customers (id, inmoment, dirty) VALUES (?, ?, 1) "
+            "ON CONFLICT (id) DO UPDATE SET inmoment = excluded.inmoment, dirty = 1 "
+            "WHERE customers.inmoment IS NOT excluded.inmoment",
+            (customer_id, _dumps(record)),
+        )
+        return cursor.rowcount > 0
+
+    def upsert_session(self, customer_id: str, session: str, record: Dict) -> bool:
+        """Add or replace one FullStory session of the customer; True if it changed."""
+        cursor = self._db.execute(
+            "INSERT INTO sessions (customer_id, session, record) VALUES (?, ?, ?) "
+            "ON CONFLICT (customer_id, session) DO UPDATE SET record = excluded.record "
+            "WHERE sessions.record IS NOT excluded.record",
+            (customer_id, session, _dumps(record)),
+        )
+        if cursor.rowcount == 0:
+            return False
+        self._db.execute(
+            "INSERT INTO customers (id, dirty) VALUES (?, 1) ON CONFLICT (id) DO UPDATE SET dirty = 1",
+            (customer_id,),
+        )
+        return True
+
+    def dirty_customers(self, chunk_size: int = 1000) -> Iterator[List[Tuple[Dict | None, List[Dict]]]]:
+        """Changed customers as (inmoment record, sessions), a chunk at a time."""
+        rows = self._db.execute("SELECT id, inmoment FROM customers WHERE dirty = 1 ORDER BY id")
+        while True:
+            chunk = rows.fetchmany(chunk_size)
+            if not chunk:
+                return
+            yield [
+                (
+                    json.loads(inmoment) if inmoment else None,
+                    [
+                        json.loads(record) for (record,) in self._db.execute(
+                            "SELECT record FROM sessions WHERE customer_id = ? ORDER BY rowid", (customer_id,)
+                        )
+                    ],
+                )
+                for customer_id, inmoment in chunk
+            ]
+
+    # --------------------------------------------------
+    # Output and commit
+    # --------------------------------------------------
+    def append_output(self, merged: Iterable[Dict]) -> int:
+        """
+        Append merged customer records (keyed by "id") to the output and
+        fsync; a record identical to the customer's last appended line (e.g.
+        a change that was later reverted) is skipped. Returns lines written.
+        """
+        written = 0
+        with self.output_path.open("ab") as f:
+            for record in merged:
+                line = (_dumps(record) + "\n").encode("utf-8")
+                digest = hashlib.sha1(line).hexdigest()
+                row = self._db.execute("SELECT emitted FROM customers WHERE id = ?", (record["id"],)).fetchone()
+                if row and row[0] == digest:
+                    continue
+                self._db.execute("UPDATE customers SET emitted = ? WHERE id = ?", (digest, record["id"]))
+                f.write(line)
+                written += 1
+            f.flush()
+            os.fsync(f.fileno())
+        return written
+
+    def commit(self):
+        size = self.output_path.stat().st_size if self.output_path.exists() else 0
+        self._db.execute("UPDATE customers SET dirty = 0 WHERE dirty = 1")
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('output_offset', ?)", (size,))
+        self._db.commit()
+
+    @property
+    def in_transaction(self) -> bool:
+        return self._db.in_transaction
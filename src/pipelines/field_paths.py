@@ -0,0 +1,168 @@
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Iterator, List
+
+# --------------------------------------------------
+# Compiled field paths
+# --------------------------------------------------
+# Path syntax (as used in fields_to_extract.json):
+#
+#   contact.id            nested keys
+#   answers[0].text       list index (negative counts from the end)
+#   answers[*].text       every item -> list of values
+#
+# A path is parsed once into steps and compiled into a chain of closures;
+# a missing key / index or a type mismatch yields None, like the old
+# get_nested_value. Wildcards keep one list level per [*].
+
+_TOKEN = re.compile(r"([^.\[\]]+)|\[(\*|-?\d+)\]|(\.)")
+
+KEY, INDEX, ALL = "key", "index", "all"
+
+
+def parse_path(path: str) -> tuple:
+    steps = []
+    pos = 0
+    expect_key = True   # at the start and after ".", only a key may follow
+    for match in _TOKEN.finditer(path):
+        if match.start() != pos:
+            break
+        name, bracket, dot = match.groups()
+        if (name is not None) != expect_key:
+            break
+        pos = match.end()
+        expect_key = dot is not None
+        if name is not None:
+            steps.append((KEY, name))
+        elif bracket == "*":
+            steps.append((ALL, None))
+        elif bracket is not None:
+            steps.append((INDEX, int(bracket)))
+    if pos != len(path) or expect_key:
+        raise ValueError(f"Invalid field path: {path!r}")
+    return tuple(steps)
+
+
+def _compile_steps(steps: tuple) -> Callable[[Any], Any]:
+    if not steps:
+        return lambda value: value
+    kind, arg = steps[0]
+    rest = _compile_steps(steps[1:])
+
+    if kind == KEY:
+        def get_key(value):
+            return rest(value.get(arg)) if isinstance(value, dict) else None
+        return get_key
+    if kind == INDEX:
+        def get_index(value):
+            if isinstance(value, list) and -len(value) <= arg < len(value):
+                return rest(value[arg])
+            return None
+        return get_index
+
+    def get_all(value):
+        return [rest(item) for item in value] if isinstance(value, list) else None
+    return get_all
+
+
+@lru_cache(maxsize=None)
+def compile_path(path: str) -> Callable[[Any], Any]:
+    return _compile_steps(parse_path(path))
+
+# --------------------------------------------------
+# Extraction plan: flat {path: value} per record
+# --------------------------------------------------
+class ExtractionPlan:
+    def __init__(self, fields: List[str]):
+        self.fields = list(fields)
+        self._getters = [(field, compile_path(field)) for field in self.fields]
+
+    def extract(self, record: Dict) -> Dict:
+        return {field: get(record) for field, get in self._getters}
+
+    def extract_many(self, records: Iterable[Dict]) -> List[Dict]:
+        getters = self._getters
+        return [{field: get(r) for field, get in getters} for r in records]
+
+    def iter_extract(self, records: Iterable[Dict]) -> Iterator[Dict]:
+        getters = self._getters
+        for r in records:
+            yield {field: get(r) for field, get in getters}
+
+# --------------------------------------------------
+# Projection plan: same-shaped subset of each record
+# --------------------------------------------------
+# Used for ?fields= on the API: the projected record keeps the original
+# nesting, so an ExtractionPlan over the same fields gives identical results
+# on projected and full records. List positions are preserved; items not
+# selected by an index step become None.
+
+class _Node:
+    __slots__ = ("leaf", "keys", "items")
+
+    def __init__(self):
+        self.leaf = False
+        self.keys: Dict[str, "_Node"] = {}
+        self.items: Dict[Any, "_Node"] = {}   # int index or "*"
+
+
+def _merge(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    if isinstance(a, dict) and isinstance(b, dict):
+        merged = dict(a)
+        for k, v in b.items():
+            merged[k] = _merge(merged.get(k), v)
+        return merged
+    if isinstance(a, list) and isinstance(b, list):
+        return [_merge(x, y) for x, y in zip(a, b)]
+    return b
+
+
+class ProjectionPlan:
+    def __init__(self, fields: List[str]):
+        self.fields = list(fields)
+        self._root = _Node()
+        for field in self.fields:
+            node = self._root
+            for kind, arg in parse_path(field):
+                children = node.keys if kind == KEY else node.items
+                node = children.setdefault(arg if kind != ALL else "*", _Node())
+            node.leaf = True
+
+    def project(self, record: Dict) -> Dict:
+        projected = self._project(self._root, record)
+        return projected if isinstance(projected, dict) else {}
+
+    def _project(self, node: _Node, value):
+        if node.leaf or value is None:
+            return value
+        if node.keys and isinstance(value, dict):
+            return {k: self._project(child, value[k]) for k, child in node.keys.items() if k in value}
+        if node.items and isinstance(value, list):
+            n = len(value)
+            star = node.items.get("*")
+            indexed: Dict[int, List[_Node]] = {}   # answers[0] and answers[-1] can be the same item
+            for i, child in node.items.items():
+                if i != "*" and -n <= i < n:
+                    indexed.setdefault(i % n, []).append(child)
+            out = []
+            for i, item in enumerate(value):
+                projected = self._project(star, item) if star is not None else None
+                for child in indexed.get(i, ()):
+                    projected = _merge(projected, self._project(child, item))
+                out.append(projected)
+            return out
+        return None
+
+
+def parse_fields_param(fields: str | None) -> List[str] | None:
+    """?fields=a,b.c,answers[*].text -> ["a", "b.c", "answers[*].text"]"""
+    if not fields:
+        return None
+    parsed = [f.strip() for f in fields.split(",") if f.strip()]
+    for field in parsed:
+        parse_path(field)
+    return parsed
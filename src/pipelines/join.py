@@ -0,0 +1,194 @@
+import os
+import json
+import heapq
+import hashlib
+import tempfile
+import itertools
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+from src.config.paths import FIELD_EXTRACTION_CONFIG_DIR
+from src.pipelines.field_paths import compile_path
+
+# --------------------------------------------------
+# Streaming sort-merge join: InMoment customer <-> FullStory sessions
+# --------------------------------------------------
+# Both inputs are sorted by join key with an external sort, then merged
+# group by group:
+#
+#   1. records are encoded as  <key json> TAB <record json>  lines and
+#      buffered until the memory budget is reached; each full buffer is
+#      sorted and spilled to a run file in a temp dir
+#   2. the runs are k-way merged (heapq.merge), in several passes if there
+#      are more than MAX_MERGE_FAN_IN of them
+#   3. the two sorted streams are walked side by side (full outer join),
+#      holding only the current customer's records in memory
+#
+# Memory is bounded by the budget plus one customer's group, however large
+# the inputs; inputs that fit in the budget never touch disk. The sort is
+# stable, so records with the same key keep their input order.
+#
+# A customer has at most one InMoment record (the last one wins) and any
+# number of FullStory sessions: all of them, deduplicated by session key and
+# ordered by `order_sessions_by`, go to "fullstory_sessions", and the most
+# recent one is also "fullstory" so single-session consumers keep working.
+
+JOIN_CONFIG_FILE = FIELD_EXTRACTION_CONFIG_DIR / "join.json"
+
+# Sort buffer budget for both inputs together (approximate: line bytes)
+JOIN_MEMORY_MB = int(os.getenv("JOIN_MEMORY_MB", "256"))
+# Where run files are spilled (default: the system temp dir)
+JOIN_TMP_DIR = os.getenv("JOIN_TMP_DIR") or None
+
+MAX_MERGE_FAN_IN = 128
+
+
+def key_getter(paths: List[str]) -> Callable[[Dict], str]:
+    """First truthy value of `paths` as a string, like str(a or b)."""
+    getters = [compile_path(p) for p in paths]
+
+    def key(record: Dict) -> str:
+        value = None
+        for get in getters:
+            value = get(record)
+            if value:
+                break
+        return str(value)
+    return key
+
+
+class JoinSpec:
+    def __init__(
+        self,
+        inmoment_key: List[str],
+        fullstory_key: List[str],
+        session_key: List[str] | None = None,
+        order_sessions_by: str | None = None,
+    ):
+        self.inmoment_key = key_getter(inmoment_key)
+        self.fullstory_key = key_getter(fullstory_key)
+        self._session_key = [compile_path(p) for p in session_key or []]
+        self._order_by = compile_path(order_sessions_by) if order_sessions_by else None
+
+    @classmethod
+    def from_file(cls, path: Path = JOIN_CONFIG_FILE) -> "JoinSpec":
+        with Path(path).open("r", encoding="utf-8") as f:
+            return cls(**json.load(f))
+
+    def session_identity(self, session: Dict) -> str:
+        """Configured session key, or a digest of the record when it has none."""
+        for get in self._session_key:
+            value = get(session)
+            if value:
+                return str(value)
+        return "sha1:" + hashlib.sha1(json.dumps(session, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def combine(self, key: str, inmoment: List[Dict], sessions: List[Dict]) -> Dict:
+        unique = list({self.session_identity(s): s for s in sessions}.values())
+        if self._order_by is not None:
+            # Sessions without the field sort first, i.e. are never "latest"
+            order_by = self._order_by
+            unique.sort(key=lambda s: (order_by(s) is not None, str(order_by(s) or "")))
+        return {
+            "id": key,
+            "inmoment": inmoment[-1] if inmoment else {},
+            "fullstory": unique[-1] if unique else {},
+            "fullstory_sessions": unique,
+        }
+
+# --------------------------------------------------
+# External sort
+# --------------------------------------------------
+def _sort_key(line: bytes) -> bytes:
+    return line[:line.index(b"\t")]
+
+
+def _write_run(lines: Iterable[bytes], path: Path) -> Path:
+    with path.open("wb", buffering=1 << 20) as f:
+        for line in lines:
+            f.write(line)
+            f.write(b"\n")
+    return path
+
+
+def _read_run(path: Path) -> Iterator[bytes]:
+    # Up to MAX_MERGE_FAN_IN runs are open at once: keep their buffers small
+    with path.open("rb", buffering=1 << 16) as f:
+        for line in f:
+            yield line[:-1]
+
+
+def sorted_by_key(
+    records: Iterable[Dict], key: Callable[[Dict], str], tmp_dir: Path, memory_bytes: int, name: str = "run"
+) -> Iterator[bytes]:
+    """`key json TAB record json` lines in key order (stable)."""
+    tmp_dir = Path(tmp_dir)
+    runs: List[Path] = []
+    buffer: List[bytes] = []
+    used = 0
+    for record in records:
+        line = json.dumps(key(record)).encode("ascii") + b"\t" + json.dumps(record, ensure_ascii=False).encode("utf-8")
+        buffer.append(line)
+        used += len(line) + 64  # + per-object overhead
+        if used >= memory_bytes:
+            buffer.sort(key=_sort_key)
+            runs.append(_write_run(buffer, tmp_dir / f"{name}-{len(runs):05d}.run"))
+            buffer, used = [], 0
+
+    buffer.sort(key=_sort_key)
+    if not runs:
+        yield from buffer
+        return
+    if buffer:
+        runs.append(_write_run(buffer, tmp_dir / f"{name}-{len(runs):05d}.run"))
+    buffer = []
+
+    # Too many runs to open at once: merge them in passes (order is kept,
+    # so equal keys stay in input order)
+    generation = 0
+    while len(runs) > MAX_MERGE_FAN_IN:
+        generation += 1
+        merged = []
+        for i in range(0, len(runs), MAX_MERGE_FAN_IN):
+            group = runs[i:i + MAX_MERGE_FAN_IN]
+            path = tmp_dir / f"{name}-g{generation}-{len(merged):05d}.run"
+            merged.append(_write_run(heapq.merge(*(_read_run(p) for p in group), key=_sort_key), path))
+            for p in group:
+                p.unlink()
+        runs = merged
+
+    yield from heapq.merge(*(_read_run(p) for p in runs), key=_sort_key)
+
+
+def _groups(lines: Iterator[bytes]) -> Iterator[Tuple[bytes, List[Dict]]]:
+    for key, group in itertools.groupby(lines, key=_sort_key):
+        yield key, [json.loads(line[len(key) + 1:]) for line in group]
+
+# --------------------------------------------------
+# Join
+# --------------------------------------------------
+def join_datasets(
+    inmoment: Iterable[Dict],
+    fullstory: Iterable[Dict],
+    spec: JoinSpec | None = None,
+    memory_mb: int = JOIN_MEMORY_MB,
+    tmp_dir: str | None = JOIN_TMP_DIR,
+) -> Iterator[Dict]:
+    """Full outer join, one merged record per customer, in key order."""
+    spec = spec or JoinSpec.from_file()
+    budget = memory_mb * 1024 * 1024 // 2
+    with tempfile.TemporaryDirectory(prefix="join-", dir=tmp_dir) as tmp:
+        left = _groups(sorted_by_key(inmoment, spec.inmoment_key, Path(tmp), budget, "inmoment"))
+        right = _groups(sorted_by_key(fullstory, spec.fullstory_key, Path(tmp), budget, "fullstory"))
+        l, r = next(left, None), next(right, None)
+        while l is not None or r is not None:
+            if r is None or (l is not None and l[0] < r[0]):
+                key, inmoment_records, sessions = l[0], l[1], []
+                l = next(left, None)
+            elif l is None or r[0] < l[0]:
+                key, inmoment_records, sessions = r[0], [], r[1]
+                r = next(right, None)
+            else:
+                key, inmoment_records, sessions = l[0], l[1], r[1]
+                l, r = next(left, None), next(right, None)
+            yield spec.combine(json.loads(key), inmoment_records, sessions)
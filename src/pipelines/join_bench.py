@@ -0,0 +1,99 @@
+import time
+import argparse
+import resource
+
+from src.pipelines.join import JoinSpec, join_datasets
+
+# --------------------------------------------------
+# Join benchmark: memory stays flat as FullStory input grows
+# --------------------------------------------------
+# Streams synthetic InMoment customers and FullStory sessions (several per
+# customer) through join_datasets and samples the resident set size while
+# the input is read and while the merged output is consumed. Nothing is
+# materialized outside the join itself.
+#
+#   python -m src.pipelines.join_bench --rows 10000000 --memory-mb 256
+#   python -m src.pipelines.join_bench --rows 1000000 --sessions-per-customer 8
+
+
+def rss_mb() -> float:
+    """Current resident set size (Linux /proc), in MB."""
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * resource.getpagesize() / (1024 * 1024)
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def synthetic_inmoment(customers: int):
+    for c in range(customers):
+        yield {
+            "id": f"IM{c:09d}",
+            "externalId": f"CUST{c:09d}",
+            "overall_score": c % 11,
+            "tags": ["billing", "checkout"] if c % 3 else [],
+        }
+
+
+def synthetic_fullstory(rows: int, customers: int, samples: list, every: int):
+    # Sessions arrive interleaved across customers, as they would from the store
+    for i in range(rows):
+        if i % every == 0:
+            samples.append(("read", i, rss_mb()))
+        yield {
+            "customer_id": f"CUST{(i * 7919) % customers:09d}",
+            "session_id": f"S{i:010d}",
+            "platform": "web" if i % 2 else "ios",
+            "session_start_time": f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}T{i % 24:02d}:00:00Z",
+            "signals": {"rage_clicks": i % 5, "errors": i % 3},
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming join memory benchmark")
+    parser.add_argument("--rows", type=int, default=10_000_000, help="FullStory session rows")
+    parser.add_argument("--sessions-per-customer", type=int, default=4)
+    parser.add_argument("--memory-mb", type=int, default=256, help="join sort budget")
+    parser.add_argument("--tmp-dir", help="where sort runs are spilled")
+    parser.add_argument("--samples", type=int, default=10, help="RSS samples per phase")
+    args = parser.parse_args()
+
+    customers = max(1, args.rows // args.sessions_per_customer)
+    every = max(1, args.rows // args.samples)
+    samples: list = []
+    baseline = rss_mb()
+
+    spec = JoinSpec(["externalId", "id"], ["customer_id", "id"], ["session_id"], "session_start_time")
+    started = time.perf_counter()
+    merged = sessions = 0
+    output_every = max(1, customers // args.samples)
+    for record in join_datasets(
+        synthetic_inmoment(customers),
+        synthetic_fullstory(args.rows, customers, samples, every),
+        spec,
+        memory_mb=args.memory_mb,
+        tmp_dir=args.tmp_dir,
+    ):
+        if merged % output_every == 0:
+            samples.append(("merge", merged, rss_mb()))
+        merged += 1
+        sessions += len(record["fullstory_sessions"])
+    elapsed = time.perf_counter() - started
+
+    print(f"\nJoin benchmark: {args.rows:,} FullStory rows, {customers:,} customers, budget {args.memory_mb} MB")
+    print(f"{'phase':<6} {'rows':>14} {'rss_mb':>9}")
+    print(f"{'start':<6} {0:>14,} {baseline:>9.1f}")
+    for phase, count, rss in samples:
+        print(f"{phase:<6} {count:>14,} {rss:>9.1f}")
+    print(
+        f"\nmerged={merged:,} sessions={sessions:,} elapsed={elapsed:.1f}s "
+        f"rows/sec={args.rows / elapsed:,.0f} peak_rss={peak_rss_mb():.1f} MB"
+    )
+    if sessions != args.rows:
+        raise SystemExit(f"Expected {args.rows} sessions in the output, got {sessions}")
+
+
+if __name__ == "__main__":
+    main()
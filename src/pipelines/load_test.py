@@ -0,0 +1,264 @@
+import os
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+
+from src.agents import clients
+from src.agents.local_backend import LatencyModel, LocalAgentClient, load_recorded
+
+# --------------------------------------------------
+# Load test: enricher / orchestrator against the local agent backend
+# --------------------------------------------------
+# Runs the real pipeline code with the OpenAI client swapped for a
+# LocalAgentClient, so throughput changes can be measured without Azure.
+#
+#   python -m src.pipelines.load_test --target enricher --records 500 --workers 16 --latency-ms 300
+#   python -m src.pipelines.load_test --target orchestrator --records 200 --workers 8 --throttle-rate 0.05
+
+
+class LatencyRecorder:
+    """Thread-safe list of per-call durations (seconds)."""
+
+    def __init__(self):
+        self.samples: list[float] = []
+        self._lock = threading.Lock()
+
+    def wrap(self, fn):
+        def timed(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.samples.append(time.perf_counter() - t0)
+        return timed
+
+    def percentiles(self) -> dict:
+        values = sorted(self.samples)
+        if not values:
+            return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+
+        def pct(q: float) -> float:
+            return values[min(len(values) - 1, int(round(q * (len(values) - 1))))] * 1000
+
+        return {"p50_ms": pct(0.50), "p95_ms": pct(0.95), "p99_ms": pct(0.99), "max_ms": values[-1] * 1000}
+
+
+# --------------------------------------------------
+# Synthetic extractor output
+# --------------------------------------------------
+# Records have the merged shape the extractor writes ({"id", "inmoment",
+# "fullstory", "fullstory_sessions"}, see src/pipelines/join.py) with full
+# FullStory event streams, so payload projection has real work to do, and
+# a mix of profiles so the escalation rules see the cases they decide:
+#
+#   clear_low   positive, no incidents, clean sessions   (rule: low)
+#   clear_high  negative, open high-risk incident        (rule: high)
+#   ambiguous   everything else, e.g. a positive survey with a failed
+#               payment in an earlier session             (agent)
+PROFILES = (("clear_low", 0.4), ("clear_high", 0.2), ("ambiguous", 0.4))
+
+_ANSWERS = {
+    "positive": "The billing team explained every line of my bill and fixed the duplicate charge the same day.",
+    "negative": "I was charged twice, nobody called me back and the app kept failing when I tried to pay.",
+    "neutral": "The bill was a little confusing but I eventually found the breakdown I needed.",
+}
+_PAGES = ("login", "bill", "payments", "usage", "support", "profile")
+_CLEAN_EVENTS = ("Login_Success", "View_Bill", "View_Usage", "Payment_Attempt", "Payment_Success", "Open_Support")
+_FRUSTRATION_EVENTS = ("Payment_Failed", "Login_Failed")
+
+
+def synthetic_session(rng, customer_id: str, index: int, frustrated: bool) -> dict:
+    start = f"2026-02-{1 + index:02d}T{rng.randint(8, 20):02d}:00:00Z"
+    events = []
+    for e in range(rng.randint(10, 80)):
+        page = rng.choice(_PAGES)
+        if frustrated and rng.random() < 0.08 and rng.random() < 0.5:
+            event_type, properties = "rage_click", {"target": "button.pay"}
+        else:
+            names = _FRUSTRATION_EVENTS if frustrated and rng.random() < 0.04 else _CLEAN_EVENTS
+            event_type = "custom_event"
+            properties = {"name": rng.choice(names), "properties": {"attempt_number": rng.randint(1, 3)}}
+        events.append({
+            "event_id": f"evt_{customer_id}_{index}_{e:04d}",
+            "event_time": f"{start[:11]}{rng.randint(8, 20):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}Z",
+            "event_type": event_type,
+            "view_id": f"view_{page}",
+            "page_url": f"https://wa.app/{page}",
+            "event_properties": properties,
+        })
+    if frustrated:
+        # At least one failure, wherever the random draws fell
+        failed = events[rng.randrange(len(events))]
+        failed["event_type"] = "custom_event"
+        failed["event_properties"] = {"name": "Payment_Failed", "properties": {"reason": "card_declined"}}
+    rage = sum(1 for e in events if e["event_type"] == "rage_click")
+    return {
+        "customer_id": customer_id,
+        "events": events,
+        "session_id": f"sess_{customer_id}_{index:02d}",
+        "device_id": f"device_{customer_id}",
+        "platform": rng.choice(("web", "ios", "android")),
+        "region": "WA-Metro",
+        "session_start_time": start,
+        "session_end_time": start[:14] + "59:00Z",
+        "signals": {"rage_clicks": rage, "errors": len(events) // 40 if frustrated else 0},
+        "journey_steps": [f"view_{rng.choice(_PAGES)}" for _ in range(rng.randint(3, 30))],
+        "journey_summary": "Struggled to pay the bill" if frustrated else "Checked the bill and left",
+    }
+
+
+def synthetic_extracted(n: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    names, weights = zip(*PROFILES)
+    records = []
+    for i in range(n):
+        profile = rng.choices(names, weights)[0]
+        customer_id = f"{10000 + i}"
+        incidents = []
+        if profile == "clear_low":
+            sentiment, frustrated = "positive", [False] * rng.randint(1, 3)
+        elif profile == "clear_high":
+            sentiment, frustrated = "negative", [rng.random() < 0.5 for _ in range(rng.randint(1, 3))]
+            risk, confidence = "high", round(rng.uniform(0.7, 0.95), 2)
+        else:
+            sentiment = rng.choice(("positive", "neutral", "negative"))
+            # A positive survey with frustration only in an earlier session
+            frustrated = [True] + [False] * rng.randint(0, 2) if sentiment == "positive" else \
+                [rng.random() < 0.5 for _ in range(rng.randint(1, 3))]
+            risk, confidence = rng.choice(("low", "medium")), round(rng.uniform(0.3, 0.9), 2)
+        if profile != "clear_low" and (profile == "clear_high" or sentiment != "positive"):
+            incidents.append({
+                "id": f"INC-{i:06d}",
+                "type": "billing",
+                "status": "OPEN",
+                "description": "Duplicate line item on the latest statement.",
+                "time": "2026-02-09T11:45:00Z",
+                "comments": {"AI_sentiment": sentiment, "AI_risk_level": risk, "AI_confidence_score": confidence},
+            })
+        sessions = [synthetic_session(rng, customer_id, k, f) for k, f in enumerate(frustrated)]
+        records.append({
+            "id": customer_id,
+            "inmoment": {
+                "id": f"IM{i:06d}",
+                "externalId": int(customer_id),
+                "survey_id": "SVY-Billing-001",
+                "overall_score": {"positive": 9, "neutral": 6, "negative": 2}[sentiment],
+                "answers": [{"answerId": "ANS-1", "text": _ANSWERS[sentiment]}],
+                "tags": [f"AI_sentiment:{sentiment}", "billing"],
+                "scores_by_category": {"billing": rng.randint(1, 10), "support": rng.randint(1, 10)},
+                "incidents": incidents,
+                "metadata": {"channel": rng.choice(("web", "phone", "email"))},
+            },
+            "fullstory": sessions[-1],
+            "fullstory_sessions": sessions,
+        })
+    return records
+
+# --------------------------------------------------
+# Targets
+# --------------------------------------------------
+def run_enricher(records: int, workers: int, mode: str, seed: int = 0) -> dict:
+    from src.pipelines import data_enricher as enricher
+
+    tmp = Path(tempfile.mkdtemp(prefix="enricher_load_"))
+    enricher.EXTRACTED_FILE = tmp / "extracted.jsonl"
+    enricher.ENRICHED_FILE = tmp / "enriched.jsonl"
+    enricher.ESCALATED_FILE = tmp / "escalated.jsonl"
+    enricher.CSI_AGENT_NAME = enricher.CSI_AGENT_NAME or "csi-agent"
+    enricher.ESCALATION_AGENT_NAME = enricher.ESCALATION_AGENT_NAME or "escalation-agent"
+    for controller in (enricher.CSI_CONTROLLER, enricher.ESCALATION_CONTROLLER):
+        controller.limiter.max_limit = workers
+
+    with enricher.EXTRACTED_FILE.open("w", encoding="utf-8") as f:
+        for record in synthetic_extracted(records, seed):
+            f.write(json.dumps(record) + "\n")
+
+    # Per agent call (parse included, controller retries excluded)
+    calls = LatencyRecorder()
+    enricher.call_csi_agent_single = calls.wrap(enricher.call_csi_agent_single)
+    enricher.call_escalation_agent_single = calls.wrap(enricher.call_escalation_agent_single)
+
+    t0 = time.perf_counter()
+    if mode == "batch":
+        enricher.main()
+    else:
+        enricher.process_streaming(workers, workers)
+    seconds = time.perf_counter() - t0
+
+    completed = sum(1 for line in enricher.ESCALATED_FILE.open("r", encoding="utf-8") if line.strip()) \
+        if enricher.ESCALATED_FILE.exists() else 0
+    return {"completed": completed, "seconds": seconds, "latency": calls.percentiles(), "output_dir": str(tmp)}
+
+
+def run_orchestrator(records: int, workers: int) -> dict:
+    from src.pipelines import orchestrator
+
+    for env_key in orchestrator.AGENTS.values():
+        os.environ.setdefault(env_key, env_key.lower().replace("_", "-"))
+
+    # Per agent call (each sample makes one per agent)
+    calls = LatencyRecorder()
+    orchestrator.call_agent = calls.wrap(orchestrator.call_agent)
+
+    tmp = Path(tempfile.mkdtemp(prefix="orchestrator_load_"))
+    writer = orchestrator.SampleWriter(
+        tmp / "inmoment.jsonl", tmp / "fullstory.jsonl", tmp / "progress.jsonl"
+    )
+    t0 = time.perf_counter()
+    with writer:
+        stats = orchestrator.generate_n_samples(records, max_workers=workers, writer=writer)
+    seconds = time.perf_counter() - t0
+    return {"completed": stats["written"], "seconds": seconds, "latency": calls.percentiles(), "output_dir": str(tmp)}
+
+# --------------------------------------------------
+# Entrypoint
+# --------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Load test against the local agent backend")
+    parser.add_argument("--target", choices=["enricher", "orchestrator"], default="enricher")
+    parser.add_argument("--mode", choices=["stream", "batch"], default="stream", help="enricher mode")
+    parser.add_argument("--records", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=10)
+    parser.add_argument("--latency", choices=LatencyModel.KINDS, default="lognormal")
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--sigma", type=float, default=0.5, help="lognormal tail shape")
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after-ms", type=int, default=100)
+    parser.add_argument("--recorded", help="JSONL of recorded outputs to replay")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    backend = LocalAgentClient(
+        latency=LatencyModel(args.latency, args.latency_ms, sigma=args.sigma),
+        outputs=load_recorded(args.recorded) if args.recorded else None,
+        throttle_rate=args.throttle_rate,
+        error_rate=args.error_rate,
+        retry_after_ms=args.retry_after_ms,
+        seed=args.seed,
+    )
+    clients.set_openai_client(backend)
+
+    if args.target == "enricher":
+        result = run_enricher(args.records, args.workers, args.mode, args.seed)
+    else:
+        result = run_orchestrator(args.records, args.workers)
+
+    lat = result["latency"]
+    rate = result["completed"] / result["seconds"] if result["seconds"] else 0.0
+    print("\n===== LOAD TEST =====")
+    print(f"Target      : {args.target} ({args.workers} workers, {args.latency} {args.latency_ms:.0f} ms)")
+    print(f"Completed   : {result['completed']}/{args.records} in {result['seconds']:.2f}s")
+    print(f"Throughput  : {rate:.2f} records/sec")
+    print(f"Latency     : p50={lat['p50_ms']:.0f} ms  p95={lat['p95_ms']:.0f} ms  "
+          f"p99={lat['p99_ms']:.0f} ms  max={lat['max_ms']:.0f} ms")
+    print(f"Backend     : {backend.stats()}")
+
+
+if __name__ == "__main__":
+    main()
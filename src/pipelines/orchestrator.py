@@ -1,10 +1,14 @@
 import os
 import json
+import threading
+from pathlib import Path
 from dotenv import load_dotenv
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from azure.identity import DefaultAzureCredential
-from azure.ai.projects import AIProjectClient
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from src.config.paths import ENV, RAW_DATA_DIR
+from src.agents.agent_calls import call_agent_text
+from src.agents.clients import get_openai_client
+from src.pipelines.checkpoint import IndexedJsonl
+from src.pipelines.raw_store import open_raw_store
 
 # --------------------------------------------------
 # Load environment variables
@@ -12,18 +16,11 @@ from src.config.paths import ENV, RAW_DATA_DIR
 load_dotenv(ENV)
 
 # --------------------------------------------------
-# Initialize Azure AI Project client
+# Azure AI client (shared, built on first agent call)
 # --------------------------------------------------
-PROJECT_ENDPOINT = os.getenv("PROJECT_ENDPOINT")
-if not PROJECT_ENDPOINT:
-    raise ValueError("PROJECT_ENDPOINT not set in .env")
-
-project_client = AIProjectClient(
-    endpoint=PROJECT_ENDPOINT,
-    credential=DefaultAzureCredential(),
-)
-
-openai_client = project_client.get_openai_client()
+# Samples in flight; each makes 2 agent calls on the shared executor
+MAX_WORKERS = int(os.getenv("ORCHESTRATOR_MAX_WORKERS", "10"))
+HTTP_POOL_SIZE = 2 * MAX_WORKERS
 
 # --------------------------------------------------
 # Agent environment keys
@@ -41,21 +38,10 @@ def call_agent(agent_env_key: str, prompt: dict):
     if not agent_name:
         raise ValueError(f"{agent_env_key} not found in environment")
 
-    conversation = openai_client.conversations.create()
-
-    response = openai_client.responses.create(
-        conversation=conversation.id,
-        extra_body={
-            "agent": {
-                "name": agent_name,
-                "type": "agent_reference",
-            }
-        },
-        input=json.dumps(prompt),
-    )
+    output_text = call_agent_text(get_openai_client(HTTP_POOL_SIZE), agent_name, json.dumps(prompt))
 
     try:
-        data = json.loads(response.output_text.strip())
+        data = json.loads(output_text.strip())
 
         # Wrap single object into a list for consistency
         if isinstance(data, dict):
@@ -68,13 +54,24 @@ def call_agent(agent_env_key: str, prompt: dict):
         raise ValueError(f"Invalid JSON from agent: {e}")
 
 # --------------------------------------------------
-# Orchestrator: ONE correlated sample
+# Shared agent executor (every agent call, all samples)
 # --------------------------------------------------
-def orchestrate_single_sample(customer_id: int):
-    """
-    Generates exactly ONE correlated FullStory + InMoment sample
-    """
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_agent_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=HTTP_POOL_SIZE, thread_name_prefix="agent")
+    return _executor
 
+# --------------------------------------------------
+# Orchestrator: ONE correlated sample
+# --------------------------------------------------
+def sample_prompts(customer_id: int) -> dict:
     inmoment_prompt = {
         "customer_id": customer_id,
         "complaint_type": "billing"
@@ -86,85 +83,191 @@ def orchestrate_single_sample(customer_id: int):
         "complaint_trigger": True,
         "complaint_type": "billing"
     }
+    return {"inmoment": inmoment_prompt, "fullstory": fullstory_prompt}
 
-    with ThreadPoolExecutor(max_workers=2) as executor:
-        futures = {
-            "inmoment": executor.submit(
-                call_agent, AGENTS["inmoment"], inmoment_prompt
-            ),
-            "fullstory": executor.submit(
-                call_agent, AGENTS["fullstory"], fullstory_prompt
-            )
-        }
 
-        inmoment_data = futures["inmoment"].result()
-        fullstory_data = futures["fullstory"].result()
+def orchestrate_single_sample(customer_id: int):
+    """
+    Generates exactly ONE correlated FullStory + InMoment sample
+    """
+    executor = get_agent_executor()
+    futures = {
+        kind: executor.submit(call_agent, AGENTS[kind], prompt)
+        for kind, prompt in sample_prompts(customer_id).items()
+    }
 
     return {
         "customer_id": customer_id,
-        "inmoment": inmoment_data,
-        "fullstory": fullstory_data
+        "inmoment": futures["inmoment"].result(),
+        "fullstory": futures["fullstory"].result()
     }
 
 # --------------------------------------------------
-# Fan-out / Fan-in: Generate N samples in parallel
+# Incremental, resumable sample output
 # --------------------------------------------------
-def generate_n_samples(
-    n_samples: int,
-    start_customer_id: int = 10001,
-    max_workers: int = 10
-):
-    results = []
+RAW_INMOMENT_JSONL = RAW_DATA_DIR / "synergy_inmoment.jsonl"
+RAW_FULLSTORY_JSONL = RAW_DATA_DIR / "synergy_fullstory.jsonl"
+PROGRESS_FILE = RAW_DATA_DIR / "orchestrator_progress.jsonl"
+
+
+def _last_line(path) -> bytes | None:
+    with path.open("rb") as f:
+        f.seek(0, os.SEEK_END)
+        end = pos = f.tell()
+        chunk = b""
+        while pos > 0:
+            step = min(4096, pos)
+            pos -= step
+            f.seek(pos)
+            chunk = f.read(step) + chunk
+            lines = chunk.rstrip(b"\n").split(b"\n")
+            if len(lines) > 1 or pos == 0:
+                return lines[-1] if end else None
+    return None
+
+
+class SampleWriter:
+    """
+    Appends each finished sample's InMoment / FullStory records to JSONL
+    files, then records the customer ID and both files' end offsets in an
+    indexed progress file.
+
+    On open, data written after the last progress entry (a crash between
+    the two writes, including before the first entry) is truncated away,
+    so every sample is kept exactly once
+    and a rerun skips every customer ID already in the progress index.
+    """
+
+    def __init__(self, inmoment_path=RAW_INMOMENT_JSONL, fullstory_path=RAW_FULLSTORY_JSONL,
+                 progress_path=PROGRESS_FILE):
+        self.progress = IndexedJsonl(progress_path)
+        self.paths = {"inmoment": Path(inmoment_path), "fullstory": Path(fullstory_path)}
+        last = _last_line(self.progress.path) if self.progress.path.exists() else None
+        # No progress entry yet: nothing in the data files was ever committed
+        ends = json.loads(last) if last else {f"{kind}_end": 0 for kind in self.paths}
+        for kind, path in self.paths.items():
+            if path.exists() and path.stat().st_size > ends[f"{kind}_end"]:
+                with path.open("r+b") as f:
+                    f.truncate(ends[f"{kind}_end"])
+        self.last_completed = ends.get("id")
+        self._files = {kind: path.open("ab") for kind, path in self.paths.items()}
+        self._lock = threading.Lock()
+
+    def __contains__(self, customer_id) -> bool:
+        return customer_id in self.progress
 
-    customer_ids = range(
-        start_customer_id,
-        start_customer_id + n_samples
-    )
+    def write(self, sample: dict):
+        ends = {}
+        with self._lock:
+            for kind, f in self._files.items():
+                for record in sample[kind]:
+                    f.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+                ends[f"{kind}_end"] = f.tell()
+            self.progress.append({"id": str(sample["customer_id"]), **ends})
+            self.last_completed = str(sample["customer_id"])
 
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = {
-            executor.submit(orchestrate_single_sample, cid): cid
-            for cid in customer_ids
-        }
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        self.progress.close()
 
-        for future in as_completed(futures):
-            results.append(future.result())
+    def __enter__(self):
+        return self
 
-    return results
+    def __exit__(self, *exc):
+        self.close()
 
 # --------------------------------------------------
-# Persist outputs
+# Streaming fan-out: all agent calls on the shared executor
 # --------------------------------------------------
-def save_outputs(results):
-    inmoment_all = []
-    fullstory_all = []
+def generate_n_samples(
+    n_samples: int,
+    start_customer_id: int = 10001,
+    max_workers: int = MAX_WORKERS,
+    writer: SampleWriter | None = None,
+) -> dict:
+    """
+    Generate samples for customer IDs start..start+n-1, skipping IDs already
+    completed. Both agent calls of each sample go to the shared executor; at
+    most `max_workers` samples are in flight, and each sample is written as
+    soon as both halves return, so memory stays flat and an interrupted run
+    keeps everything it finished. A failed sample is not written and is
+    retried by the next run.
+    """
+    executor = get_agent_executor()
+    own_writer = writer is None
+    writer = writer or SampleWriter()
 
-    for r in results:
-        inmoment_all.extend(r["inmoment"])
-        fullstory_all.extend(r["fullstory"])
+    pending = {}   # future -> (customer_id, kind)
+    halves = {}    # customer_id -> {kind: records} until both are back
+    failed = set()
+    stats = {"written": 0, "skipped": 0, "failed": 0}
 
-    RAW_DATA_DIR.mkdir(parents=True, exist_ok=True)
+    def collect(done):
+        for future in done:
+            customer_id, kind = pending.pop(future)
+            if customer_id in failed:
+                continue
+            try:
+                data = future.result()
+            except Exception as e:
+                failed.add(customer_id)
+                halves.pop(customer_id, None)
+                stats["failed"] += 1
+                print(f"Sample {customer_id} failed ({kind}): {e}")
+                continue
+            parts = halves.setdefault(customer_id, {})
+            parts[kind] = data
+            if len(parts) == len(AGENTS):
+                writer.write({"customer_id": customer_id, **halves.pop(customer_id)})
+                stats["written"] += 1
 
-    inmoment_path = RAW_DATA_DIR / "synergy_inmoment.json"
-    fullstory_path = RAW_DATA_DIR / "synergy_fullstory.json"
+    try:
+        if writer.last_completed is not None:
+            print(f"Resuming: {len(writer.progress)} samples already completed "
+                  f"(most recent: customer {writer.last_completed})")
+        for customer_id in range(start_customer_id, start_customer_id + n_samples):
+            if customer_id in writer:
+                stats["skipped"] += 1
+                continue
+            while len(pending) >= len(AGENTS) * max_workers:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            for kind, prompt in sample_prompts(customer_id).items():
+                pending[executor.submit(call_agent, AGENTS[kind], prompt)] = (customer_id, kind)
 
-    inmoment_path.write_text(
-        json.dumps(inmoment_all, indent=2, ensure_ascii=False),
-        encoding="utf-8"
-    )
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            collect(done)
+    finally:
+        if own_writer:
+            writer.close()
 
-    fullstory_path.write_text(
-        json.dumps(fullstory_all, indent=2, ensure_ascii=False),
-        encoding="utf-8"
-    )
+    stats["last_completed"] = writer.last_completed
+    return stats
 
-    print(f"Saved {len(inmoment_all)} InMoment records → {inmoment_path}")
-    print(f"Saved {len(fullstory_all)} FullStory records → {fullstory_path}")
+# --------------------------------------------------
+# Publish new samples to the segmented raw store
+# --------------------------------------------------
+def save_outputs():
+    # Only the bytes appended since the last publish are copied, as one new
+    # segment per dataset; data_api serves the stores as JSON arrays
+    for jsonl_path, dataset in ((RAW_INMOMENT_JSONL, "synergy_inmoment"), (RAW_FULLSTORY_JSONL, "synergy_fullstory")):
+        store = open_raw_store(dataset)
+        segment = store.ingest_jsonl(jsonl_path)
+        added = segment["records"] if segment else 0
+        print(f"Saved {added} new records → {store.dir} (total {store.record_count})")
 
 # --------------------------------------------------
 # Entrypoint
 # --------------------------------------------------
 if __name__ == "__main__":
     n = int(input("Enter number of samples to generate: ").strip())
-    results = generate_n_samples(n_samples=n)
-    save_outputs(results)
+    RAW_DATA_DIR.mkdir(parents=True, exist_ok=True)
+    stats = generate_n_samples(n_samples=n)
+    print(f"Samples written: {stats['written']}, already done: {stats['skipped']}, "
+          f"failed: {stats['failed']} (most recent customer: {stats['last_completed']})")
+    print(f"Appended to {RAW_INMOMENT_JSONL} and {RAW_FULLSTORY_JSONL}")
+    save_outputs()
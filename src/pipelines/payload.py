@@ -0,0 +1,221 @@
+import copy
+import json
+import threading
+from collections import Counter
+from pathlib import Path
+
+from src.config.paths import FIELD_EXTRACTION_CONFIG_DIR
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+except Exception:  # tiktoken not installed (or no encoding data offline)
+    _ENCODING = None
+
+# --------------------------------------------------
+# Per-agent payload projection under a token budget
+# --------------------------------------------------
+# Agents only read a handful of fields, but the merged record carries full
+# FullStory event streams. Before each call the record is projected to the
+# agent's configured fields, nulls are dropped, long arrays are cut to their
+# first and last items plus a count summary of what was omitted, and arrays
+# are cut further until the payload fits the agent's token budget.
+#
+# A section can also be a list of objects (e.g. "fullstory_sessions"): its
+# fields are picked from each item, and item_fields / max_items paths through
+# it apply to every item ("fullstory_sessions.events"), while the section's
+# own path caps the number of items.
+#
+# The agents only write to a few places ("agent_writes", e.g. inmoment.tags
+# and inmoment.incidents), which are always sent whole. merge() copies those
+# back onto the original record, so fields that were never sent are kept
+# exactly as they were.
+
+AGENT_PAYLOADS_FILE = FIELD_EXTRACTION_CONFIG_DIR / "agent_payloads.json"
+
+_MIN_ITEMS = 4
+
+
+def count_tokens(text: str) -> int:
+    """tiktoken count when available, else ~4 characters per token."""
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return (len(text) + 3) // 4
+
+
+def _dumps(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def drop_nulls(value):
+    if isinstance(value, dict):
+        return {k: drop_nulls(v) for k, v in value.items() if v is not None}
+    if isinstance(value, list):
+        return [drop_nulls(v) for v in value if v is not None]
+    return value
+
+
+def _get(obj, path: str):
+    for key in path.split("."):
+        if not isinstance(obj, dict):
+            return None
+        obj = obj.get(key)
+    return obj
+
+
+def _set(obj: dict, path: str, value):
+    keys = path.split(".")
+    for key in keys[:-1]:
+        obj = obj.setdefault(key, {})
+    obj[keys[-1]] = value
+
+
+def _update(obj, keys: list[str], fn):
+    """Replace the list at `keys` with fn(list), through any lists on the way."""
+    if isinstance(obj, list):
+        for item in obj:
+            _update(item, keys, fn)
+        return
+    if not isinstance(obj, dict) or keys[0] not in obj:
+        return
+    if len(keys) > 1:
+        _update(obj[keys[0]], keys[1:], fn)
+    elif isinstance(obj[keys[0]], list):
+        obj[keys[0]] = fn(obj[keys[0]])
+
+
+def _pick(item, paths: list[str]):
+    if not isinstance(item, dict):
+        return item
+    picked: dict = {}
+    for path in paths:
+        value = _get(item, path)
+        if value is not None:
+            _set(picked, path, value)
+    return picked
+
+
+def _item_label(item) -> str:
+    if isinstance(item, dict):
+        props = item.get("event_properties")
+        name = props.get("name") if isinstance(props, dict) else None
+        return str(name or item.get("event_type") or item.get("name") or item.get("type") or "item")
+    return type(item).__name__
+
+
+def truncate_items(items: list, max_items: int) -> list:
+    """First and last items, with a summary of the omitted middle."""
+    if len(items) <= max_items:
+        return items
+    head = max_items // 2
+    tail = max_items - head
+    omitted = items[head:len(items) - tail]
+    summary = {"_omitted": len(omitted), "_omitted_by_type": dict(Counter(_item_label(i) for i in omitted))}
+    return items[:head] + [summary] + items[len(items) - tail:]
+
+
+class AgentProjection:
+    def __init__(self, agent: str, config: dict, enabled: bool = True):
+        self.agent = agent
+        self.fields: dict = config.get("fields", {})
+        self.item_fields: dict = config.get("item_fields", {})
+        self.max_items: dict = config.get("max_items", {})
+        self.token_budget: int | None = config.get("token_budget")
+        self.agent_writes: list[str] = config.get("agent_writes", [])
+        self.enabled = enabled
+        self.stats = ProjectionStats(agent)
+
+    @classmethod
+    def from_file(cls, agent: str, path: Path = AGENT_PAYLOADS_FILE) -> "AgentProjection":
+        with Path(path).open("r", encoding="utf-8") as f:
+            return cls(agent, json.load(f)[agent])
+
+    def _build(self, record: dict, max_items: dict) -> dict:
+        payload = {"id": record.get("id")}
+        for section, keys in self.fields.items():
+            source = record.get(section)
+            if isinstance(source, dict):
+                payload[section] = {k: source[k] for k in keys if source.get(k) is not None}
+            elif isinstance(source, list):
+                payload[section] = [
+                    {k: item[k] for k in keys if item.get(k) is not None}
+                    for item in source if isinstance(item, dict)
+                ]
+
+        for path, item_paths in self.item_fields.items():
+            _update(payload, path.split("."), lambda items: [_pick(i, item_paths) for i in items])
+        for path, limit in max_items.items():
+            _update(payload, path.split("."), lambda items: truncate_items(items, limit))
+        return drop_nulls(payload)
+
+    def project(self, record: dict) -> dict:
+        """Payload for the agent; records tokens before/after in self.stats."""
+        before = count_tokens(_dumps(record))
+        if not self.enabled:
+            self.stats.add(record.get("id"), before, before, False)
+            return record
+
+        limits = dict(self.max_items)
+        payload = self._build(record, limits)
+        tokens = count_tokens(_dumps(payload))
+        # Over budget: halve every array limit until it fits or hits the floor
+        while self.token_budget and tokens > self.token_budget and any(v > _MIN_ITEMS for v in limits.values()):
+            limits = {k: max(_MIN_ITEMS, v // 2) for k, v in limits.items()}
+            payload = self._build(record, limits)
+            tokens = count_tokens(_dumps(payload))
+
+        over = bool(self.token_budget and tokens > self.token_budget)
+        self.stats.add(record.get("id"), before, tokens, over)
+        return payload
+
+    def merge(self, original: dict, output: dict) -> dict:
+        """Original record with the agent's writes (agent_writes paths) applied."""
+        if not self.enabled:
+            return output
+        merged = copy.deepcopy(original)
+        for path in self.agent_writes:
+            value = _get(output, path)
+            if value is not None:
+                _set(merged, path, value)
+        return merged
+
+# --------------------------------------------------
+# Token accounting
+# --------------------------------------------------
+class ProjectionStats:
+    """
+    One entry per record: a retried agent call projects the record again,
+    and that projection replaces the earlier one instead of being counted
+    twice. Records without an id are each counted once.
+    """
+
+    def __init__(self, agent: str):
+        self.agent = agent
+        self.records: dict = {}
+        self._lock = threading.Lock()
+
+    def add(self, record_id, before: int, after: int, over_budget: bool):
+        with self._lock:
+            key = record_id if record_id is not None else ("_no_id", len(self.records))
+            self.records[key] = {
+                "id": record_id, "tokens_before": before, "tokens_after": after, "over_budget": over_budget
+            }
+
+    def summary(self) -> str:
+        with self._lock:
+            rows = list(self.records.values())
+        n = len(rows)
+        before = sum(r["tokens_before"] for r in rows)
+        after = sum(r["tokens_after"] for r in rows)
+        over = sum(1 for r in rows if r["over_budget"])
+        saved = 1 - after / before if before else 0.0
+        per_record = (before - after) / n if n else 0.0
+        return (
+            f"[{self.agent} payload] records={n} tokens_before={before} tokens_after={after} "
+            f"saved={saved:.1%} ({per_record:.0f}/record) over_budget={over}"
+        )
+
+    def write_report(self, path):
+        with self._lock, Path(path).open("a", encoding="utf-8") as f:
+            for row in self.records.values():
+                f.write(json.dumps({"agent": self.agent, **row}) + "\n")
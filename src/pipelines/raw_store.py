@@ -0,0 +1,423 @@
+import os
+import json
+import hashlib
+import argparse
+import contextlib
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import Iterator
+
+from src.config.paths import RAW_DATA_DIR
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+    import msvcrt
+
+# --------------------------------------------------
+# Append-only segmented raw store
+# --------------------------------------------------
+# A dataset (e.g. "synergy_inmoment") lives in data/raw/<name>/ as
+#
+#   manifest.json        ordered segment list + ingestion offsets
+#   seg-000001.jsonl     one record per line, never modified once written
+#   seg-000002.jsonl     ...
+#
+# Appending writes one new segment (tmp + fsync + rename) and then swaps the
+# manifest atomically, so the cost is proportional to the new records only
+# and a crash leaves either the old or the new manifest. compact() rewrites
+# many small segments into a few large ones; the replaced segments are listed
+# as "retired" in the manifest and only deleted COMPACT_GRACE_SECONDS later
+# (by a later append, ingest or compact), so readers still walking the old
+# manifest can finish.
+#
+# The legacy pretty-printed array data/raw/<name>.json is imported as the
+# first segment the first time the store is opened; json_array_chunks() /
+# export_json() give consumers the same JSON array view as before.
+
+DEFAULT_SEGMENT_RECORDS = 100_000
+
+# Bytes at the start of an ingested source whose digest identifies it
+SOURCE_HEAD_BYTES = 4096
+
+# How long compacted-away segments stay on disk for in-flight readers
+COMPACT_GRACE_SECONDS = int(os.getenv("COMPACT_GRACE_SECONDS", "3600"))
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _head_digest(f, length: int) -> str:
+    f.seek(0)
+    return hashlib.sha1(f.read(length)).hexdigest()
+
+
+def _last_line_end(f, size: int) -> int:
+    """Offset just past the last newline before `size` (0 if there is none)."""
+    pos = size
+    while pos > 0:
+        step = min(1 << 16, pos)
+        pos -= step
+        f.seek(pos)
+        newline = f.read(step).rfind(b"\n")
+        if newline >= 0:
+            return pos + newline + 1
+    return 0
+
+
+def _fsync_write(path: Path, data: bytes):
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class SegmentedStore:
+    def __init__(self, name: str, root: Path = RAW_DATA_DIR, import_legacy: bool = True):
+        self.name = name
+        self.dir = Path(root) / name
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.dir / "manifest.json"
+        self.legacy_path = Path(root) / f"{name}.json"
+        if not self.manifest_path.exists():
+            with self._locked():
+                if not self.manifest_path.exists():
+                    self._write_manifest({"name": name, "next_segment": 1, "segments": [], "sources": {}})
+                    if import_legacy and self.legacy_path.exists():
+                        self._import_legacy()
+
+    # --------------------------------------------------
+    # Manifest
+    # --------------------------------------------------
+    @contextlib.contextmanager
+    def _locked(self):
+        with (self.dir / ".lock").open("a+b") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            else:  # pragma: no cover - Windows
+                lock.seek(0)
+                msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+                else:  # pragma: no cover - Windows
+                    lock.seek(0)
+                    msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def manifest(self) -> dict:
+        with self.manifest_path.open("r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_manifest(self, manifest: dict):
+        manifest["updated_at"] = _now()
+        _fsync_write(self.manifest_path, json.dumps(manifest, indent=2).encode("utf-8"))
+
+    def _add_segment(self, manifest: dict, data: bytes, records: int) -> dict:
+        segment = {
+            "file": f"seg-{manifest['next_segment']:06d}.jsonl",
+            "records": records,
+            "bytes": len(data),
+            "created_at": _now(),
+        }
+        _fsync_write(self.dir / segment["file"], data)
+        manifest["next_segment"] += 1
+        manifest["segments"].append(segment)
+        return segment
+
+    def _add_segment_lines(self, manifest: dict, lines) -> dict | None:
+        """Like _add_segment, but streams `lines` to disk (None if empty)."""
+        path = self.dir / f"seg-{manifest['next_segment']:06d}.jsonl"
+        tmp = path.with_name(path.name + ".tmp")
+        size = records = 0
+        with tmp.open("wb") as f:
+            for line in lines:
+                f.write(line)
+                size += len(line)
+                records += bool(line.strip())
+            f.flush()
+            os.fsync(f.fileno())
+        if not size:
+            tmp.unlink()
+            return None
+        os.replace(tmp, path)
+        segment = {"file": path.name, "records": records, "bytes": size, "created_at": _now()}
+        manifest["next_segment"] += 1
+        manifest["segments"].append(segment)
+        return segment
+
+    def _purge_retired(self, manifest: dict, grace_seconds: int = COMPACT_GRACE_SECONDS):
+        """Delete retired segments older than the grace period (caller holds the lock)."""
+        now = datetime.now(timezone.utc)
+        kept = []
+        for retired in manifest.get("retired", []):
+            age = (now - datetime.fromisoformat(retired["retired_at"])).total_seconds()
+            if age >= grace_seconds:
+                (self.dir / retired["file"]).unlink(missing_ok=True)
+            else:
+                kept.append(retired)
+        manifest["retired"] = kept
+
+    @property
+    def record_count(self) -> int:
+        return sum(s["records"] for s in self.manifest()["segments"])
+
+    # --------------------------------------------------
+    # Writes (cost proportional to the new data)
+    # --------------------------------------------------
+    def append(self, records: list[dict]) -> dict | None:
+        if not records:
+            return None
+        data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records).encode("utf-8")
+        with self._locked():
+            manifest = self.manifest()
+            segment = self._add_segment(manifest, data, len(records))
+            self._purge_retired(manifest)
+            self._write_manifest(manifest)
+        return segment
+
+    def ingest_jsonl(self, path) -> dict | None:
+        """
+        Append whatever `path` (an append-only JSONL file) gained since the
+        last ingest as one new segment, streamed line by line. Only complete
+        lines are taken.
+
+        The source is recognised by its inode and a digest of its first
+        SOURCE_HEAD_BYTES: a different file at the same path is taken from
+        the start, while the same file cut short (e.g. uncommitted lines
+        truncated after a crash) is only followed from its new end, so
+        records already ingested are never appended twice.
+        """
+        path = Path(path)
+        if not path.exists():
+            return None
+        key = str(path.resolve())
+        with self._locked():
+            manifest = self.manifest()
+            source = manifest["sources"].get(key) or {}
+            if isinstance(source, int):
+                source = {"offset": source}  # manifests from before source identity
+            with path.open("rb") as f:
+                st = os.fstat(f.fileno())
+                offset = source.get("offset", 0)
+                head_len = min(offset, SOURCE_HEAD_BYTES)
+                same = source.get("inode", st.st_ino) == st.st_ino and (
+                    # Cut below the digested head: same inode is all we can check
+                    st.st_size < head_len or source.get("head") in (None, _head_digest(f, head_len))
+                )
+                if not same:
+                    offset = 0  # a different file: take it from the start
+                elif st.st_size < offset:
+                    offset = _last_line_end(f, st.st_size)
+
+                f.seek(offset)
+                ingested = [0]
+
+                def complete_lines():
+                    for line in f:
+                        if not line.endswith(b"\n"):
+                            return  # partial last line: taken next time
+                        ingested[0] += len(line)
+                        yield line
+
+                segment = self._add_segment_lines(manifest, complete_lines())
+                end = offset + ingested[0]
+                head = _head_digest(f, min(end, SOURCE_HEAD_BYTES))
+            new_source = {"offset": end, "inode": st.st_ino, "head": head}
+            if segment is None and new_source == manifest["sources"].get(key):
+                return None
+            manifest["sources"][key] = new_source
+            self._purge_retired(manifest)
+            self._write_manifest(manifest)
+        return segment
+
+    def _import_legacy(self):
+        with self.legacy_path.open("r", encoding="utf-8") as f:
+            try:
+                legacy = json.load(f)
+            except json.JSONDecodeError:
+                legacy = []
+        if not isinstance(legacy, list):
+            legacy = [legacy]
+        manifest = self.manifest()
+        if legacy:
+            data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in legacy).encode("utf-8")
+            self._add_segment(manifest, data, len(legacy))
+        manifest["legacy_imported"] = str(self.legacy_path)
+        self._write_manifest(manifest)
+        print(f"Imported {len(legacy)} records from {self.legacy_path.name} into {self.dir}")
+
+    # --------------------------------------------------
+    # Reads
+    # --------------------------------------------------
+    def iter_lines(self) -> Iterator[bytes]:
+        for segment in self.manifest()["segments"]:
+            with (self.dir / segment["file"]).open("rb") as f:
+                for line in f:
+                    if line.strip():
+                        yield line.rstrip(b"\n")
+
+    def iter_records(self) -> Iterator[dict]:
+        for line in self.iter_lines():
+            yield json.loads(line)
+
+    def read_page(self, cursor: tuple[str, int] | None, limit: int) -> tuple[list[bytes], tuple[str, int] | None]:
+        """
+        Up to `limit` raw record lines starting at `cursor` (segment file,
+        byte offset), plus the cursor of the next page (None at the end).
+        Segments are immutable, so a cursor stays valid until compaction
+        retires its segment (KeyError).
+        """
+        lines, next_cursor, _ = self.read_since(cursor, limit)
+        return lines, next_cursor
+
+    def read_since(self, cursor: tuple[str, int] | None, limit: int):
+        """
+        read_page() plus a resume cursor: the position right after the last
+        line read, which stays meaningful at the end of the store. Reading
+        from it later returns only records appended since (None if the
+        store is empty).
+        """
+        segments = [s["file"] for s in self.manifest()["segments"]]
+        if cursor is None:
+            if not segments:
+                return [], None, None
+            cursor = (segments[0], 0)
+        file, offset = cursor
+        if file not in segments:
+            raise KeyError(file)
+
+        lines: list[bytes] = []
+        index = segments.index(file)
+        while index < len(segments):
+            try:
+                f = (self.dir / segments[index]).open("rb")
+            except FileNotFoundError:
+                # Retired and purged since our manifest read: same as expired
+                raise KeyError(segments[index]) from None
+            with f:
+                f.seek(offset)
+                while len(lines) < limit:
+                    line = f.readline()
+                    if not line:
+                        break
+                    if line.strip():
+                        lines.append(line.rstrip(b"\n"))
+                position = f.tell()
+                at_end = position >= os.fstat(f.fileno()).st_size
+            resume = (segments[index], position)
+            if len(lines) >= limit:
+                if not at_end:
+                    return lines, resume, resume
+                return lines, ((segments[index + 1], 0) if index + 1 < len(segments) else None), resume
+            index += 1
+            offset = 0
+        return lines, None, resume
+
+    def locate(self, record_offset: int) -> tuple[str, int] | None:
+        """Cursor of the record at position `record_offset` (None past the end)."""
+        for segment in self.manifest()["segments"]:
+            if record_offset < segment["records"]:
+                with (self.dir / segment["file"]).open("rb") as f:
+                    for _ in range(record_offset):
+                        f.readline()
+                    return segment["file"], f.tell()
+            record_offset -= segment["records"]
+        return None
+
+    def json_array_chunks(self) -> Iterator[bytes]:
+        """The whole store as a JSON array, one record per chunk."""
+        yield b"["
+        first = True
+        for line in self.iter_lines():
+            yield (b"\n" if first else b",\n") + line
+            first = False
+        yield b"\n]\n"
+
+    def export_json(self, path=None) -> Path:
+        """Materialize the JSON array view (defaults to the legacy <name>.json)."""
+        path = Path(path) if path else self.legacy_path
+        tmp = path.with_name(path.name + ".tmp")
+        with tmp.open("wb") as f:
+            for chunk in self.json_array_chunks():
+                f.write(chunk)
+        os.replace(tmp, path)
+        return path
+
+    # --------------------------------------------------
+    # Compaction
+    # --------------------------------------------------
+    def compact(self, segment_records: int = DEFAULT_SEGMENT_RECORDS) -> dict:
+        """
+        Rewrite all segments into as few as possible (segment_records lines
+        each) and swap the manifest. The old segment files are retired, not
+        deleted: a later write removes them once COMPACT_GRACE_SECONDS have
+        passed, so a reader that loaded the old manifest can still open them.
+        """
+        with self._locked():
+            manifest = self.manifest()
+            old = [s["file"] for s in manifest["segments"]]
+            if len(old) <= 1:
+                if manifest.get("retired"):
+                    self._purge_retired(manifest)
+                    self._write_manifest(manifest)
+                return {"segments_before": len(old), "segments_after": len(old)}
+
+            new_manifest = {**manifest, "segments": []}
+            buffer: list[bytes] = []
+            for line in self.iter_lines():
+                buffer.append(line + b"\n")
+                if len(buffer) >= segment_records:
+                    self._add_segment(new_manifest, b"".join(buffer), len(buffer))
+                    buffer = []
+            if buffer:
+                self._add_segment(new_manifest, b"".join(buffer), len(buffer))
+            self._purge_retired(new_manifest)
+            retired_at = _now()
+            new_manifest["retired"] += [{"file": file, "retired_at": retired_at} for file in old]
+            self._write_manifest(new_manifest)
+        return {"segments_before": len(old), "segments_after": len(new_manifest["segments"])}
+
+# --------------------------------------------------
+# Raw datasets
+# --------------------------------------------------
+RAW_DATASETS = ("synergy_inmoment", "synergy_fullstory")
+
+
+def open_raw_store(name: str) -> SegmentedStore:
+    return SegmentedStore(name, RAW_DATA_DIR)
+
+# --------------------------------------------------
+# CLI: python -m src.pipelines.raw_store {stats,compact,export} [name ...]
+# --------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Segmented raw data store maintenance")
+    parser.add_argument("command", choices=["stats", "compact", "export"])
+    parser.add_argument("names", nargs="*", default=list(RAW_DATASETS))
+    parser.add_argument("--segment-records", type=int, default=DEFAULT_SEGMENT_RECORDS)
+    args = parser.parse_args()
+
+    for name in args.names:
+        store = open_raw_store(name)
+        if args.command == "stats":
+            segments = store.manifest()["segments"]
+            total_bytes = sum(s["bytes"] for s in segments)
+            retired = len(store.manifest().get("retired", []))
+            print(
+                f"{name}: {store.record_count} records in {len(segments)} segments ({total_bytes:,} bytes), "
+                f"{retired} retired"
+            )
+        elif args.command == "compact":
+            result = store.compact(args.segment_records)
+            print(f"{name}: compacted {result['segments_before']} → {result['segments_after']} segments")
+        else:
+            print(f"{name}: exported {store.record_count} records → {store.export_json()}")
+
+
+if __name__ == "__main__":
+    main()